@@ -0,0 +1,286 @@
+"""Two-tier cache: an in-process LRU in front of content-addressed JSON files.
+
+Entries are addressed by the SHA-256 of their key and stored under
+``CACHE_DIR/objects``. Both tiers honor a TTL (``settings.cache_ttl_seconds``
+unless overridden per read). The memory tier is bounded by entry count and by
+bytes; entries too large for it stay on disk only. The disk tier is bounded by
+total bytes, kept as a running total so writes only rescan the directory when
+the budget is exceeded or the total is stale; eviction removes least recently
+written files first. Writes go to a temporary file that is atomically renamed into
+place, so concurrent readers in the thread pool never see a partial entry.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app import metrics
+from app.config import settings
+
+CACHE_DIR = Path("cache")
+# Other processes share the directory, so the running byte total is
+# recounted at least this often.
+RESCAN_SECONDS = 300.0
+
+_lock = threading.Lock()
+# slot -> (written_at, value, size); ``value`` is a _Raw until first read.
+_memory: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+_memory_bytes = 0
+_disk_bytes: Optional[int] = None
+_disk_counted_at = 0.0
+_stats: Dict[str, int] = {
+    "hits": 0,
+    "memory_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "writes": 0,
+    "evictions": 0,
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> str:
+    """Serialize ``value`` to JSON, handling datetimes and pydantic models."""
+    return json.dumps(value, default=_json_default, separators=(",", ":"))
+
+
+def make_key(namespace: str, *parts: Any) -> str:
+    """Build a process-independent key from JSON-serializable ``parts``."""
+    digest = hashlib.sha256(dumps(parts).encode("utf-8")).hexdigest()
+    return f"{namespace}-{digest}"
+
+
+def _object_path(key: str) -> Path:
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return CACHE_DIR / "objects" / digest[:2] / f"{digest}.json"
+
+
+def _count(*names: str) -> None:
+    with _lock:
+        for name in names:
+            _stats[name] += 1
+
+
+class _Raw:
+    """Serialized entry text, parsed on its first memory hit rather than on write."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _forget(slot: str) -> None:
+    global _memory_bytes
+    entry = _memory.pop(slot, None)
+    if entry is not None:
+        _memory_bytes -= entry[2]
+
+
+def _remember(slot: str, written_at: float, value: Any, size: int) -> None:
+    """Keep an entry in memory; ones over a quarter of the byte budget are skipped."""
+    global _memory_bytes
+    budget = settings.cache_memory_bytes
+    with _lock:
+        _forget(slot)
+        if size > budget // 4:
+            return
+        _memory[slot] = (written_at, value, size)
+        _memory_bytes += size
+        while len(_memory) > max(settings.cache_memory_entries, 0) or _memory_bytes > budget:
+            _forget(next(iter(_memory)))
+            _stats["evictions"] += 1
+
+
+def read_cache(key: str, ttl_seconds: Optional[int] = None) -> Any:
+    """Return the cached value for ``key``, or ``None`` if absent or expired."""
+    ttl = settings.cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+    path = _object_path(key)
+    slot = str(path)
+    now = time.time()
+
+    with _lock:
+        entry = _memory.get(slot)
+        if entry is not None:
+            _memory.move_to_end(slot)
+    if entry is not None and now - entry[0] < ttl:
+        value = entry[1]
+        if isinstance(value, _Raw):
+            value = json.loads(value.text)["value"]
+            with _lock:
+                if _memory.get(slot) is entry:
+                    _memory[slot] = (entry[0], value, entry[2])
+        _count("hits", "memory_hits")
+        return value
+
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            text = f.read()
+        payload = json.loads(text)
+    except (FileNotFoundError, ValueError):
+        _count("misses")
+        return None
+    if payload.get("key") != key or now - payload["written_at"] >= ttl:
+        _count("misses")
+        return None
+    _remember(slot, payload["written_at"], payload["value"], len(text))
+    _count("hits", "disk_hits")
+    return payload["value"]
+
+
+def write_cache(key: str, value: Any) -> None:
+    path = _object_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written_at = time.time()
+    text = dumps({"key": key, "written_at": written_at, "value": value})
+    data = text.encode("utf-8")
+    replaced = file_size(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    # Keep the memory tier in the same JSON shape a disk read would return.
+    _remember(str(path), written_at, _Raw(text), len(data))
+    _count("writes")
+    record_disk_write(len(data) - replaced)
+
+
+def cached(key: str, compute: Callable[[], Any], refresh: bool = False, ttl_seconds: Optional[int] = None) -> Any:
+    """Return the cached value for ``key`` or compute, store and return it."""
+    if not refresh:
+        value = read_cache(key, ttl_seconds=ttl_seconds)
+        if value is not None:
+            return value
+    value = compute()
+    write_cache(key, value)
+    return value
+
+
+def _disk_entries() -> List[Path]:
+    """Cached JSON objects plus the ``.audit`` results kept by ``result_store``."""
+    return [*(CACHE_DIR / "objects").glob("*/*.json"), *(CACHE_DIR / "audits").glob("*.audit")]
+
+
+def file_size(path: Path) -> int:
+    """Size of ``path`` in bytes, 0 if it does not exist."""
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def record_disk_write(added: int) -> None:
+    """Add ``added`` bytes to the running disk total and evict once over budget.
+
+    The directory is only rescanned by :func:`evict_disk` when the total is
+    unknown, older than ``RESCAN_SECONDS`` or above ``settings.cache_max_bytes``.
+    """
+    global _disk_bytes
+    limit = settings.cache_max_bytes
+    if limit <= 0:
+        return
+    with _lock:
+        if _disk_bytes is not None:
+            _disk_bytes += added
+        fresh = _disk_bytes is not None and time.time() - _disk_counted_at < RESCAN_SECONDS
+        if fresh and _disk_bytes <= limit:
+            return
+    evict_disk()
+
+
+def _stat_entries() -> List[Tuple[os.stat_result, Path]]:
+    entries = []
+    for p in _disk_entries():
+        try:
+            entries.append((p.stat(), p))
+        except FileNotFoundError:
+            # Evicted or replaced by another writer since the glob.
+            continue
+    return entries
+
+
+def evict_disk() -> None:
+    """Delete the oldest disk entries once they exceed ``settings.cache_max_bytes``.
+
+    Eviction goes down to 90% of the budget, so the writes that follow do not
+    each push the total back over it and trigger another scan.
+    """
+    global _disk_bytes, _disk_counted_at
+    limit = settings.cache_max_bytes
+    if limit <= 0:
+        return
+    files = _stat_entries()
+    total = sum(st.st_size for st, _ in files)
+    if total > limit:
+        target = limit * 9 // 10
+        for st, p in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= target:
+                break
+            try:
+                p.unlink(missing_ok=True)
+            except OSError:
+                # An audit file still open elsewhere (Windows); try next time.
+                continue
+            total -= st.st_size
+            with _lock:
+                _forget(str(p))
+                _stats["evictions"] += 1
+    with _lock:
+        _disk_bytes = total
+        _disk_counted_at = time.time()
+
+
+def clear_memory() -> None:
+    """Drop the in-process tier only, as a restart would."""
+    global _memory_bytes
+    with _lock:
+        _memory.clear()
+        _memory_bytes = 0
+
+
+def clear_cache() -> None:
+    """Drop every memory and disk entry."""
+    global _disk_bytes
+    clear_memory()
+    with _lock:
+        _disk_bytes = None
+    for p in _disk_entries():
+        p.unlink(missing_ok=True)
+
+
+def stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters plus the overall hit ratio."""
+    with _lock:
+        result: Dict[str, Any] = dict(_stats)
+        result["memory_entries"] = len(_memory)
+        result["memory_bytes"] = _memory_bytes
+    lookups = result["hits"] + result["misses"]
+    result["hit_ratio"] = result["hits"] / lookups if lookups else 0.0
+    return result
+
+
+metrics.register_collector("cache", stats)
@@ -0,0 +1,314 @@
+"""Persistent local store of Bitbucket commits keyed by SHA.
+
+Each commit is stored once in ``commit_data``; ``branch_commits`` records the
+(repo, branch) pairs it was seen on, so a commit shared by ``main``,
+``develop`` and a release branch costs one row plus three memberships.
+
+Each (repo, branch) pair carries a sync state recording the newest commit seen
+(the high-water mark) and the date range that has been synced, so refreshes
+only need to pull commits newer than the watermark.
+
+``commit_changes`` holds the changed file paths per SHA. Commits are
+immutable, so entries never expire.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.columnar import CommitColumns, CommitColumnsBuilder, to_ms
+from app.models import Commit
+
+DB_PATH = Path("cache/commits.sqlite")
+
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commit_data (
+    sha TEXT PRIMARY KEY,
+    author TEXT,
+    date TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_commit_data_date ON commit_data (date);
+CREATE TABLE IF NOT EXISTS branch_commits (
+    repo TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    PRIMARY KEY (repo, branch, sha)
+);
+CREATE INDEX IF NOT EXISTS idx_branch_commits_sha ON branch_commits (sha);
+CREATE TABLE IF NOT EXISTS commit_parents (
+    sha TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    PRIMARY KEY (sha, parent)
+);
+CREATE TABLE IF NOT EXISTS commit_changes (
+    sha TEXT PRIMARY KEY,
+    paths TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    repo TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    head_sha TEXT,
+    head_date TEXT,
+    synced_from TEXT NOT NULL,
+    synced_until TEXT NOT NULL,
+    PRIMARY KEY (repo, branch)
+);
+"""
+
+# Version 1 kept one full row per (repo, branch, sha) in ``commits``.
+_MIGRATE_V1 = """
+INSERT OR IGNORE INTO commit_data (sha, author, date, message)
+    SELECT sha, author, date, message FROM commits;
+INSERT OR IGNORE INTO branch_commits (repo, branch, sha)
+    SELECT repo, branch, sha FROM commits;
+DROP TABLE commits;
+"""
+
+_WINDOW_QUERY = (
+    "SELECT c.sha, c.author, c.date, c.message FROM branch_commits m "
+    "JOIN commit_data c ON c.sha = m.sha "
+    "WHERE m.repo = ? AND m.branch = ? AND c.date >= ? AND c.date <= ? "
+    "ORDER BY c.date DESC, c.sha"
+)
+
+_write_lock = threading.Lock()
+
+
+@dataclass
+class SyncState:
+    repo: str
+    branch: str
+    head_sha: Optional[str]
+    head_date: Optional[datetime]
+    synced_from: datetime
+    synced_until: datetime
+
+
+def normalize_ts(value: str | datetime) -> str:
+    """Return a fixed-width ISO timestamp so stored dates sort lexically."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.replace(tzinfo=None).isoformat(timespec="microseconds")
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        conn.executescript(_SCHEMA)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            _migrate(conn)
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    legacy = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'commits'").fetchone()
+    if legacy:
+        conn.executescript(_MIGRATE_V1)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def get_state(repo: str, branch: str) -> Optional[SyncState]:
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT head_sha, head_date, synced_from, synced_until FROM sync_state "
+            "WHERE repo = ? AND branch = ?",
+            (repo, branch),
+        ).fetchone()
+    if row is None:
+        return None
+    head_sha, head_date, synced_from, synced_until = row
+    return SyncState(
+        repo=repo,
+        branch=branch,
+        head_sha=head_sha,
+        head_date=datetime.fromisoformat(head_date) if head_date else None,
+        synced_from=datetime.fromisoformat(synced_from),
+        synced_until=datetime.fromisoformat(synced_until),
+    )
+
+
+def save_state(state: SyncState) -> None:
+    with _write_lock, _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO sync_state "
+            "(repo, branch, head_sha, head_date, synced_from, synced_until) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                state.repo,
+                state.branch,
+                state.head_sha,
+                normalize_ts(state.head_date) if state.head_date else None,
+                normalize_ts(state.synced_from),
+                normalize_ts(state.synced_until),
+            ),
+        )
+
+
+def _upsert(
+    commits: List[Tuple[str, Optional[str], str, str]], members: List[Tuple[str, str, str]]
+) -> int:
+    if not members:
+        return 0
+    with _write_lock, _connect() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO commit_data (sha, author, date, message) VALUES (?, ?, ?, ?)",
+            commits,
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO branch_commits (repo, branch, sha) VALUES (?, ?, ?)",
+            members,
+        )
+    return len(members)
+
+
+def upsert_commits(commits: Iterable[Commit]) -> int:
+    """Store ``commits``; returns the number of (repo, branch, sha) memberships written."""
+    commits = list(commits)
+    return _upsert(
+        [(c.sha, c.author, normalize_ts(c.date), c.message or "") for c in commits],
+        [(c.repo, c.branch, c.sha) for c in commits],
+    )
+
+
+def upsert_columns(columns: CommitColumns) -> int:
+    """Store a column set, with every branch membership, without ``Commit`` models."""
+    return _upsert(
+        [(r.sha, r.author, normalize_ts(r.date), r.message) for r in columns],
+        [(repo, branch, columns.sha(i)) for i in range(len(columns)) for repo, branch in columns.memberships(i)],
+    )
+
+
+def save_parents(links: Iterable[Tuple[str, str]]) -> None:
+    """Record ``(sha, parent_sha)`` links, so :func:`adopt` can follow ancestry."""
+    links = list(links)
+    if not links:
+        return
+    with _write_lock, _connect() as conn:
+        conn.executemany("INSERT OR IGNORE INTO commit_parents (sha, parent) VALUES (?, ?)", links)
+
+
+def known_shas(repo: str, start_date: str, end_date: str, exclude_branch: Optional[str] = None) -> Dict[str, str]:
+    """SHA -> one branch it is stored on, for ``repo``'s commits in the window,
+    ignoring memberships of ``exclude_branch``.
+
+    Only commits with recorded parents are included: :func:`adopt` cannot
+    follow the history of the others.
+    """
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT m.sha, m.branch FROM branch_commits m JOIN commit_data c ON c.sha = m.sha "
+            "WHERE m.repo = ? AND m.branch IS NOT ? AND c.date >= ? AND c.date <= ? "
+            "AND EXISTS (SELECT 1 FROM commit_parents p WHERE p.sha = m.sha)",
+            (repo, exclude_branch, normalize_ts(start_date), normalize_ts(end_date)),
+        ).fetchall()
+    return dict(rows)
+
+
+def adopt(repo: str, branch: str, source_branch: str, sha: str, start_date: str, end_date: str) -> int:
+    """Add ``branch`` membership to the ancestors of ``sha`` stored for
+    ``source_branch`` in the window.
+
+    Used when paging ``branch`` stopped at ``sha``, a commit already stored
+    for ``source_branch``: the history below it is shared. Ancestry is walked
+    through the recorded parent links, so commits merged into the source
+    after the branch was cut are not copied whatever their dates.
+    """
+    with _write_lock, _connect() as conn:
+        cursor = conn.execute(
+            "WITH RECURSIVE ancestors(sha) AS ("
+            "SELECT ? UNION SELECT p.parent FROM commit_parents p JOIN ancestors a ON p.sha = a.sha) "
+            "INSERT OR IGNORE INTO branch_commits (repo, branch, sha) "
+            "SELECT m.repo, ?, m.sha FROM ancestors a "
+            "JOIN branch_commits m ON m.sha = a.sha JOIN commit_data c ON c.sha = m.sha "
+            "WHERE m.repo = ? AND m.branch = ? AND c.date >= ? AND c.date <= ?",
+            (sha, branch, repo, source_branch, normalize_ts(start_date), normalize_ts(end_date)),
+        )
+        return cursor.rowcount
+
+
+def get_changes(shas: Iterable[str]) -> Dict[str, List[str]]:
+    """Stored changed paths for whichever of ``shas`` have them."""
+    shas = list(dict.fromkeys(shas))
+    found: Dict[str, List[str]] = {}
+    with _connect() as conn:
+        # Stay under SQLite's bound-parameter limit.
+        for lo in range(0, len(shas), 500):
+            chunk = shas[lo:lo + 500]
+            rows = conn.execute(
+                f"SELECT sha, paths FROM commit_changes WHERE sha IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update((sha, paths.split("\n") if paths else []) for sha, paths in rows)
+    return found
+
+
+def save_changes(changes: Dict[str, List[str]]) -> None:
+    if not changes:
+        return
+    with _write_lock, _connect() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO commit_changes (sha, paths) VALUES (?, ?)",
+            [(sha, "\n".join(paths)) for sha, paths in changes.items()],
+        )
+
+
+def clear(repo: str, branch: str, keep: Iterable[str] = ()) -> None:
+    """Drop ``repo``/``branch``'s memberships (except the SHAs in ``keep``) and
+    sync state, and any commit left on no branch."""
+    with _write_lock, _connect() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_shas (sha TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM keep_shas")
+        conn.executemany("INSERT OR IGNORE INTO keep_shas (sha) VALUES (?)", ((sha,) for sha in keep))
+        conn.execute(
+            "DELETE FROM branch_commits WHERE repo = ? AND branch = ? "
+            "AND sha NOT IN (SELECT sha FROM keep_shas)",
+            (repo, branch),
+        )
+        conn.execute("DELETE FROM commit_data WHERE sha NOT IN (SELECT sha FROM branch_commits)")
+        conn.execute("DELETE FROM sync_state WHERE repo = ? AND branch = ?", (repo, branch))
+
+
+def query_commits(repo: str, branch: str, start_date: str, end_date: str) -> List[Commit]:
+    """Return stored commits for ``repo``/``branch`` within the inclusive window,
+    newest first (matching Bitbucket's page order)."""
+    with _connect() as conn:
+        rows = conn.execute(
+            _WINDOW_QUERY, (repo, branch, normalize_ts(start_date), normalize_ts(end_date))
+        ).fetchall()
+    return [
+        Commit(
+            sha=sha,
+            author=author,
+            date=datetime.fromisoformat(date),
+            message=message,
+            repo=repo,
+            branch=branch,
+        )
+        for sha, author, date, message in rows
+    ]
+
+
+def query_columns(
+    builder: CommitColumnsBuilder, repo: str, branch: str, start_date: str, end_date: str
+) -> None:
+    """Append the window's stored commits to ``builder``, in ``query_commits`` order.
+
+    Commits the builder already holds from another pair only gain a membership.
+    """
+    with _connect() as conn:
+        rows = conn.execute(_WINDOW_QUERY, (repo, branch, normalize_ts(start_date), normalize_ts(end_date)))
+        for sha, author, date, message in rows:
+            builder.append(sha, author, to_ms(datetime.fromisoformat(date)), message, repo, branch)
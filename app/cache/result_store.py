@@ -0,0 +1,227 @@
+"""Versioned binary container for audit results.
+
+An ``.audit`` file is an uncompressed zip whose members are read on demand:
+
+- ``format.json``: the format name and version, checked before anything else
+- ``meta.json``: schema version, write time, window and the matching summary
+  (``missing`` and ``coverage``)
+- ``issues.json``: the issue dicts
+- ``commits/*.npy``: the :class:`~app.core.columnar.CommitColumns` arrays, with
+  the dictionary values in ``commits/dictionaries.json`` and the messages in
+  ``commits/messages.txt``; the ``member_*`` arrays (branch memberships) are
+  optional, a file without them has one membership per commit
+- ``matching/*``: link keys plus CSR-style row arrays for ``links`` and the
+  ``unlinked`` row indices
+
+:class:`AuditFile` is a read-only mapping over such a file, so callers index it
+like the dict ``run_audit`` builds while only the members they touch are
+parsed. It holds the file open until closed; use it as a context manager.
+Files are written to a temporary path and atomically renamed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.cache import cache_manager
+from app.config import settings
+from app.core.columnar import CommitColumns
+
+FORMAT_NAME = "release-audit"
+FORMAT_VERSION = 1
+SUFFIX = ".audit"
+
+_COMMIT_ARRAYS = ("shas", "repo_codes", "branch_codes", "author_codes", "dates_ms", "message_offsets")
+_MEMBER_ARRAYS = ("member_offsets", "member_repo_codes", "member_branch_codes")
+_SECTIONS = ("schema_version", "issues", "commits", "matching", "window")
+
+
+class FormatError(ValueError):
+    """The file is not an audit container this version can read."""
+
+
+def _put_json(zf: zipfile.ZipFile, name: str, value: Any) -> None:
+    zf.writestr(name, cache_manager.dumps(value))
+
+
+def _put_array(zf: zipfile.ZipFile, name: str, array: np.ndarray) -> None:
+    with zf.open(name, "w") as f:
+        np.lib.format.write_array(f, np.ascontiguousarray(array), allow_pickle=False)
+
+
+def write_result(path: Path, result: Dict[str, Any], key: Optional[str] = None) -> None:
+    """Write an audit ``result`` (with ``commits`` as ``CommitColumns``) to ``path``."""
+    commits = result["commits"]
+    if not isinstance(commits, CommitColumns):
+        commits = CommitColumns.from_records(commits)
+    matching = result["matching"]
+    link_keys = list(matching["links"])
+    link_rows = [matching["links"][k] for k in link_keys]
+    link_offsets = np.zeros(len(link_rows) + 1, dtype=np.int64)
+    np.cumsum([len(rows) for rows in link_rows], out=link_offsets[1:])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, zipfile.ZipFile(raw, "w", zipfile.ZIP_STORED) as zf:
+            _put_json(zf, "format.json", {"format": FORMAT_NAME, "version": FORMAT_VERSION})
+            _put_json(
+                zf,
+                "meta.json",
+                {
+                    "key": key,
+                    "schema_version": result.get("schema_version"),
+                    "written_at": time.time(),
+                    "window": result.get("window"),
+                    "missing": matching["missing"],
+                    "coverage": matching["coverage"],
+                },
+            )
+            _put_json(zf, "issues.json", result["issues"])
+            for name in _COMMIT_ARRAYS + _MEMBER_ARRAYS:
+                _put_array(zf, f"commits/{name}.npy", getattr(commits, name))
+            _put_json(
+                zf,
+                "commits/dictionaries.json",
+                {"repos": commits.repos, "branches": commits.branches, "authors": commits.authors},
+            )
+            zf.writestr("commits/messages.txt", commits.message_blob.encode("utf-8"))
+            _put_json(zf, "matching/link_keys.json", link_keys)
+            _put_array(zf, "matching/link_offsets.npy", link_offsets)
+            _put_array(zf, "matching/link_rows.npy", np.fromiter(
+                (i for rows in link_rows for i in rows), dtype=np.int64, count=int(link_offsets[-1])
+            ))
+            _put_array(zf, "matching/unlinked.npy", np.asarray(matching["unlinked"], dtype=np.int64))
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class AuditFile(Mapping):
+    """Lazy, read-only view of an ``.audit`` file.
+
+    Only ``format.json`` and ``meta.json`` are read on open; ``issues``,
+    ``commits`` and the full ``matching`` are parsed the first time they are
+    accessed and then kept.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._zip = zipfile.ZipFile(self.path)
+        try:
+            header = self._json("format.json")
+        except (KeyError, ValueError) as exc:
+            self._zip.close()
+            raise FormatError(f"{self.path} is not an audit file") from exc
+        if header.get("format") != FORMAT_NAME or header.get("version") != FORMAT_VERSION:
+            self._zip.close()
+            raise FormatError(f"{self.path}: unsupported format {header}")
+        self.meta: Dict[str, Any] = self._json("meta.json")
+        self._loaded: Dict[str, Any] = {}
+
+    def _json(self, name: str) -> Any:
+        return json.loads(self._zip.read(name))
+
+    def _array(self, name: str) -> np.ndarray:
+        return np.lib.format.read_array(io.BytesIO(self._zip.read(name)), allow_pickle=False)
+
+    @property
+    def written_at(self) -> float:
+        return self.meta["written_at"]
+
+    def summary(self) -> Dict[str, Any]:
+        """``missing`` and ``coverage`` without touching issues, commits or links."""
+        return {"missing": self.meta["missing"], "coverage": self.meta["coverage"]}
+
+    def _load(self, name: str) -> Any:
+        if name == "schema_version":
+            return self.meta["schema_version"]
+        if name == "window":
+            return self.meta["window"]
+        if name == "issues":
+            return self._json("issues.json")
+        if name == "commits":
+            dictionaries = self._json("commits/dictionaries.json")
+            members = set(self._zip.namelist())
+            arrays = {
+                n: self._array(f"commits/{n}.npy")
+                for n in _COMMIT_ARRAYS + _MEMBER_ARRAYS
+                if f"commits/{n}.npy" in members
+            }
+            return CommitColumns(
+                message_blob=self._zip.read("commits/messages.txt").decode("utf-8"),
+                **dictionaries,
+                **arrays,
+            )
+        offsets = self._array("matching/link_offsets.npy").tolist()
+        rows = self._array("matching/link_rows.npy").tolist()
+        keys: List[str] = self._json("matching/link_keys.json")
+        return {
+            **self.summary(),
+            "unlinked": self._array("matching/unlinked.npy").tolist(),
+            "links": {k: rows[offsets[n]:offsets[n + 1]] for n, k in enumerate(keys)},
+        }
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in _SECTIONS:
+            raise KeyError(name)
+        if name not in self._loaded:
+            self._loaded[name] = self._load(name)
+        return self._loaded[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_SECTIONS)
+
+    def __len__(self) -> int:
+        return len(_SECTIONS)
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def __enter__(self) -> "AuditFile":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def read_result(path: Path) -> AuditFile:
+    return AuditFile(path)
+
+
+def _cache_path(key: str) -> Path:
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return cache_manager.CACHE_DIR / "audits" / f"{digest}{SUFFIX}"
+
+
+def save(key: str, result: Dict[str, Any]) -> None:
+    """Cache ``result`` under ``key``; audits share the cache's disk budget."""
+    path = _cache_path(key)
+    replaced = cache_manager.file_size(path)
+    write_result(path, result, key=key)
+    cache_manager.record_disk_write(cache_manager.file_size(path) - replaced)
+
+
+def load(key: str, ttl_seconds: Optional[int] = None) -> Optional[AuditFile]:
+    """Open the cached result for ``key``, or ``None`` if absent, stale or unreadable."""
+    ttl = settings.cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+    try:
+        result = AuditFile(_cache_path(key))
+    except (FileNotFoundError, zipfile.BadZipFile, FormatError):
+        return None
+    if result.meta.get("key") != key or time.time() - result.written_at >= ttl:
+        result.close()
+        return None
+    return result
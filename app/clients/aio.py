@@ -0,0 +1,39 @@
+"""Thread-pool helper for blocking client work that grows as it runs.
+
+The HTTP layer is synchronous (``requests`` with tenacity retries), so
+concurrency comes from worker threads and retry and backoff still apply per
+request. Fixed fan-outs use ``ThreadPoolExecutor.map`` directly;
+:func:`stream_tasks` covers work that discovers more of itself, e.g. paging.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def stream_tasks(
+    tasks: Iterable[T], run: Callable[[T], Tuple[R, Iterable[T]]], workers: int
+) -> Iterator[R]:
+    """Run ``tasks`` from one shared queue on ``workers`` threads.
+
+    ``run`` returns a result and follow-up tasks, which join the same queue, so
+    a job that keeps splitting is spread over every worker instead of holding
+    one. Results are yielded in completion order; the first error is raised
+    and the tasks still queued are cancelled.
+    """
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        pending = {pool.submit(run, task) for task in tasks}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result, follow_ups = future.result()
+                    pending.update(pool.submit(run, task) for task in follow_ups)
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
@@ -1,19 +1,30 @@
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor
+import math
+import threading
+from dataclasses import dataclass, replace
 from datetime import datetime
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
 
+from app.cache import commit_store
+from app.cache.cache_manager import cached, make_key
+from app.clients import aio
 from app.clients.http_client import request_json
 from app.config import settings
+from app.core.columnar import CommitColumns, CommitColumnsBuilder
 from app.models import Commit
 
+PAGE_LIMIT = 100
+CHANGES_PAGE_LIMIT = 500
+# Changed-file lists are written to the store every this many commits.
+CHANGES_SAVE_EVERY = 200
+
 
 def _fetch_commits_page(repo: str, branch: str, start: int, since: str, until: str) -> Dict:
     project, slug = repo.split("/")
     url = f"{settings.bitbucket_base_url}/rest/api/1.0/projects/{project}/repos/{slug}/commits"
     params = {
-        "limit": 100,
+        "limit": PAGE_LIMIT,
         "start": start,
         "until": branch,
         "since": since,
@@ -23,36 +34,435 @@ def _fetch_commits_page(repo: str, branch: str, start: int, since: str, until: s
     return request_json("GET", url, headers=headers, params=params)
 
 
-def fetch_commits(repo: str, branch: str, start_date: str, end_date: str) -> List[Commit]:
-    commits: List[Commit] = []
+def _get_commits_page(
+    repo: str, branch: str, start: int, since: str, until: str, refresh: bool = False
+) -> Dict:
+    key = make_key("bitbucket-page", repo, branch, start, since, until, PAGE_LIMIT)
+    return cached(key, lambda: _fetch_commits_page(repo, branch, start, since, until), refresh=refresh)
+
+
+def _parse_commit(item: Dict, repo: str, branch: str) -> Commit:
+    ts = int(item.get("authorTimestamp")) / 1000
+    return Commit(
+        sha=item.get("id"),
+        author=(item.get("author", {}) or {}).get("name"),
+        date=datetime.utcfromtimestamp(ts),
+        message=item.get("message"),
+        repo=repo,
+        branch=branch,
+    )
+
+
+def iter_commit_pages(repo: str, branch: str, start_date: str, end_date: str) -> Iterator[List[Dict]]:
+    """Yield raw commit items page by page, in Bitbucket's listing order.
+
+    Never cached: this backs the watermark check, which must see the live head.
+    """
     start = 0
     while True:
         data = _fetch_commits_page(repo, branch, start, start_date, end_date)
-        for item in data.get("values", []):
-            ts = int(item.get("authorTimestamp")) / 1000
-            commits.append(
-                Commit(
-                    sha=item.get("id"),
-                    author=(item.get("author", {}) or {}).get("name"),
-                    date=datetime.utcfromtimestamp(ts),
-                    message=item.get("message"),
-                    repo=repo,
-                    branch=branch,
-                )
-            )
+        yield data.get("values", [])
         if data.get("isLastPage", True):
             break
         start = data.get("nextPageStart", 0)
-    return commits
 
 
-def fetch_commits_threaded(pairs: Iterable[Tuple[str, str]], start_date: str, end_date: str) -> List[Commit]:
-    results: List[Commit] = []
-    with ThreadPoolExecutor(max_workers=settings.threads) as executor:
-        futures = [
-            executor.submit(fetch_commits, repo, branch, start_date, end_date)
+@dataclass(frozen=True)
+class PageTask:
+    """One page request: offset ``start`` into a ``since``..``untilDate`` window."""
+
+    repo: str
+    branch: str
+    since: str
+    until: str
+    start: int = 0
+
+
+class _WatermarkTask(NamedTuple):
+    repo: str
+    branch: str
+    since: str
+    until: str
+    state: commit_store.SyncState
+
+
+def _item_date(item: Dict) -> datetime:
+    return datetime.utcfromtimestamp(int(item.get("authorTimestamp")) / 1000)
+
+
+def _parent_links(items: Iterable[Dict]) -> List[Tuple[str, str]]:
+    return [(item.get("id"), parent.get("id")) for item in items for parent in item.get("parents") or []]
+
+
+class _SiblingStops:
+    """Where paging each branch can stop because a sibling already has the rest.
+
+    Each pair knows the SHAs stored for other branches of its repo, plus those
+    fetched for them during this run. A page reaching one of them means the
+    history below that commit is the sibling's: the pair records the commit
+    and source branch, and pages past the first such page are skipped. A
+    branch that stopped is never used as a source, so stops cannot form a
+    cycle.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[str, str]], start_date: str, end_date: str):
+        pairs = list(pairs)
+        self._lock = threading.Lock()
+        self._known = {
+            (repo, branch): commit_store.known_shas(repo, start_date, end_date, exclude_branch=branch)
             for repo, branch in pairs
-        ]
-        for fut in futures:
-            results.extend(fut.result())
-    return results
+        }
+        self._siblings = {pair: [p for p in pairs if p[0] == pair[0] and p != pair] for pair in pairs}
+        self._offsets: Dict[Tuple[str, str], int] = {}
+        # Per pair, in order of first stop: (hit SHA, source branch) pairs.
+        self.stops: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+
+    def skip(self, task: "PageTask") -> bool:
+        with self._lock:
+            offset = self._offsets.get((task.repo, task.branch))
+        return offset is not None and task.start > offset
+
+    def observe(self, task: "PageTask", values: List[Dict]) -> bool:
+        """Record ``values`` as on ``task``'s branch; ``True`` if paging can stop."""
+        pair = (task.repo, task.branch)
+        with self._lock:
+            known = self._known[pair]
+            ineligible = {branch for (repo, branch) in self.stops if repo == task.repo} | {task.branch}
+            hit = next((item for item in values if known.get(item.get("id"), task.branch) not in ineligible), None)
+            for sibling in self._siblings[pair]:
+                sibling_known = self._known[sibling]
+                for item in values:
+                    sibling_known.setdefault(item.get("id"), task.branch)
+            if hit is None:
+                return False
+            self.stops.setdefault(pair, []).append((hit.get("id"), known[hit.get("id")]))
+            self._offsets[pair] = min(self._offsets.get(pair, task.start), task.start)
+            return True
+
+
+class _Pager:
+    """Offset paging of every window, with pages fetched ahead in parallel.
+
+    Bitbucket lists commits in ``git log`` order and reports no total, so a
+    window is only ever paged by offset; author dates are not monotonic in
+    that order and cannot be used to split it. The first page of a window
+    estimates how many pages remain from the commit rate it covers, and up to
+    ``max_ahead`` of those offsets are kept in flight at once, so one busy
+    branch is fetched by several workers. Offsets past the last page come
+    back empty.
+    """
+
+    def __init__(self, max_ahead: int):
+        self._max_ahead = max(max_ahead, 1)
+        self._lock = threading.Lock()
+        # Per window: pages kept in flight, offsets queued, and the last page's offset.
+        self._windows: Dict[Tuple[str, str, str, str], List] = {}
+
+    def _ahead(self, task: PageTask, values: List[Dict]) -> int:
+        if len(values) < 2:
+            return 1
+        dates = [_item_date(item) for item in values]
+        newest, oldest = max(dates), min(dates)
+        remaining = (oldest - datetime.fromisoformat(task.since)).total_seconds()
+        rate = len(values) / max((newest - oldest).total_seconds(), 1.0)
+        return min(max(math.ceil(rate * remaining / PAGE_LIMIT), 1), self._max_ahead)
+
+    def follow_ups(self, task: PageTask, data: Dict) -> List[PageTask]:
+        """Offsets to queue after ``task``'s page."""
+        values = data.get("values", [])
+        key = (task.repo, task.branch, task.since, task.until)
+        with self._lock:
+            window = self._windows.setdefault(key, [1, {task.start}, None])
+            if data.get("isLastPage", True):
+                window[2] = task.start if window[2] is None else min(window[2], task.start)
+                return []
+            if task.start == 0:
+                window[0] = self._ahead(task, values)
+            ahead, queued, last = window
+            following = data.get("nextPageStart", task.start + len(values))
+            offsets = [following + PAGE_LIMIT * n for n in range(ahead)]
+            offsets = [o for o in offsets if o not in queued and (last is None or o <= last)]
+            queued.update(offsets)
+        return [replace(task, start=o) for o in offsets]
+
+
+def _stream(
+    tasks: Iterable[Union[PageTask, _WatermarkTask]],
+    refresh: bool,
+    workers: Optional[int],
+    stops: Optional[_SiblingStops] = None,
+) -> Iterator[Tuple[Union[PageTask, _WatermarkTask], List]]:
+    """Run page and watermark tasks on one work queue, in completion order.
+
+    Page results are raw items with duplicates removed; watermark
+    results are the new ``Commit`` models of that pair. With ``stops``, page
+    tasks end where a sibling branch's known history begins.
+    """
+    workers = max(workers or settings.threads, 1)
+    pager = _Pager(workers)
+    seen: Dict[Tuple[str, str], Set[str]] = {}
+
+    def run(task):
+        if isinstance(task, PageTask):
+            if stops is not None and stops.skip(task):
+                return (task, []), []
+            data = _get_commits_page(task.repo, task.branch, task.start, task.since, task.until, refresh)
+            values = data.get("values", [])
+            if stops is not None and stops.observe(task, values):
+                return (task, values), []
+            return (task, values), pager.follow_ups(task, data)
+        return (task, _fetch_new_commits(*task)), []
+
+    for task, values in aio.stream_tasks(tasks, run, workers):
+        if isinstance(task, PageTask):
+            known = seen.setdefault((task.repo, task.branch), set())
+            values = [item for item in values if item.get("id") not in known]
+            known.update(item.get("id") for item in values)
+        yield task, values
+
+
+def stream_commit_pages(
+    pairs: Iterable[Tuple[str, str]],
+    start_date: str,
+    end_date: str,
+    refresh: bool = False,
+    workers: Optional[int] = None,
+) -> Iterator[Tuple[str, str, List[Dict]]]:
+    """Yield ``(repo, branch, items)`` for every page of every pair's window.
+
+    Pages of all pairs share one work queue of ``workers`` threads (default
+    ``settings.threads``) and busy windows are paged several offsets ahead,
+    so a single large repository is fetched by every worker rather than one.
+    Pages arrive in completion order, not newest first. Pages are served from
+    the cache unless ``refresh`` is set.
+    """
+    tasks = [PageTask(repo, branch, start_date, end_date) for repo, branch in dict.fromkeys(pairs)]
+    for task, items in _stream(tasks, refresh, workers):
+        yield task.repo, task.branch, items
+
+
+def fetch_commits(
+    repo: str, branch: str, start_date: str, end_date: str, refresh: bool = False
+) -> List[Commit]:
+    commits = [
+        _parse_commit(item, repo, branch)
+        for _, _, items in stream_commit_pages([(repo, branch)], start_date, end_date, refresh)
+        for item in items
+    ]
+    return sorted(commits, key=lambda c: c.date, reverse=True)
+
+
+def fetch_commit_columns(
+    repo: str, branch: str, start_date: str, end_date: str, refresh: bool = False
+) -> CommitColumns:
+    """Fetch the window straight from page JSON into columns, skipping models."""
+    builder = CommitColumnsBuilder()
+    for _, _, items in stream_commit_pages([(repo, branch)], start_date, end_date, refresh):
+        builder.add_page(items, repo, branch)
+    return builder.build()
+
+
+def _fetch_new_commits(
+    repo: str, branch: str, start_date: str, end_date: str, state: commit_store.SyncState
+) -> List[Commit]:
+    """Page from the branch head down, stopping at the stored head commit.
+
+    Author dates are not monotonic in Bitbucket's ``git log`` order, so only
+    the head SHA ends paging early; otherwise ``start_date`` bounds it.
+    """
+    new: List[Commit] = []
+    for page in iter_commit_pages(repo, branch, start_date, end_date):
+        ids = [item.get("id") for item in page]
+        if state.head_sha in ids:
+            page = page[:ids.index(state.head_sha)]
+        commit_store.save_parents(_parent_links(page))
+        new.extend(_parse_commit(item, repo, branch) for item in page)
+        if len(page) < len(ids):
+            break
+    return new
+
+
+def sync_pairs(
+    pairs: Iterable[Tuple[str, str]],
+    start_date: str,
+    end_date: str,
+    full_resync: bool = False,
+    stop_at_known: Optional[bool] = None,
+) -> Dict[Tuple[str, str], int]:
+    """Bring the local commit store up to date for every repo/branch pair.
+
+    Only commits newer than a pair's stored high-water mark are fetched unless
+    the requested window starts before what has been synced or ``full_resync``
+    is set. Every pair's requests go through one work queue (see
+    :func:`stream_commit_pages`) and pages are written to the store as they
+    arrive. A full resync drops a pair's previously stored commits only once
+    its fetch has completed. Returns the number of commit memberships written
+    per pair.
+
+    With ``stop_at_known`` (default ``settings.bitbucket_stop_at_known``), a
+    full fetch stops paging a branch at the first commit already known from
+    a sibling branch of the same repo, and that commit's ancestors stored for
+    the sibling are attributed to the branch instead. Commits the branch
+    lists past that point that are not such ancestors (merged in from
+    elsewhere) are missed.
+    """
+    if stop_at_known is None:
+        stop_at_known = settings.bitbucket_stop_at_known
+    start = datetime.fromisoformat(start_date)
+    # Never mark the future as synced: windows are padded past "now".
+    end = min(datetime.fromisoformat(end_date), datetime.utcnow())
+    states: Dict[Tuple[str, str], Optional[commit_store.SyncState]] = {}
+    tasks: List[Union[PageTask, _WatermarkTask]] = []
+    for repo, branch in dict.fromkeys(pairs):
+        state = None if full_resync else commit_store.get_state(repo, branch)
+        states[(repo, branch)] = state
+        if state is None or start < state.synced_from:
+            tasks.append(PageTask(repo, branch, start_date, end_date))
+        else:
+            # Page down from synced_until at the latest so no gap is left
+            # between the previously synced range and the requested one.
+            since = min(start, state.synced_until).isoformat()
+            tasks.append(_WatermarkTask(repo, branch, since, end_date, state))
+
+    stops = None
+    if stop_at_known:
+        stops = _SiblingStops([(t.repo, t.branch) for t in tasks if isinstance(t, PageTask)], start_date, end_date)
+    written = {pair: 0 for pair in states}
+    fetched: Dict[Tuple[str, str], Set[str]] = {pair: set() for pair in states}
+    # The first commit listed in a pair's window: its head for the next sync.
+    heads: Dict[Tuple[str, str], Tuple[str, datetime]] = {}
+    for task, values in _stream(tasks, full_resync, None, stops):
+        pair = (task.repo, task.branch)
+        if not values:
+            continue
+        if isinstance(task, PageTask):
+            builder = CommitColumnsBuilder()
+            builder.add_page(values, task.repo, task.branch)
+            written[pair] += commit_store.upsert_columns(builder.build())
+            commit_store.save_parents(_parent_links(values))
+            if full_resync:
+                fetched[pair].update(item.get("id") for item in values)
+            if task.start == 0:
+                heads[pair] = (values[0].get("id"), _item_date(values[0]))
+        else:
+            written[pair] += commit_store.upsert_commits(values)
+            heads[pair] = (values[0].sha, values[0].date)
+
+    if full_resync:
+        for (repo, branch), shas in fetched.items():
+            commit_store.clear(repo, branch, keep=shas)
+
+    # Latest stops first: a branch that stopped is never a source, so each
+    # source's own adoption has already run when it is copied from.
+    for (repo, branch), hits in reversed(list(stops.stops.items()) if stops else []):
+        for sha, source in hits:
+            written[(repo, branch)] += commit_store.adopt(repo, branch, source, sha, start_date, end_date)
+
+    for (repo, branch), state in states.items():
+        head_sha = state.head_sha if state else None
+        head_date = state.head_date if state else None
+        top = heads.get((repo, branch))
+        # An older window's first commit is not the branch head.
+        if top is not None and (state is None or end >= state.synced_until):
+            head_sha, head_date = top
+        commit_store.save_state(
+            commit_store.SyncState(
+                repo=repo,
+                branch=branch,
+                head_sha=head_sha,
+                head_date=head_date,
+                synced_from=start if state is None else min(start, state.synced_from),
+                synced_until=end if state is None else max(end, state.synced_until),
+            )
+        )
+    return written
+
+
+def sync_commits(
+    repo: str, branch: str, start_date: str, end_date: str, full_resync: bool = False
+) -> int:
+    """:func:`sync_pairs` for a single pair; returns the commits written."""
+    return sync_pairs([(repo, branch)], start_date, end_date, full_resync)[(repo, branch)]
+
+
+def fetch_commits_synced(
+    repo: str, branch: str, start_date: str, end_date: str, full_resync: bool = False
+) -> List[Commit]:
+    """Sync ``repo``/``branch`` incrementally and answer the window from the store."""
+    sync_commits(repo, branch, start_date, end_date, full_resync=full_resync)
+    return commit_store.query_commits(repo, branch, start_date, end_date)
+
+
+def fetch_commits_threaded(
+    pairs: Iterable[Tuple[str, str]], start_date: str, end_date: str, full_resync: bool = False
+) -> List[Commit]:
+    """Sync every pair on one shared work queue, then answer from the store.
+
+    A commit on several pairs is returned once, tagged with the first of them.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    sync_pairs(pairs, start_date, end_date, full_resync)
+    by_sha: Dict[str, Commit] = {}
+    for repo, branch in pairs:
+        for commit in commit_store.query_commits(repo, branch, start_date, end_date):
+            by_sha.setdefault(commit.sha, commit)
+    return list(by_sha.values())
+
+
+def fetch_commit_columns_threaded(
+    pairs: Iterable[Tuple[str, str]], start_date: str, end_date: str, full_resync: bool = False
+) -> CommitColumns:
+    """Sync every pair on one shared work queue, then read the window into one column set."""
+    pairs = list(dict.fromkeys(pairs))
+    sync_pairs(pairs, start_date, end_date, full_resync)
+    builder = CommitColumnsBuilder()
+    for repo, branch in pairs:
+        commit_store.query_columns(builder, repo, branch, start_date, end_date)
+    return builder.build()
+
+
+def _fetch_changes_page(repo: str, sha: str, start: int) -> Dict:
+    project, slug = repo.split("/")
+    url = f"{settings.bitbucket_base_url}/rest/api/1.0/projects/{project}/repos/{slug}/commits/{sha}/changes"
+    params = {"limit": CHANGES_PAGE_LIMIT, "start": start}
+    headers = {"Authorization": f"Bearer {settings.bitbucket_token}"}
+    return request_json("GET", url, headers=headers, params=params)
+
+
+def fetch_changes(
+    commits: Iterable[Tuple[str, str]], workers: Optional[int] = None
+) -> Dict[str, List[str]]:
+    """Changed file paths for each ``(repo, sha)`` in ``commits``, keyed by SHA.
+
+    SHAs already in the commit store are answered from it and never requested
+    again. The rest are fetched concurrently on one work queue (a commit with
+    many changes pages on it too) and saved in batches as they complete;
+    completed commits are saved even if a later request fails.
+    """
+    repo_of = {sha: repo for repo, sha in commits}
+    found = commit_store.get_changes(repo_of)
+    missing = [(repo_of[sha], sha, 0) for sha in repo_of if sha not in found]
+    if not missing:
+        return found
+
+    def run(task):
+        repo, sha, start = task
+        data = _fetch_changes_page(repo, sha, start)
+        paths = [(item.get("path") or {}).get("toString") for item in data.get("values", [])]
+        following = [] if data.get("isLastPage", True) else [(repo, sha, data.get("nextPageStart", start + len(paths)))]
+        return (sha, [p for p in paths if p], not following), following
+
+    partial: Dict[str, List[str]] = {}
+    batch: Dict[str, List[str]] = {}
+    try:
+        for sha, paths, done in aio.stream_tasks(missing, run, max(workers or settings.threads, 1)):
+            partial.setdefault(sha, []).extend(paths)
+            if done:
+                found[sha] = batch[sha] = partial.pop(sha)
+                if len(batch) >= CHANGES_SAVE_EVERY:
+                    commit_store.save_changes(batch)
+                    batch = {}
+    finally:
+        # Keep what completed even if a request failed part-way through.
+        commit_store.save_changes(batch)
+    return found
@@ -1,22 +1,207 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlsplit
 
 import requests
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception, stop_after_attempt
 
+from app import metrics
+from app.clients.rate_limit import HostScheduler, Slot, parse_retry_after
 from app.config import settings
 
+# Worth retrying: timeouts, throttling and transient server errors. Any other
+# 4xx (bad JQL, missing repo, expired token, ...) fails on the first attempt.
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+MAX_BACKOFF_SECONDS = 10.0
+MAX_RETRY_AFTER_SECONDS = 120.0
+_NON_METRIC_RE = re.compile(r"[^a-zA-Z0-9_]")
+
 
 class HttpError(Exception):
-    pass
+    def __init__(self, status: int, text: str = "", retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}: {text}")
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status in RETRYABLE_STATUS
+
+
+class PooledClient:
+    """Thread-safe HTTP client sharing one keep-alive session across callers.
+
+    Connections are pooled per host (up to ``pool_size`` each). Each
+    host's requests go through a :class:`~app.clients.rate_limit.HostScheduler`:
+    at most ``host_concurrency`` in flight (less while the server throttles),
+    optionally at most ``rate`` per second, and paused per ``Retry-After``.
+    """
+
+    def __init__(
+        self,
+        pool_size: int,
+        host_concurrency: int,
+        gzip: bool = True,
+        rate: float = 0.0,
+        burst: int = 0,
+    ):
+        self.pool_size = pool_size
+        self.host_concurrency = host_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.session = requests.Session()
+        # ``pool_maxsize`` sizes each host's pool; ``pool_connections`` is how
+        # many host pools are cached, and its default covers our few hosts.
+        adapter = HTTPAdapter(pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._adapter = adapter
+        self.session.headers["Accept-Encoding"] = "gzip, deflate" if gzip else "identity"
+        self._lock = threading.Lock()
+        self._schedulers: Dict[str, HostScheduler] = {}
+        self._in_flight: Dict[str, int] = {}
+        self.requests_sent = 0
+
+    def scheduler(self, host: str) -> HostScheduler:
+        with self._lock:
+            scheduler = self._schedulers.get(host)
+            if scheduler is None:
+                scheduler = self._schedulers[host] = HostScheduler(self.host_concurrency, self.rate, self.burst)
+                self._in_flight[host] = 0
+            return scheduler
+
+    @contextmanager
+    def _acquire(self, host: str) -> Iterator[Slot]:
+        with self.scheduler(host).slot() as slot:
+            with self._lock:
+                self._in_flight[host] += 1
+                self.requests_sent += 1
+            try:
+                yield slot
+            finally:
+                with self._lock:
+                    self._in_flight[host] -= 1
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        with self._acquire(urlsplit(url).netloc) as slot:
+            response = self.session.request(method, url, **kwargs)
+            slot.observe(response.status_code, response.headers)
+            return response
+
+    def limits(self) -> Dict[str, Dict[str, float]]:
+        """Per-host scheduler state: current concurrency ``limit``, ``rate`` and ``throttled`` count."""
+        with self._lock:
+            schedulers = dict(self._schedulers)
+        return {host: s.stats() for host, s in schedulers.items()}
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-host connection counters: ``opened``, ``reused`` and ``in_flight``."""
+        result: Dict[str, Dict[str, int]] = {}
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            default_port = pool.port in (None, 80, 443)
+            host = pool.host if default_port else f"{pool.host}:{pool.port}"
+            entry = result.setdefault(host, {"opened": 0, "reused": 0, "in_flight": 0})
+            entry["opened"] += pool.num_connections
+            entry["reused"] += max(pool.num_requests - pool.num_connections, 0)
+        with self._lock:
+            for host, count in self._in_flight.items():
+                entry = result.setdefault(host, {"opened": 0, "reused": 0, "in_flight": 0})
+                entry["in_flight"] = count
+        return result
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[PooledClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> PooledClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                pool_size = settings.http_pool_size or settings.threads
+                _client = PooledClient(
+                    pool_size=pool_size,
+                    host_concurrency=settings.http_host_concurrency or pool_size,
+                    gzip=settings.http_gzip,
+                    rate=settings.http_rate_limit,
+                    burst=settings.http_rate_burst,
+                )
+    return _client
+
+
+def reset_client() -> None:
+    """Close the shared client; the next request builds a fresh pool."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    return get_client().stats()
+
+
+def _pool_gauges() -> Dict[str, int]:
+    """:func:`pool_stats` flattened to ``<host>_<counter>`` for metrics export."""
+    client = _client
+    if client is None:
+        return {}
+    return {
+        f"{_NON_METRIC_RE.sub('_', host)}_{name}": value
+        for host, counts in client.stats().items()
+        for name, value in counts.items()
+    }
+
+
+def requests_sent() -> int:
+    """HTTP requests (retries included) sent through the current shared client."""
+    return get_client().requests_sent
+
+
+def _count_retry(retry_state) -> None:
+    url = retry_state.args[1] if len(retry_state.args) > 1 else retry_state.kwargs.get("url", "")
+    metrics.inc("http_retries_total", host=urlsplit(url).netloc)
+
+
+def _should_retry(exc: BaseException) -> bool:
+    if isinstance(exc, HttpError):
+        return exc.retryable
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+def _backoff(retry_state) -> float:
+    """Honor ``Retry-After`` when given, else full-jitter exponential backoff.
+
+    Jitter keeps threads that failed together from retrying in lockstep.
+    """
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, HttpError) and exc.retry_after is not None:
+        return min(exc.retry_after, MAX_RETRY_AFTER_SECONDS) + random.uniform(0, 1)
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, 2 ** retry_state.attempt_number))
 
 
 @retry(
     reraise=True,
     stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=1, min=1, max=10),
-    retry=retry_if_exception_type(HttpError),
+    wait=_backoff,
+    retry=retry_if_exception(_should_retry),
+    before_sleep=_count_retry,
 )
 def request_json(
     method: str,
@@ -28,17 +213,33 @@ def request_json(
     pem_path: Optional[str] = None,
 ) -> Any:
     verify_path = pem_path or settings.pem_path
-    response = requests.request(
-        method,
-        url,
-        headers=headers,
-        params=params,
-        json=json_body,
-        verify=verify_path,
-        timeout=30,
-    )
+    host = urlsplit(url).netloc
+    started = time.perf_counter()
+    try:
+        response = get_client().request(
+            method,
+            url,
+            headers=headers,
+            params=params,
+            json=json_body,
+            verify=verify_path,
+            timeout=30,
+        )
+    except requests.RequestException:
+        metrics.inc("http_requests_total", host=host, status="error")
+        raise
+    finally:
+        metrics.observe("http_request_seconds", time.perf_counter() - started, host=host)
+    metrics.inc("http_requests_total", host=host, status=response.status_code)
     if response.status_code >= 400:
-        raise HttpError(f"HTTP {response.status_code}: {response.text}")
+        raise HttpError(
+            response.status_code,
+            response.text,
+            retry_after=parse_retry_after(response.headers.get("Retry-After")),
+        )
     if response.status_code == 204:
         return None
     return response.json()
+
+
+metrics.register_collector("http_pool", _pool_gauges)
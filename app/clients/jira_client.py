@@ -1,39 +1,82 @@
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import List
+from typing import Deque, Dict, Iterator, List
 
+from app.cache.cache_manager import cached, make_key
 from app.clients.http_client import request_json
 from app.models import Issue
 from app.config import settings
 
+MAX_RESULTS = 50
+# Only the fields app.models.Issue is built from; everything else (changelog,
+# rendered fields, attachments, ...) is left on the server.
+ISSUE_FIELDS = ("summary", "description", "components", "fixVersions", "updated")
 
-def fetch_issues_by_jql(jql: str) -> List[Issue]:
-    start_at = 0
-    max_results = 50
-    issues: List[Issue] = []
+
+def _fetch_issues_page(jql: str, start_at: int) -> Dict:
+    url = f"{settings.jira_base_url}/rest/api/2/search"
     headers = {"Authorization": f"Bearer {settings.jira_token}"}
-    while True:
-        url = f"{settings.jira_base_url}/rest/api/2/search"
-        params = {
-            "jql": jql,
-            "startAt": start_at,
-            "maxResults": max_results,
-        }
-        data = request_json("GET", url, headers=headers, params=params)
-        for item in data.get("issues", []):
-            fields = item.get("fields", {})
-            issues.append(
-                Issue(
-                    key=item["key"],
-                    summary=fields.get("summary"),
-                    description=fields.get("description"),
-                    components=[c.get("name") for c in fields.get("components", [])],
-                    fixversions=[v.get("name") for v in fields.get("fixVersions", [])],
-                    updated=datetime.strptime(fields.get("updated"), "%Y-%m-%dT%H:%M:%S.%f%z").replace(tzinfo=None),
-                )
-            )
-        start_at += max_results
-        if start_at >= data.get("total", 0):
-            break
-    return issues
+    params = {
+        "jql": jql,
+        "startAt": start_at,
+        "maxResults": MAX_RESULTS,
+        "fields": ",".join(ISSUE_FIELDS),
+    }
+    return request_json("GET", url, headers=headers, params=params)
+
+
+def _get_issues_page(jql: str, start_at: int, refresh: bool = False) -> Dict:
+    key = make_key("jira-page", jql, start_at, MAX_RESULTS, ISSUE_FIELDS)
+    return cached(key, lambda: _fetch_issues_page(jql, start_at), refresh=refresh)
+
+
+def _parse_issue(item: Dict) -> Issue:
+    fields = item.get("fields", {})
+    return Issue(
+        key=item["key"],
+        summary=fields.get("summary"),
+        description=fields.get("description"),
+        components=[c.get("name") for c in fields.get("components", [])],
+        fixversions=[v.get("name") for v in fields.get("fixVersions", [])],
+        updated=datetime.strptime(fields.get("updated"), "%Y-%m-%dT%H:%M:%S.%f%z").replace(tzinfo=None),
+    )
+
+
+def iter_issue_pages(jql: str, refresh: bool = False) -> Iterator[List[Issue]]:
+    """Yield parsed issues one page at a time, in ``startAt`` order.
+
+    Pages after the first are fetched concurrently, but at most
+    ``settings.threads`` are in flight or buffered at once, and raw JSON is
+    dropped as soon as its page is parsed.
+    """
+    first = _get_issues_page(jql, 0, refresh)
+    total = first.get("total", 0)
+    yield [_parse_issue(item) for item in first.get("issues", [])]
+    del first
+
+    offsets = iter(range(MAX_RESULTS, total, MAX_RESULTS))
+    window = max(settings.threads, 1)
+    with ThreadPoolExecutor(max_workers=window) as executor:
+        pending: Deque[Future] = deque()
+        for start_at in offsets:
+            pending.append(executor.submit(_get_issues_page, jql, start_at, refresh))
+            if len(pending) >= window:
+                break
+        while pending:
+            data = pending.popleft().result()
+            next_start = next(offsets, None)
+            if next_start is not None:
+                pending.append(executor.submit(_get_issues_page, jql, next_start, refresh))
+            yield [_parse_issue(item) for item in data.get("issues", [])]
+
+
+def iter_issues_by_jql(jql: str, refresh: bool = False) -> Iterator[Issue]:
+    for page in iter_issue_pages(jql, refresh=refresh):
+        yield from page
+
+
+def fetch_issues_by_jql(jql: str, refresh: bool = False) -> List[Issue]:
+    return list(iter_issues_by_jql(jql, refresh=refresh))
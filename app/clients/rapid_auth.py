@@ -1,15 +1,41 @@
+"""Rapid OAuth2 tokens, cached in memory and refreshed by a single caller.
+
+:class:`TokenManager` keeps the parsed token in an immutable snapshot, so a
+valid token is returned by reading one attribute without locks or disk I/O.
+Within ``REFRESH_AHEAD_SECONDS`` of expiry, one background thread refreshes
+it while callers keep using the current token. Once it is no longer usable,
+callers serialize on a lock: the first refreshes and the rest reuse its
+result. A failed background refresh is not retried for
+``BACKGROUND_RETRY_SECONDS``. The token file is re-read only when its mtime
+changes (e.g. another process refreshed it) and is replaced atomically.
+"""
+
 from __future__ import annotations
 
 import json
-from datetime import datetime, timedelta
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict
+from typing import Optional
 
 from app.clients.http_client import request_json
 from app.config import settings
 from app.models import RapidToken
 
+logger = logging.getLogger(__name__)
+
 TOKEN_PATH = Path("cache/rapid_token.json")
+# A token is treated as expired this long before it actually expires.
+EXPIRY_MARGIN_SECONDS = 60
+# A background refresh starts this long before expiry.
+REFRESH_AHEAD_SECONDS = 300
+# After a failed background refresh, the next one waits this long.
+BACKGROUND_RETRY_SECONDS = 30
 
 
 def load_tokens() -> RapidToken | None:
@@ -26,11 +52,19 @@ def load_tokens() -> RapidToken | None:
 
 
 def save_tokens(token: RapidToken) -> None:
+    """Write ``token`` atomically (temp file + rename) and make it current."""
     TOKEN_PATH.parent.mkdir(exist_ok=True)
     payload = token.model_dump()
     payload["obtained_at"] = token.obtained_at.isoformat()
-    with TOKEN_PATH.open("w", encoding="utf-8") as f:
-        json.dump(payload, f)
+    fd, tmp = tempfile.mkstemp(dir=TOKEN_PATH.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp, TOKEN_PATH)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    _manager.install(token, TOKEN_PATH)
 
 
 def refresh_tokens(refresh_token: str) -> RapidToken:
@@ -51,11 +85,94 @@ def refresh_tokens(refresh_token: str) -> RapidToken:
     return token
 
 
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    token: RapidToken
+    path: Path
+    mtime: Optional[int]
+    expires_at: float
+    refresh_at: float
+
+    @classmethod
+    def of(cls, token: RapidToken, path: Path) -> "_Snapshot":
+        expires = token.expires_at.replace(tzinfo=timezone.utc).timestamp() - EXPIRY_MARGIN_SECONDS
+        ahead = min(REFRESH_AHEAD_SECONDS, token.expires_in / 2)
+        return cls(token, path, _mtime(path), expires, expires - ahead)
+
+
+class TokenManager:
+    """See the module docstring."""
+
+    def __init__(self) -> None:
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        # Held while a background refresh is pending, so at most one starts.
+        self._background = threading.Lock()
+        self._retry_at = 0.0
+
+    def install(self, token: RapidToken, path: Path) -> None:
+        self._snapshot = _Snapshot.of(token, path)
+
+    def access_token(self) -> str:
+        snap = self._snapshot
+        now = time.time()
+        if snap is not None and snap.path == TOKEN_PATH and now < snap.expires_at:
+            if now >= snap.refresh_at:
+                self._refresh_in_background(snap)
+            return snap.token.access_token
+        return self._refresh(snap).token.access_token
+
+    def _current(self) -> Optional[_Snapshot]:
+        """The in-memory snapshot, re-read from disk if the file changed."""
+        snap = self._snapshot
+        if snap is None or snap.path != TOKEN_PATH or snap.mtime != _mtime(TOKEN_PATH):
+            token = load_tokens()
+            snap = self._snapshot = _Snapshot.of(token, TOKEN_PATH) if token else None
+        return snap
+
+    def _refresh(self, seen: Optional[_Snapshot]) -> _Snapshot:
+        with self._lock:
+            snap = self._current()
+            if snap is None:
+                raise RuntimeError("No Rapid token available; perform initial authentication")
+            # Someone else refreshed while we waited, or the file on disk is newer.
+            if snap is not seen and time.time() < snap.expires_at:
+                return snap
+            refresh_tokens(snap.token.refresh_token)
+            return self._snapshot
+
+    def _refresh_in_background(self, seen: _Snapshot) -> None:
+        if time.time() < self._retry_at or not self._background.acquire(blocking=False):
+            return
+        threading.Thread(
+            target=self._background_refresh, args=(seen,), name="rapid-token-refresh", daemon=True
+        ).start()
+
+    def _background_refresh(self, seen: _Snapshot) -> None:
+        try:
+            with self._lock:
+                snap = self._current()
+                if snap is None or (snap is not seen and time.time() < snap.refresh_at):
+                    return
+                refresh_tokens(snap.token.refresh_token)
+        except Exception:
+            # The current token is still valid; callers refresh synchronously
+            # once it is not.
+            logger.warning("Background Rapid token refresh failed", exc_info=True)
+            self._retry_at = time.time() + BACKGROUND_RETRY_SECONDS
+        finally:
+            self._background.release()
+
+
+_manager = TokenManager()
+
+
 def get_valid_access_token() -> str:
-    token = load_tokens()
-    if token and token.obtained_at + timedelta(seconds=token.expires_in - 60) > datetime.utcnow():
-        return token.access_token
-    if not token:
-        raise RuntimeError("No Rapid token available; perform initial authentication")
-    token = refresh_tokens(token.refresh_token)
-    return token.access_token
+    return _manager.access_token()
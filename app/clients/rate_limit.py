@@ -0,0 +1,182 @@
+"""Per-host request scheduling: token bucket, adaptive concurrency, cooldowns.
+
+Every host gets a :class:`HostScheduler` combining
+
+- an :class:`AdaptiveLimiter` capping requests in flight. It starts at the
+  configured maximum, halves on a throttling response (429/503) at most once
+  per cooldown period and grows by ``1/limit`` per success (AIMD), so threads
+  stop hitting a struggling server in lockstep;
+- a :class:`TokenBucket` bounding the request rate. It is unlimited unless
+  configured or the server advertises a fill rate (Jira / Bitbucket send
+  ``X-RateLimit-FillRate`` and ``X-RateLimit-Interval-Seconds``);
+- a shared pause, set from ``Retry-After``, that holds back every request to
+  the host rather than only the one that was throttled.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Mapping, Optional
+
+THROTTLE_STATUS = frozenset({429, 503})
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = time.time() if now is None else now
+    return max(when.timestamp() - now, 0.0)
+
+
+class TokenBucket:
+    """Blocking token bucket; ``rate <= 0`` means unlimited (pauses still apply)."""
+
+    def __init__(self, rate: float = 0.0, burst: int = 0):
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.configure(rate, burst)
+
+    def configure(self, rate: float, burst: int = 0) -> None:
+        """Set the refill ``rate`` (tokens/s) and ``burst`` (default: one second's worth)."""
+        with self._lock:
+            self.rate = max(rate, 0.0)
+            self.burst = max(burst or int(self.rate) or 1, 1)
+            self._tokens = float(self.burst)
+            self._updated = time.monotonic()
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self.rate <= 0:
+                        return
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit between ``min_limit`` and ``max_limit``."""
+
+    def __init__(self, max_limit: int, min_limit: int = 1, cooldown: float = 1.0):
+        self.max_limit = max(max_limit, 1)
+        self.min_limit = max(min(min_limit, self.max_limit), 1)
+        self.cooldown = cooldown
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._last_decrease = float("-inf")
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: Optional[bool]) -> None:
+        """``True`` shrinks the limit, ``False`` grows it, ``None`` leaves it."""
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                now = time.monotonic()
+                # One decrease per cooldown: a burst of 429s from requests that
+                # were already in flight is a single congestion signal.
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._last_decrease = now
+            elif throttled is False:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class Slot:
+    """One admitted request; report its response with :meth:`observe`."""
+
+    def __init__(self, scheduler: "HostScheduler"):
+        self.scheduler = scheduler
+        self.throttled: Optional[bool] = None
+        self.retry_after: Optional[float] = None
+
+    def observe(self, status: int, headers: Mapping[str, str]) -> None:
+        if status in THROTTLE_STATUS:
+            self.throttled = True
+        elif status < 400:
+            self.throttled = False
+        self.retry_after = self.scheduler.observe(status, headers)
+
+
+class HostScheduler:
+    """Admission control for one host; see the module docstring."""
+
+    def __init__(self, max_concurrency: int, rate: float = 0.0, burst: int = 0, min_concurrency: int = 1):
+        self.limiter = AdaptiveLimiter(max_concurrency, min_concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self._configured_rate = rate
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    @contextmanager
+    def slot(self) -> Iterator[Slot]:
+        """Wait for a concurrency slot and a token; the limit adapts on exit."""
+        self.limiter.acquire()
+        slot = Slot(self)
+        try:
+            self.bucket.acquire()
+            yield slot
+        finally:
+            self.limiter.release(slot.throttled)
+
+    def observe(self, status: int, headers: Mapping[str, str]) -> Optional[float]:
+        """Apply ``Retry-After`` and advertised rates; return the delay if any."""
+        throttled = status in THROTTLE_STATUS
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        if retry_after is not None and (throttled or status >= 500):
+            self.bucket.pause(retry_after)
+        if throttled:
+            with self._lock:
+                self.throttled += 1
+        self._advertised_rate(headers)
+        return retry_after
+
+    def stats(self) -> Dict[str, float]:
+        return {"limit": self.limiter.limit, "rate": self.bucket.rate, "throttled": self.throttled}
+
+    def _advertised_rate(self, headers: Mapping[str, str]) -> None:
+        if self._configured_rate > 0:
+            return
+        fill, interval = headers.get("X-RateLimit-FillRate"), headers.get("X-RateLimit-Interval-Seconds")
+        if not fill or not interval:
+            return
+        try:
+            rate = float(fill) / max(float(interval), 1e-9)
+            burst = int(headers.get("X-RateLimit-Limit") or 0)
+        except ValueError:
+            return
+        if rate > 0 and abs(rate - self.bucket.rate) > 1e-9:
+            self.bucket.configure(rate, burst)
@@ -27,12 +27,42 @@ class Settings(BaseSettings):
 
     openai_api_key: str = Field("", alias="OPENAI_API_KEY")
     openai_model: str = Field("gpt-4o-mini", alias="OPENAI_MODEL")
+    # "openai" or "stub" (offline, deterministic; for tests and benchmarks).
+    llm_backend: str = Field("openai", alias="LLM_BACKEND")
+    llm_stub_latency_ms: int = Field(0, alias="LLM_STUB_LATENCY_MS")
+    llm_cache_ttl_seconds: int = Field(7 * 24 * 3600, alias="LLM_CACHE_TTL_SECONDS")
+    # Map-reduce summaries: estimated prompt tokens per chunk and parallel calls.
+    llm_chunk_tokens: int = Field(6000, alias="LLM_CHUNK_TOKENS")
+    llm_workers: int = Field(4, alias="LLM_WORKERS")
 
     pem_path: str = Field("/app/certs/corp.pem", alias="PEM_PATH")
 
     cache_ttl_seconds: int = Field(3600, alias="CACHE_TTL_SECONDS")
+    cache_memory_entries: int = Field(256, alias="CACHE_MEMORY_ENTRIES")
+    cache_memory_bytes: int = Field(64 * 1024 * 1024, alias="CACHE_MEMORY_BYTES")
+    cache_max_bytes: int = Field(512 * 1024 * 1024, alias="CACHE_MAX_BYTES")
     threads: int = Field(4, alias="THREADS")
+    # 0 means "derive from threads"; see app.clients.http_client.get_client.
+    http_pool_size: int = Field(0, alias="HTTP_POOL_SIZE")
+    http_host_concurrency: int = Field(0, alias="HTTP_HOST_CONCURRENCY")
+    http_gzip: bool = Field(True, alias="HTTP_GZIP")
+    # Per-host requests/second; 0 leaves it to rates the server advertises.
+    http_rate_limit: float = Field(0.0, alias="HTTP_RATE_LIMIT")
+    http_rate_burst: int = Field(0, alias="HTTP_RATE_BURST")
+    # Stop paging a branch at the first commit already known from a sibling
+    # branch of the same repo; see app.clients.bitbucket_client.sync_pairs.
+    bitbucket_stop_at_known: bool = Field(False, alias="BITBUCKET_STOP_AT_KNOWN")
+    # Sharded process-pool matching in app.core.matching; 0 or 1 keeps it
+    # serial, as do inputs below the commit threshold.
+    match_workers: int = Field(0, alias="MATCH_WORKERS")
+    match_parallel_min_commits: int = Field(200_000, alias="MATCH_PARALLEL_MIN_COMMITS")
+    # "text" or "json" (one structured object per line); see app.logging_config.
+    log_format: str = Field("text", alias="LOG_FORMAT")
+    # Path-prefix -> component/owner map; see app.core.components.
+    components_file: str = Field("components.yaml", alias="COMPONENTS_FILE")
     faiss_enabled: bool = Field(False, alias="FAISS_ENABLED")
+    rag_top_k: int = Field(8, alias="RAG_TOP_K")
+    rag_index_max_age_days: int = Field(30, alias="RAG_INDEX_MAX_AGE_DAYS")
 
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", frozen=True
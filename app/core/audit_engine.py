@@ -1,32 +1,133 @@
 from __future__ import annotations
 
-from typing import Dict, Iterable, List, Tuple
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-from app.cache.cache_manager import read_cache, write_cache
+from app import metrics
+from app.cache import result_store
+from app.cache.cache_manager import make_key
 from app.clients import jira_client, bitbucket_client
 from app.core import matching, time_windows
-from app.models import Commit, Issue
+from app.core.columnar import CommitColumns
+from app.models import Issue
 
 
 CACHE_PREFIX = "audit"
+# Bump whenever the shape of the audit result changes; older entries are
+# then ignored instead of being served to code expecting the new shape.
+CACHE_SCHEMA_VERSION = 5
 
+ProgressCallback = Callable[[float, str], None]
+
+_JQL_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|\s+|[^\s"\']+')
+
+
+def normalize_jql(jql: str) -> str:
+    """Collapse whitespace outside quoted values so cosmetic edits share a key."""
+    tokens = []
+    for token in _JQL_TOKEN_RE.findall(jql.strip()):
+        tokens.append(" " if token.isspace() else token)
+    return "".join(tokens)
 
-def run_audit(jql: str, repo_branches: Iterable[Tuple[str, str]], force_refresh: bool = False) -> Dict:
-    cache_key = f"{CACHE_PREFIX}-{hash(jql)}"
-    if not force_refresh:
-        cached = read_cache(cache_key)
-        if cached:
-            return cached
 
-    issues = jira_client.fetch_issues_by_jql(jql)
-    start, end = time_windows.derive_window(issues)
-    commits = bitbucket_client.fetch_commits_threaded(repo_branches, start, end)
-    match = matching.match_commits(issues, commits)
-    result = {
-        "issues": [i.dict() for i in issues],
-        "commits": [c.dict() for c in commits],
+def audit_cache_key(
+    jql: str,
+    repo_branches: Iterable[Tuple[str, str]],
+    window: Optional[Tuple[str, str]] = None,
+) -> str:
+    """Deterministic key for an audit, stable across processes and hosts."""
+    pairs = sorted({f"{repo}:{branch}" for repo, branch in repo_branches})
+    return make_key(
+        CACHE_PREFIX,
+        CACHE_SCHEMA_VERSION,
+        normalize_jql(jql),
+        pairs,
+        list(window) if window else None,
+    )
+
+
+def build_result(
+    issues: List[Issue],
+    commits: CommitColumns,
+    window: Tuple[str, str],
+    extractor: Optional[matching.KeyExtractor] = None,
+) -> Dict:
+    """Match ``commits`` to ``issues`` and assemble the cached result shape."""
+    # ``links``/``unlinked`` hold indices into ``commits`` rather than copies.
+    match = matching.match_columns(issues, commits, extractor=extractor)
+    return {
+        "schema_version": CACHE_SCHEMA_VERSION,
+        "issues": [i.model_dump() for i in issues],
+        "commits": commits,
         "matching": match,
-        "window": {"start": start, "end": end},
+        "window": {"start": window[0], "end": window[1]},
     }
-    write_cache(cache_key, result)
+
+
+def cached_summary(
+    jql: str,
+    repo_branches: Iterable[Tuple[str, str]],
+    window: Optional[Tuple[str, str]] = None,
+) -> Optional[Dict]:
+    """``missing``/``coverage`` of a cached audit without loading its commits."""
+    cached = result_store.load(audit_cache_key(jql, repo_branches, window))
+    if cached is None:
+        return None
+    with cached:
+        return cached.summary() if cached["schema_version"] == CACHE_SCHEMA_VERSION else None
+
+
+def load_cached(cache_key: str) -> Optional[Dict]:
+    """The cached audit under ``cache_key``, read in full, or ``None``."""
+    cached = result_store.load(cache_key)
+    if cached is None:
+        return None
+    with cached:
+        return dict(cached) if cached["schema_version"] == CACHE_SCHEMA_VERSION else None
+
+
+def run_audit(
+    jql: str,
+    repo_branches: Iterable[Tuple[str, str]],
+    force_refresh: bool = False,
+    full_resync: bool = False,
+    window: Optional[Tuple[str, str]] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict:
+    """Audit the issues matched by ``jql`` against commits on ``repo_branches``.
+
+    The commit window is derived from issue activity unless ``window`` gives an
+    explicit ``(start_iso, end_iso)``. ``progress`` is called with
+    ``(fraction_done, stage_label)`` as each stage starts.
+
+    ``commits`` in the result is a :class:`~app.core.columnar.CommitColumns`,
+    whether it was computed or read from the cache.
+    """
+    report = progress or (lambda fraction, label: None)
+    repo_branches: List[Tuple[str, str]] = list(repo_branches)
+    cache_key = audit_cache_key(jql, repo_branches, window)
+    if not (force_refresh or full_resync):
+        with metrics.span("cache_read"):
+            cached = load_cached(cache_key)
+        if cached is not None:
+            metrics.inc("audit_cache_total", result="hit")
+            report(1.0, "Loaded from cache")
+            return cached
+        metrics.inc("audit_cache_total", result="miss")
+
+    report(0.05, "Fetching Jira issues")
+    with metrics.span("jira"):
+        issues = jira_client.fetch_issues_by_jql(jql, refresh=force_refresh or full_resync)
+    start, end = window or time_windows.derive_window(issues)
+    report(0.35, "Fetching Bitbucket commits")
+    with metrics.span("bitbucket"):
+        commits = bitbucket_client.fetch_commit_columns_threaded(
+            repo_branches, start, end, full_resync=full_resync
+        )
+    report(0.8, "Matching commits to issues")
+    with metrics.span("matching"):
+        result = build_result(issues, commits, (start, end))
+    with metrics.span("cache_write"):
+        result_store.save(cache_key, result)
+    report(1.0, "Done")
     return result
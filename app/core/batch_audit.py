@@ -0,0 +1,209 @@
+"""Audit several releases against the same repositories in one run.
+
+Running ``run_audit`` once per release re-queries Jira and re-reads the same
+Bitbucket history for every release. :func:`run_batch_audit` instead:
+
+- fetches issues once per distinct query; releases built from a fix-version
+  list share a single ``fixVersion in (...)`` search and are split locally;
+- syncs each repo/branch once for the union of every release's window;
+- scans each commit message once with a shared key extractor, then matches
+  every release against its own window of the shared commits in parallel.
+
+Each release's result has exactly the shape (and cache entry) a standalone
+``run_audit`` would produce, so later single-release runs are cache hits.
+"""
+
+from __future__ import annotations
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app import metrics
+from app.cache import result_store
+from app.clients import bitbucket_client, http_client, jira_client
+from app.config import settings
+from app.core import matching, time_windows
+from app.core.audit_engine import ProgressCallback, audit_cache_key, build_result, load_cached, normalize_jql
+from app.core.columnar import CommitColumns
+from app.models import Issue
+
+
+@dataclass(frozen=True)
+class Release:
+    """One release to audit: a display ``name`` and the JQL selecting its issues.
+
+    Releases from :func:`releases_for_fix_versions` also carry the fix version
+    and base filter so their Jira search can be shared.
+    """
+
+    name: str
+    jql: str
+    fix_version: Optional[str] = None
+    base_jql: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    results: Dict[str, Dict]
+    summary: Dict = field(default_factory=dict)
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _scoped(base_jql: Optional[str], clause: str) -> str:
+    return f"({base_jql}) AND {clause}" if base_jql else clause
+
+
+def releases_for_jql(queries: Iterable[str]) -> List[Release]:
+    """One release per distinct query (after :func:`normalize_jql`), named by it."""
+    unique: Dict[str, str] = {}
+    for jql in queries:
+        unique.setdefault(normalize_jql(jql), jql)
+    return [Release(name=jql, jql=jql) for jql in unique.values()]
+
+
+def releases_for_fix_versions(versions: Iterable[str], base_jql: Optional[str] = None) -> List[Release]:
+    """One release per fix version, optionally narrowed by ``base_jql``."""
+    return [
+        Release(name=v, jql=_scoped(base_jql, f"fixVersion = {_quote(v)}"), fix_version=v, base_jql=base_jql)
+        for v in dict.fromkeys(v.strip() for v in versions)
+        if v
+    ]
+
+
+def _fetch_issues(releases: Sequence[Release], refresh: bool) -> Tuple[Dict[str, List[Issue]], int]:
+    """Issues per release name, plus the number of Jira searches made."""
+    shared: Dict[Optional[str], List[Release]] = {}
+    single: Dict[str, List[Release]] = {}
+    for release in releases:
+        if release.fix_version is not None:
+            shared.setdefault(release.base_jql, []).append(release)
+        else:
+            single.setdefault(normalize_jql(release.jql), []).append(release)
+
+    searches: List[Tuple[str, List[Release]]] = []
+    for base_jql, group in shared.items():
+        versions = ", ".join(_quote(r.fix_version) for r in group)
+        searches.append((_scoped(base_jql, f"fixVersion in ({versions})"), group))
+    searches.extend((group[0].jql, group) for group in single.values())
+
+    with ThreadPoolExecutor(max_workers=max(min(settings.threads, len(searches)), 1)) as pool:
+        fetched = list(pool.map(lambda search: jira_client.fetch_issues_by_jql(search[0], refresh), searches))
+    by_release: Dict[str, List[Issue]] = {}
+    for (_, group), issues in zip(searches, fetched):
+        for release in group:
+            if release.fix_version is None:
+                by_release[release.name] = issues
+            else:
+                by_release[release.name] = [i for i in issues if release.fix_version in i.fixversions]
+    return by_release, len(searches)
+
+
+def _estimate_separate_requests(
+    issues: Dict[str, List[Issue]], commits: Dict[str, CommitColumns], pairs: Sequence[Tuple[str, str]]
+) -> int:
+    """Requests one cold ``run_audit`` per release would need: every Jira page
+    plus every Bitbucket page of each pair's window (at least one each)."""
+    total = 0
+    for name, release_issues in issues.items():
+        total += max(math.ceil(len(release_issues) / jira_client.MAX_RESULTS), 1)
+        columns = commits.get(name)
+        for repo, branch in pairs:
+            count = int(columns.in_pair(repo, branch).sum()) if columns is not None else 0
+            total += max(math.ceil(count / bitbucket_client.PAGE_LIMIT), 1)
+    return total
+
+
+def run_batch_audit(
+    releases: Sequence[Release],
+    repo_branches: Iterable[Tuple[str, str]],
+    force_refresh: bool = False,
+    full_resync: bool = False,
+    progress: Optional[ProgressCallback] = None,
+) -> BatchResult:
+    """Audit every release in ``releases`` against ``repo_branches``.
+
+    Results are keyed by release name. Releases whose audit is already cached
+    are served from the cache and take no part in the shared fetch. Releases
+    without any issues get no result and are listed in the summary's
+    ``empty``.
+    """
+    report = progress or (lambda fraction, label: None)
+    pairs: List[Tuple[str, str]] = list(dict.fromkeys(repo_branches))
+    sent_before = http_client.requests_sent()
+    results: Dict[str, Dict] = {}
+    todo: List[Release] = []
+    for release in releases:
+        cached = None
+        if not (force_refresh or full_resync):
+            cached = load_cached(audit_cache_key(release.jql, pairs))
+        if cached is not None:
+            results[release.name] = cached
+        else:
+            todo.append(release)
+
+    summary: Dict = {"releases": len(releases), "from_cache": len(results), "pairs": len(pairs), "empty": []}
+    if not todo:
+        report(1.0, "Loaded from cache")
+        return BatchResult(results, {**summary, "requests_sent": 0, "requests_if_separate": 0, "requests_saved": 0})
+
+    report(0.05, "Fetching Jira issues")
+    with metrics.span("jira"):
+        issues, searches = _fetch_issues(todo, refresh=force_refresh or full_resync)
+    summary["empty"] = [r.name for r in todo if not issues[r.name]]
+    todo = [r for r in todo if issues[r.name]]
+    issues = {name: found for name, found in issues.items() if found}
+    if not todo:
+        sent = http_client.requests_sent() - sent_before
+        report(1.0, "Done")
+        summary.update({"jira_searches": searches, "requests_sent": sent, "requests_if_separate": sent})
+        return BatchResult(results, {**summary, "requests_saved": 0})
+    windows = {r.name: time_windows.derive_window(issues[r.name]) for r in todo}
+    start = min(w[0] for w in windows.values())
+    end = max(w[1] for w in windows.values())
+
+    report(0.3, "Fetching Bitbucket commits")
+    with metrics.span("bitbucket"):
+        shared = bitbucket_client.fetch_commit_columns_threaded(pairs, start, end, full_resync=full_resync)
+
+    report(0.7, "Matching commits to releases")
+    with metrics.span("key_extraction"):
+        extractor = matching.warm_extractor(shared)
+
+    stages = metrics.current_stages()
+
+    def audit(release: Release) -> Tuple[str, Dict, CommitColumns]:
+        window = windows[release.name]
+        with metrics.under_stages(stages):
+            with metrics.span("matching"):
+                commits = shared.between(datetime.fromisoformat(window[0]), datetime.fromisoformat(window[1]))
+                result = build_result(issues[release.name], commits, window, extractor=extractor)
+            with metrics.span("cache_write"):
+                result_store.save(audit_cache_key(release.jql, pairs), result)
+        return release.name, result, commits
+
+    per_release: Dict[str, CommitColumns] = {}
+    with ThreadPoolExecutor(max_workers=max(settings.threads, 1)) as pool:
+        for name, result, commits in pool.map(audit, todo):
+            results[name] = result
+            per_release[name] = commits
+
+    sent = http_client.requests_sent() - sent_before
+    separate = _estimate_separate_requests(issues, per_release, pairs)
+    summary.update(
+        {
+            "window": {"start": start, "end": end},
+            "jira_searches": searches,
+            "shared_commits": len(shared),
+            "requests_sent": sent,
+            "requests_if_separate": separate,
+            "requests_saved": max(separate - sent, 0),
+        }
+    )
+    report(1.0, "Done")
+    return BatchResult(results, summary)
@@ -0,0 +1,75 @@
+"""Token-budgeted batching of prompt lines for map-reduce LLM calls."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Tuple
+
+# Rough English average for OpenAI tokenizers; close enough for budgeting.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def batch_groups(groups: Dict[str, List[str]], budget: int) -> List[Tuple[List[str], str]]:
+    """Pack grouped lines into chunks of at most ``budget`` estimated tokens.
+
+    Groups are visited in sorted order and each gets a ``## <group>`` header
+    line in its chunk, so small groups share a chunk and large groups are
+    split across consecutive chunks. Lines longer than the whole budget are
+    truncated. Returns ``(group_labels, body)`` per chunk.
+    """
+    chunks: List[Tuple[List[str], str]] = []
+    labels: List[str] = []
+    lines: List[str] = []
+    used = 0
+
+    def flush() -> None:
+        nonlocal labels, lines, used
+        if lines:
+            chunks.append((labels, "\n".join(lines)))
+        labels, lines, used = [], [], 0
+
+    for group in sorted(groups):
+        header = f"## {group}"
+        header_cost = estimate_tokens(header)
+        for line in _fit(groups[group], budget - header_cost):
+            cost = estimate_tokens(line)
+            if used + cost > budget or not labels or labels[-1] != group:
+                if used + cost + header_cost > budget:
+                    flush()
+                labels.append(group)
+                lines.append(header)
+                used += header_cost
+            lines.append(line)
+            used += cost
+    flush()
+    return chunks
+
+
+def _fit(lines: Iterable[str], budget: int) -> Iterable[str]:
+    max_chars = max(budget, 1) * CHARS_PER_TOKEN
+    for line in lines:
+        yield line if len(line) < max_chars else line[: max_chars - CHARS_PER_TOKEN]
+
+
+def pack_texts(texts: Iterable[str], budget: int) -> List[List[str]]:
+    """Greedily pack ``texts`` into batches of at most ``budget`` tokens.
+
+    Each text is capped at half the budget so every batch holds at least two
+    texts and repeated packing always converges to a single batch.
+    """
+    batches: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for text in _fit(texts, budget // 2):
+        cost = estimate_tokens(text)
+        if current and used + cost > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(text)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,331 @@
+"""Column-oriented, NumPy-backed commit storage.
+
+A :class:`CommitColumns` holds a whole commit set as a handful of arrays
+instead of one pydantic model per commit: SHAs as fixed-width bytes, repo /
+branch / author as dictionary-encoded ``int32`` codes, dates as ``int64``
+epoch milliseconds and every message in one string addressed by offsets.
+Rows are turned into :class:`~app.models.Commit` models only on request.
+
+Rows are keyed by SHA: a commit reachable from several branches (or repos) is
+one row whose (repo, branch) memberships are kept CSR-style in
+``member_offsets`` / ``member_repo_codes`` / ``member_branch_codes``. The
+row's own ``repo`` / ``branch`` is its first membership.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models import Commit
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class CommitRecord(NamedTuple):
+    """Lightweight row with the same attribute names as ``Commit``."""
+
+    sha: str
+    author: Optional[str]
+    date: datetime
+    message: str
+    repo: str
+    branch: str
+    files: Optional[List[str]] = None
+
+
+def _label(values: Iterable[str]) -> str:
+    return ",".join(dict.fromkeys(values))
+
+
+def to_ms(value: datetime) -> int:
+    return (value.replace(tzinfo=None) - _EPOCH) // timedelta(milliseconds=1)
+
+
+class _Dictionary:
+    """Assigns a stable integer code to each distinct string."""
+
+    def __init__(self) -> None:
+        self.values: List[Optional[str]] = []
+        self._codes: Dict[Optional[str], int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class CommitColumnsBuilder:
+    """Accumulates commits, straight from Bitbucket page JSON or store rows.
+
+    A SHA seen again only adds its (repo, branch) membership to the first row.
+    """
+
+    def __init__(self) -> None:
+        self._shas: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._members: List[List[Tuple[int, int]]] = []
+        self._repos = _Dictionary()
+        self._branches = _Dictionary()
+        self._authors = _Dictionary()
+        self._repo_codes: List[int] = []
+        self._branch_codes: List[int] = []
+        self._author_codes: List[int] = []
+        self._dates: List[int] = []
+        self._messages: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._shas)
+
+    def append(self, sha: str, author: Optional[str], date_ms: int, message: Optional[str], repo: str, branch: str) -> None:
+        member = (self._repos.code(repo), self._branches.code(branch))
+        row = self._rows.get(sha)
+        if row is not None:
+            if member not in self._members[row]:
+                self._members[row].append(member)
+            return
+        self._rows[sha] = len(self._shas)
+        self._shas.append(sha)
+        self._members.append([member])
+        self._author_codes.append(self._authors.code(author))
+        self._dates.append(int(date_ms))
+        self._messages.append(message or "")
+        self._repo_codes.append(member[0])
+        self._branch_codes.append(member[1])
+
+    def add_page(self, values: Iterable[Dict], repo: str, branch: str) -> None:
+        """Append the ``values`` of a Bitbucket ``/commits`` page without models."""
+        for item in values:
+            self.append(
+                item.get("id"),
+                (item.get("author", {}) or {}).get("name"),
+                int(item.get("authorTimestamp")),
+                item.get("message"),
+                repo,
+                branch,
+            )
+
+    def add_commits(self, commits: Iterable[Commit]) -> None:
+        for c in commits:
+            self.append(c.sha, c.author, to_ms(c.date), c.message, c.repo, c.branch)
+
+    def build(self) -> "CommitColumns":
+        lengths = np.fromiter((len(m) for m in self._messages), dtype=np.int64, count=len(self._messages))
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        member_offsets = np.zeros(len(self._members) + 1, dtype=np.int64)
+        np.cumsum([len(m) for m in self._members], out=member_offsets[1:])
+        members = [m for row in self._members for m in row]
+        return CommitColumns(
+            shas=np.array([s.encode("ascii") for s in self._shas], dtype=np.bytes_),
+            repo_codes=np.array(self._repo_codes, dtype=np.int32),
+            repos=self._repos.values,
+            branch_codes=np.array(self._branch_codes, dtype=np.int32),
+            branches=self._branches.values,
+            author_codes=np.array(self._author_codes, dtype=np.int32),
+            authors=self._authors.values,
+            dates_ms=np.array(self._dates, dtype=np.int64),
+            message_blob="".join(self._messages),
+            message_offsets=offsets,
+            member_offsets=member_offsets,
+            member_repo_codes=np.array([r for r, _ in members], dtype=np.int32),
+            member_branch_codes=np.array([b for _, b in members], dtype=np.int32),
+        )
+
+
+class CommitColumns:
+    """Immutable columnar commit set; see the module docstring."""
+
+    def __init__(
+        self,
+        shas: np.ndarray,
+        repo_codes: np.ndarray,
+        repos: Sequence[str],
+        branch_codes: np.ndarray,
+        branches: Sequence[str],
+        author_codes: np.ndarray,
+        authors: Sequence[Optional[str]],
+        dates_ms: np.ndarray,
+        message_blob: str,
+        message_offsets: np.ndarray,
+        member_offsets: Optional[np.ndarray] = None,
+        member_repo_codes: Optional[np.ndarray] = None,
+        member_branch_codes: Optional[np.ndarray] = None,
+    ):
+        self.shas = shas
+        self.repo_codes = repo_codes
+        self.repos = list(repos)
+        self.branch_codes = branch_codes
+        self.branches = list(branches)
+        self.author_codes = author_codes
+        self.authors = list(authors)
+        self.dates_ms = dates_ms
+        self.message_blob = message_blob
+        self.message_offsets = message_offsets
+        if member_offsets is None:
+            # One membership per row: the row's own repo and branch.
+            member_offsets = np.arange(len(shas) + 1, dtype=np.int64)
+            member_repo_codes, member_branch_codes = repo_codes, branch_codes
+        self.member_offsets = member_offsets
+        self.member_repo_codes = member_repo_codes
+        self.member_branch_codes = member_branch_codes
+
+    @classmethod
+    def from_commits(cls, commits: Iterable[Commit]) -> "CommitColumns":
+        builder = CommitColumnsBuilder()
+        builder.add_commits(commits)
+        return builder.build()
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "CommitColumns":
+        """Build from ``Commit``-shaped dicts (e.g. a cached audit's ``commits``)."""
+        builder = CommitColumnsBuilder()
+        for r in records:
+            date = r["date"]
+            if isinstance(date, str):
+                date = datetime.fromisoformat(date)
+            builder.append(r["sha"], r.get("author"), to_ms(date), r.get("message"), r["repo"], r["branch"])
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.shas)
+
+    def take(self, rows: Sequence[int]) -> "CommitColumns":
+        """A new column set holding ``rows`` in the given order."""
+        idx = np.asarray(rows, dtype=np.int64)
+        starts = self.message_offsets[idx].tolist()
+        ends = self.message_offsets[idx + 1].tolist()
+        blob = self.message_blob
+        lengths = np.asarray([e - s for s, e in zip(starts, ends)], dtype=np.int64)
+        offsets = np.zeros(len(idx) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        member_starts = self.member_offsets[idx]
+        member_counts = self.member_offsets[idx + 1] - member_starts
+        member_offsets = np.zeros(len(idx) + 1, dtype=np.int64)
+        np.cumsum(member_counts, out=member_offsets[1:])
+        member_idx = np.repeat(member_starts - member_offsets[:-1], member_counts) + np.arange(int(member_offsets[-1]))
+        return CommitColumns(
+            shas=self.shas[idx],
+            repo_codes=self.repo_codes[idx],
+            repos=self.repos,
+            branch_codes=self.branch_codes[idx],
+            branches=self.branches,
+            author_codes=self.author_codes[idx],
+            authors=self.authors,
+            dates_ms=self.dates_ms[idx],
+            message_blob="".join(blob[s:e] for s, e in zip(starts, ends)),
+            message_offsets=offsets,
+            member_offsets=member_offsets,
+            member_repo_codes=self.member_repo_codes[member_idx],
+            member_branch_codes=self.member_branch_codes[member_idx],
+        )
+
+    def between(self, start: datetime, end: datetime) -> "CommitColumns":
+        """Rows dated within the inclusive ``[start, end]`` window, order kept."""
+        dates = self.dates_ms
+        return self.take(np.flatnonzero((dates >= to_ms(start)) & (dates <= to_ms(end))))
+
+    def memberships(self, i: int) -> List[Tuple[str, str]]:
+        """Every (repo, branch) the commit in row ``i`` was seen on."""
+        lo, hi = int(self.member_offsets[i]), int(self.member_offsets[i + 1])
+        return [
+            (self.repos[r], self.branches[b])
+            for r, b in zip(self.member_repo_codes[lo:hi].tolist(), self.member_branch_codes[lo:hi].tolist())
+        ]
+
+    def in_pair(self, repo: str, branch: str) -> np.ndarray:
+        """Boolean row mask of commits that are on ``repo``/``branch``."""
+        mask = np.zeros(len(self), dtype=bool)
+        if repo not in self.repos or branch not in self.branches:
+            return mask
+        hits = (self.member_repo_codes == self.repos.index(repo)) & (
+            self.member_branch_codes == self.branches.index(branch)
+        )
+        rows = np.searchsorted(self.member_offsets, np.flatnonzero(hits), side="right") - 1
+        mask[rows] = True
+        return mask
+
+    def sha(self, i: int) -> str:
+        return self.shas[i].decode("ascii")
+
+    def message(self, i: int) -> str:
+        return self.message_blob[self.message_offsets[i]:self.message_offsets[i + 1]]
+
+    def date(self, i: int) -> datetime:
+        return _EPOCH + timedelta(milliseconds=int(self.dates_ms[i]))
+
+    def record(self, i: int) -> CommitRecord:
+        return CommitRecord(
+            sha=self.sha(i),
+            author=self.authors[self.author_codes[i]],
+            date=self.date(i),
+            message=self.message(i),
+            repo=self.repos[self.repo_codes[i]],
+            branch=self.branches[self.branch_codes[i]],
+        )
+
+    def row(self, i: int) -> Commit:
+        """Materialize one validated ``Commit``; meant for display, not loops."""
+        return Commit(**self.record(i)._asdict())
+
+    def iter_fields(self, rows: Sequence[int], block: int = 4096) -> Iterator[tuple]:
+        """Yield ``(sha, repo, branch, author, date, message)`` for ``rows``.
+
+        A commit on several repos or branches reports each as a comma-joined
+        list. Columns are gathered ``block`` rows at a time, which keeps
+        per-row NumPy indexing out of the loop without copying whole columns.
+        """
+        repos, branches, authors = self.repos, self.branches, self.authors
+        blob, offsets = self.message_blob, self.message_offsets
+        shared = np.flatnonzero(np.diff(self.member_offsets) > 1)
+        for lo in range(0, len(rows), block):
+            idx = np.asarray(rows[lo:lo + block], dtype=np.int64)
+            starts = offsets[idx].tolist()
+            ends = offsets[idx + 1].tolist()
+            multi = set(idx[np.isin(idx, shared)].tolist()) if len(shared) else ()
+            for n, (row, sha, repo, branch, author, ms) in enumerate(zip(
+                idx.tolist(),
+                self.shas[idx].tolist(),
+                self.repo_codes[idx].tolist(),
+                self.branch_codes[idx].tolist(),
+                self.author_codes[idx].tolist(),
+                self.dates_ms[idx].tolist(),
+            )):
+                if row in multi:
+                    members = self.memberships(row)
+                    repo_label = _label(r for r, _ in members)
+                    branch_label = _label(b for _, b in members)
+                else:
+                    repo_label, branch_label = repos[repo], branches[branch]
+                yield (
+                    sha.decode("ascii"),
+                    repo_label,
+                    branch_label,
+                    authors[author],
+                    _EPOCH + timedelta(milliseconds=ms),
+                    blob[starts[n]:ends[n]],
+                )
+
+    def iter_sha_messages(self) -> Iterator[tuple]:
+        blob, offsets = self.message_blob, self.message_offsets.tolist()
+        for i, sha in enumerate(self.shas.tolist()):
+            yield sha.decode("ascii"), blob[offsets[i]:offsets[i + 1]]
+
+    def __iter__(self) -> Iterator[CommitRecord]:
+        for i in range(len(self)):
+            yield self.record(i)
+
+    def to_records(self) -> List[Dict]:
+        """``Commit.model_dump()``-shaped dicts, without pydantic validation."""
+        return [r._asdict() for r in self]
+
+    def nbytes(self) -> int:
+        arrays = (
+            self.shas, self.repo_codes, self.branch_codes, self.author_codes, self.dates_ms, self.message_offsets,
+            self.member_offsets, self.member_repo_codes, self.member_branch_codes,
+        )
+        return sum(a.nbytes for a in arrays) + len(self.message_blob.encode("utf-8"))
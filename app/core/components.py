@@ -0,0 +1,157 @@
+"""Map changed file paths to components and owners, and rank regression areas.
+
+Components are declared in a YAML file (``settings.components_file``)::
+
+    components:
+      Payments:
+        paths: [services/payments, libs/billing]
+        owners: [team-payments]
+
+Path prefixes are matched per directory segment in a trie, so a lookup costs
+one step per segment of the path however many prefixes are declared, and the
+longest declared prefix wins. :func:`regression_areas` then folds every
+commit's changed files into per-component counts in one pass, without an LLM.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import yaml
+
+from app.clients import bitbucket_client
+from app.config import settings
+from app.core.columnar import CommitColumns
+
+
+@dataclass(frozen=True)
+class Component:
+    name: str
+    owners: Tuple[str, ...] = ()
+
+
+class _Node:
+    __slots__ = ("children", "component")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.component: Optional[Component] = None
+
+
+def _segments(path: str) -> List[str]:
+    return [part for part in path.strip().strip("/").split("/") if part]
+
+
+class ComponentIndex:
+    """Prefix trie from path segments to the :class:`Component` owning them."""
+
+    def __init__(self) -> None:
+        self._root = _Node()
+        self.components: Dict[str, Component] = {}
+
+    def add(self, prefix: str, component: Component) -> None:
+        node = self._root
+        for part in _segments(prefix):
+            node = node.children.setdefault(part, _Node())
+        node.component = component
+        self.components[component.name] = component
+
+    def lookup(self, path: str) -> Optional[Component]:
+        """The component of the longest declared prefix of ``path``, if any."""
+        node, found = self._root, self._root.component
+        for part in _segments(path):
+            node = node.children.get(part)
+            if node is None:
+                break
+            if node.component is not None:
+                found = node.component
+        return found
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> "ComponentIndex":
+        index = cls()
+        for name, spec in (data.get("components") or {}).items():
+            spec = spec or {}
+            component = Component(name=name, owners=tuple(spec.get("owners") or ()))
+            for prefix in spec.get("paths") or ():
+                index.add(prefix, component)
+        return index
+
+
+def load_index(path: Optional[Path] = None) -> ComponentIndex:
+    """Read the components file; a missing file gives an empty index."""
+    path = Path(path or settings.components_file)
+    if not path.exists():
+        return ComponentIndex()
+    with path.open("r", encoding="utf-8") as f:
+        return ComponentIndex.from_mapping(yaml.safe_load(f) or {})
+
+
+@dataclass
+class RegressionArea:
+    """Changes touching one component; unmapped paths group by top directory."""
+
+    component: str
+    owners: List[str]
+    mapped: bool
+    commits: int = 0
+    files: List[str] = field(default_factory=list)
+    issues: List[str] = field(default_factory=list)
+
+
+def regression_areas(
+    columns: CommitColumns,
+    changes: Mapping[str, Sequence[str]],
+    index: ComponentIndex,
+    links: Optional[Mapping[str, Iterable[int]]] = None,
+) -> List[RegressionArea]:
+    """Components touched by ``columns``' commits, most changed first.
+
+    ``changes`` maps SHA to changed paths (see
+    ``bitbucket_client.fetch_changes``); commits without an entry are skipped.
+    With the audit's ``links``, each area also lists the issues whose commits
+    touched it.
+    """
+    keys_by_row: Dict[int, List[str]] = {}
+    for key, rows in (links or {}).items():
+        for row in rows:
+            keys_by_row.setdefault(row, []).append(key)
+
+    areas: Dict[str, RegressionArea] = {}
+    files: Dict[str, Dict[str, None]] = {}
+    issues: Dict[str, Dict[str, None]] = {}
+    for row, (sha, _) in enumerate(columns.iter_sha_messages()):
+        touched = set()
+        for path in changes.get(sha, ()):
+            component = index.lookup(path)
+            if component is None:
+                parts = _segments(path)
+                name = f"{parts[0]}/" if len(parts) > 1 else "(root)"
+            else:
+                name = component.name
+            area = areas.get(name)
+            if area is None:
+                owners = list(component.owners) if component else []
+                area = areas[name] = RegressionArea(name, owners, component is not None)
+            files.setdefault(name, {})[path] = None
+            if name not in touched:
+                touched.add(name)
+                area.commits += 1
+                for key in keys_by_row.get(row, ()):
+                    issues.setdefault(name, {})[key] = None
+    for name, area in areas.items():
+        area.files = sorted(files[name])
+        area.issues = sorted(issues.get(name, ()))
+    return sorted(areas.values(), key=lambda a: (not a.mapped, -a.commits, -len(a.files), a.component))
+
+
+def areas_for_result(result: Mapping[str, Any], index: Optional[ComponentIndex] = None) -> List[RegressionArea]:
+    """Fetch (or read back) the changed files of an audit's commits and rank them."""
+    columns = result["commits"]
+    repos = columns.repos
+    changes = bitbucket_client.fetch_changes(
+        (repos[code], sha.decode("ascii")) for code, sha in zip(columns.repo_codes.tolist(), columns.shas.tolist())
+    )
+    return regression_areas(columns, changes, index or load_index(), result["matching"]["links"])
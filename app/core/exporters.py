@@ -1,28 +1,118 @@
+"""Audit exporters.
+
+The CSV, XLSX and JSON Lines writers stream one row at a time from the
+audit's commit columns, so memory stays flat and output starts immediately
+however large the audit is. Every row has the fields in ``EXPORT_FIELDS``;
+``kind`` is ``missing`` (an issue without commits), ``unlinked`` (a commit
+without a known issue) or ``link`` (one issue→commit pair).
+"""
+
 from __future__ import annotations
 
+import csv
+import json
+from datetime import date, datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator, Mapping, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+from app.cache import result_store
+from app.core.columnar import CommitColumns
+
+EXPORT_FIELDS = ("kind", "issue_key", "sha", "repo", "branch", "author", "date", "message")
+_SHEETS = (("missing", "Missing Stories"), ("unlinked", "Unlinked Commits"), ("link", "Links"))
+
+Row = Tuple[Any, ...]
+
+
+def _columns(result: Mapping[str, Any]) -> CommitColumns:
+    commits = result["commits"]
+    return commits if isinstance(commits, CommitColumns) else CommitColumns.from_records(commits)
+
+
+def iter_rows(result: Mapping[str, Any]) -> Iterator[Row]:
+    """Yield export rows: missing stories, then unlinked commits, then links."""
+    columns = _columns(result)
+    match = result["matching"]
+    for key in match["missing"]:
+        yield ("missing", key, None, None, None, None, None, None)
+    for fields in columns.iter_fields(match["unlinked"]):
+        yield ("unlinked", None) + fields
+    for key, rows in match["links"].items():
+        for fields in columns.iter_fields(rows):
+            yield ("link", key) + fields
+
+
+def _iso(row: Row) -> Row:
+    return row[:6] + (row[6].isoformat() if row[6] is not None else None,) + row[7:]
+
+
+def to_csv(result: Mapping[str, Any], path: Path) -> None:
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_FIELDS)
+        writer.writerows(map(_iso, iter_rows(result)))
+
+
+def to_jsonl(result: Mapping[str, Any], path: Path) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        for row in iter_rows(result):
+            f.write(json.dumps(dict(zip(EXPORT_FIELDS, _iso(row)))))
+            f.write("\n")
+
+
+def _cell(value: Any) -> Any:
+    # openpyxl rejects control characters that commit messages occasionally carry.
+    return ILLEGAL_CHARACTERS_RE.sub("", value) if isinstance(value, str) else value
+
+
+def to_xlsx(result: Mapping[str, Any], path: Path) -> None:
+    """Write a Summary sheet plus one sheet per row kind in write-only mode."""
+    wb = Workbook(write_only=True)
+    summary = wb.create_sheet("Summary")
+    summary.append(["coverage", "window_start", "window_end"])
+    window = result.get("window") or {}
+    summary.append([result["matching"]["coverage"], window.get("start"), window.get("end")])
+    sheets = {}
+    for kind, title in _SHEETS:
+        sheets[kind] = wb.create_sheet(title)
+        sheets[kind].append(EXPORT_FIELDS[1:])
+    for row in iter_rows(result):
+        sheets[row[0]].append([_cell(v) for v in row[1:]])
+    wb.save(path)
+
+
+EXPORTERS: Dict[str, Callable[[Mapping[str, Any], Path], None]] = {
+    ".csv": to_csv,
+    ".jsonl": to_jsonl,
+    ".xlsx": to_xlsx,
+}
 
-import pandas as pd
 
+def export(result: Mapping[str, Any], path: Path) -> None:
+    """Write ``result`` with the exporter matching ``path``'s suffix."""
+    try:
+        writer = EXPORTERS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported export format {path.suffix!r}; use one of {sorted(EXPORTERS)}") from None
+    writer(result, path)
 
-def to_csv(data: Dict[str, Any], path: Path) -> None:
-    df = pd.DataFrame(data.get("missing", []), columns=["missing_keys"])
-    df.to_csv(path, index=False)
 
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, CommitColumns):
+        return [dict(r._asdict(), memberships=value.memberships(i)) for i, r in enumerate(value)]
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
 
-def to_json(data: Dict[str, Any], path: Path) -> None:
-    import json
 
+def to_json(data: Mapping[str, Any], path: Path) -> None:
     with path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+        json.dump(dict(data), f, indent=2, default=_json_default)
 
 
-def to_xlsx(data: Dict[str, Any], path: Path) -> None:
-    with pd.ExcelWriter(path) as writer:
-        pd.DataFrame({"coverage": [data.get("coverage")]}).to_excel(
-            writer, sheet_name="Summary", index=False
-        )
-        pd.DataFrame(data.get("missing", []), columns=["missing_keys"]).to_excel(
-            writer, sheet_name="Missing Stories", index=False
-        )
+def to_audit(data: Mapping[str, Any], path: Path) -> None:
+    """Write the versioned binary format read by :func:`result_store.read_result`."""
+    result_store.write_result(path, data)
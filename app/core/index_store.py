@@ -0,0 +1,298 @@
+"""On-disk RAG index that is updated incrementally between audits.
+
+Documents are keyed by id (``issue:<key>`` / ``commit:<sha>``) with a content
+hash, so an update only re-indexes and re-embeds documents that were added or
+changed. Row ``n`` of the BM25 index and of the vector matrix always describe
+the same document; removed rows are left as tombstones (no postings, zero
+vector).
+
+All audits share one index under ``INDEX_DIR``: :meth:`PersistentCorpus.include`
+adds an audit's documents without dropping other audits', and
+:meth:`PersistentCorpus.view` searches only the audit's own rows. Each
+document records when an audit last used it; documents unused for longer than
+the ``max_age_seconds`` passed to ``include`` are dropped. Layout under
+``root``::
+
+    manifest.json       {"version", "dim", "generation", "docs": {doc_id: [hash, row, used]}}
+    <generation>/
+        bm25.json       BM25 header: k1, b, texts, metadata, terms
+        postings.npz    CSR postings and document lengths
+        vectors.npy     float32 matrix, opened memory-mapped on load
+
+A save writes a new generation directory and then replaces the manifest, so
+readers always see a complete set; older generations are removed afterwards.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.lexical_index import BM25Index
+from app.core.vector_index import Embedder, HashingEmbedder, VectorIndex, embed_batched
+from app.models import Commit, Issue
+
+INDEX_DIR = Path("cache/rag_index")
+INDEX_VERSION = 3
+# ``used`` stamps are only rewritten when older than this, so reopening an
+# unchanged index does not save a new generation every time.
+USED_RESOLUTION_SECONDS = 24 * 3600
+
+Document = Tuple[str, Tuple[str, str]]
+
+
+def issue_text(issue: Issue) -> str:
+    return f"{issue.key} {issue.summary} {issue.description} {' '.join(issue.components)}"
+
+
+def commit_text(commit: Commit) -> str:
+    return f"{commit.message}"
+
+
+def documents_for(issues: Iterable[Issue], commits: Iterable[Commit]) -> Dict[str, Document]:
+    """Map doc id to ``(text, meta)``; the same SHA on several branches is one doc."""
+    docs: Dict[str, Document] = {}
+    for issue in issues:
+        docs[f"issue:{issue.key}"] = (issue_text(issue), ("issue", issue.key))
+    for commit in commits:
+        docs.setdefault(f"commit:{commit.sha}", (commit_text(commit), ("commit", commit.sha)))
+    return docs
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path: Path, write) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class PersistentCorpus:
+    """BM25 (and optional dense) index persisted under ``root``."""
+
+    def __init__(self, root: Path, dense: bool = False, embedder: Optional[Embedder] = None):
+        self.root = Path(root)
+        self.dense = dense
+        self.embedder = embedder or HashingEmbedder()
+        self.docs: Dict[str, List] = {}
+        self.index = BM25Index()
+        self.vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._vector_index: Optional[VectorIndex] = None
+        self._load()
+
+    @property
+    def texts(self) -> List[Optional[str]]:
+        return self.index.texts
+
+    @property
+    def metadata(self) -> List[Optional[Tuple[str, str]]]:
+        return self.index.metadata
+
+    def _load(self) -> None:
+        manifest_path = self.root / "manifest.json"
+        if not manifest_path.exists():
+            return
+        with manifest_path.open("r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != INDEX_VERSION or manifest.get("dim") != self.embedder.dim:
+            return
+        generation = self.root / manifest["generation"]
+        try:
+            with (generation / "bm25.json").open("r", encoding="utf-8") as f:
+                header = json.load(f)
+            with np.load(generation / "postings.npz", allow_pickle=False) as arrays:
+                index = BM25Index.from_arrays(header, dict(arrays))
+            vectors_path = generation / "vectors.npy"
+            if self.dense and vectors_path.exists():
+                self.vectors = np.load(vectors_path, mmap_mode="r", allow_pickle=False)
+        except FileNotFoundError:
+            # Replaced by a concurrent save after we read the manifest; rebuild.
+            return
+        self.index = index
+        self.docs = manifest["docs"]
+
+    def update(self, issues: Iterable[Issue], commits: Iterable[Commit]) -> Dict[str, int]:
+        """Make the index mirror ``issues``/``commits`` and persist it.
+
+        Returns counts of ``added``, ``updated``, ``removed`` and ``unchanged``
+        documents.
+        """
+        wanted = documents_for(issues, commits)
+        return self._apply(wanted, [d for d in self.docs if d not in wanted])
+
+    def include(self, wanted: Dict[str, Document], max_age_seconds: Optional[float] = None) -> Dict[str, int]:
+        """Add or refresh the documents ``wanted`` (see :func:`documents_for`),
+        keeping every other document, and persist the index.
+
+        Other documents whose ``used`` stamp is older than ``max_age_seconds``
+        are dropped and counted as ``removed``.
+        """
+        expired: List[str] = []
+        if max_age_seconds is not None:
+            cutoff = time.time() - max_age_seconds
+            expired = [d for d, entry in self.docs.items() if d not in wanted and entry[2] < cutoff]
+        return self._apply(wanted, expired)
+
+    def _apply(self, wanted: Dict[str, Document], drop: List[str]) -> Dict[str, int]:
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        for doc_id in drop:
+            self.index.remove(self.docs.pop(doc_id)[1])
+            counts["removed"] += 1
+
+        now = int(time.time())
+        touched = False
+        pending: List[Tuple[str, str, Tuple[str, str], str]] = []
+        for doc_id, (text, meta) in wanted.items():
+            digest = _content_hash(text)
+            entry = self.docs.get(doc_id)
+            if entry is not None and entry[0] == digest:
+                counts["unchanged"] += 1
+                if now - entry[2] >= USED_RESOLUTION_SECONDS:
+                    entry[2] = now
+                    touched = True
+                continue
+            if entry is not None:
+                self.index.remove(entry[1])
+                counts["updated"] += 1
+            else:
+                counts["added"] += 1
+            pending.append((doc_id, text, meta, digest))
+
+        for doc_id, text, meta, digest in pending:
+            self.docs[doc_id] = [digest, self.index.add(text, meta), now]
+
+        changed = bool(pending or counts["removed"] or touched)
+        if len(self.index.texts) > 2 * max(len(self.index), 1):
+            self._compact()
+        if self.dense and (changed or len(self.vectors) != len(self.index.texts)):
+            self._update_vectors()
+            changed = True
+        self._vector_index = None
+        if changed:
+            self.save()
+        return counts
+
+    def _compact(self) -> None:
+        """Rebuild without tombstones once they outnumber live documents.
+
+        Live documents are re-tokenized but keep their existing vectors.
+        """
+        old_index, old_vectors = self.index, self.vectors
+        self.index = BM25Index()
+        keep: List[int] = []
+        for entry in self.docs.values():
+            row = entry[1]
+            entry[1] = self.index.add(old_index.texts[row], old_index.metadata[row])
+            keep.append(row)
+        embedded = [row for row in keep if row < len(old_vectors)]
+        if self.dense and len(embedded) == len(keep):
+            self.vectors = np.ascontiguousarray(old_vectors[keep])
+        else:
+            self.vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+
+    def _update_vectors(self) -> None:
+        """Align the vector matrix with the BM25 rows, embedding only new rows."""
+        texts = self.index.texts
+        rows = len(texts)
+        done = min(len(self.vectors), rows)
+        vectors = np.zeros((rows, self.embedder.dim), dtype=np.float32)
+        vectors[:done] = self.vectors[:done]
+        # Tombstoned rows get a zero vector so they never score.
+        dead = [row for row in range(done) if texts[row] is None]
+        vectors[dead] = 0.0
+        todo = [row for row in range(done, rows) if texts[row] is not None]
+        if todo:
+            vectors[todo] = embed_batched(self.embedder, [texts[row] for row in todo])
+        self.vectors = vectors
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Names sort by creation time, so pruning never touches a newer save.
+        generation = Path(tempfile.mkdtemp(dir=self.root, prefix=f"gen-{time.time_ns():020d}-"))
+        try:
+            header, arrays = self.index.to_arrays()
+            with (generation / "bm25.json").open("w", encoding="utf-8") as f:
+                json.dump(header, f)
+            np.savez(generation / "postings.npz", **arrays)
+            # Without dense vectors none are written: rows may have moved and
+            # stale vectors would no longer line up.
+            if self.dense:
+                np.save(generation / "vectors.npy", np.ascontiguousarray(self.vectors))
+            manifest = {
+                "version": INDEX_VERSION,
+                "dim": self.embedder.dim,
+                "generation": generation.name,
+                "docs": self.docs,
+            }
+            _atomic_write(self.root / "manifest.json", lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+        except BaseException:
+            shutil.rmtree(generation, ignore_errors=True)
+            raise
+        if self.dense:
+            self.vectors = np.load(generation / "vectors.npy", mmap_mode="r", allow_pickle=False)
+        self._prune(generation.name)
+
+    def _prune(self, current: str) -> None:
+        """Remove generations older than ``current``, pre-generation files and
+        the per-audit index directories of earlier versions.
+
+        Files still memory-mapped elsewhere may refuse deletion on Windows;
+        they are retried on the next save.
+        """
+        for path in self.root.glob("gen-*"):
+            if path.name < current:
+                shutil.rmtree(path, ignore_errors=True)
+        for path in self.root.glob("*/manifest.json"):
+            shutil.rmtree(path.parent, ignore_errors=True)
+        for name in ("bm25.pkl", "vectors.npy"):
+            try:
+                (self.root / name).unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def search(
+        self, query: str, top_k: int = 5, kind: Optional[str] = None, allowed: Optional[np.ndarray] = None
+    ) -> List[Tuple[Tuple[str, str], str]]:
+        if self.dense:
+            if self._vector_index is None:
+                self._vector_index = VectorIndex(
+                    self.index.texts, self.index.metadata, embedder=self.embedder, vectors=self.vectors
+                )
+            return self._vector_index.search(query, top_k=top_k, kind=kind, allowed=allowed)
+        return self.index.search(query, top_k=top_k, kind=kind, allowed=allowed)
+
+    def view(self, doc_ids: Iterable[str]) -> "CorpusView":
+        """Search restricted to ``doc_ids``, e.g. one audit's documents."""
+        allowed = np.zeros(len(self.index.texts), dtype=bool)
+        rows = [self.docs[d][1] for d in doc_ids if d in self.docs]
+        allowed[rows] = True
+        return CorpusView(self, allowed)
+
+
+class CorpusView:
+    """One audit's documents within a shared :class:`PersistentCorpus`.
+
+    BM25 term statistics still come from the whole corpus.
+    """
+
+    def __init__(self, corpus: PersistentCorpus, allowed: np.ndarray):
+        self.corpus = corpus
+        self.allowed = allowed
+
+    def search(self, query: str, top_k: int = 5, kind: Optional[str] = None) -> List[Tuple[Tuple[str, str], str]]:
+        return self.corpus.search(query, top_k=top_k, kind=kind, allowed=self.allowed)
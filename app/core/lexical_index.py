@@ -0,0 +1,163 @@
+"""Inverted-index BM25 search over issue and commit texts."""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Jira keys ("abc-123") stay a single token so key lookups are exact.
+TOKEN_RE = re.compile(r"[a-z][a-z0-9]*-\d+|[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over a mutable document set.
+
+    Postings are kept as ``term -> {doc_id: term_frequency}`` so documents can
+    be added and removed cheaply; at query time each term's postings are
+    compiled once into NumPy arrays of doc ids and BM25 weights, so scoring a
+    query is a handful of vectorized adds instead of a scan over every text.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.texts: List[Optional[str]] = []
+        self.metadata: List[Optional[Tuple[str, str]]] = []
+        self._doc_len: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._live = 0
+        self._total_len = 0
+        self._compiled: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lengths: Optional[np.ndarray] = None
+        self._kinds: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self._live
+
+    def to_arrays(self) -> Tuple[Dict, Dict[str, np.ndarray]]:
+        """A JSON-safe header and postings arrays that :meth:`from_arrays` restores.
+
+        Postings are stored CSR-style: term ``n`` owns ``docs``/``tfs`` entries
+        ``offsets[n]:offsets[n + 1]``.
+        """
+        terms = list(self._postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(self._postings[t]) for t in terms], out=offsets[1:])
+        total = int(offsets[-1])
+        docs = np.fromiter((d for t in terms for d in self._postings[t]), dtype=np.int64, count=total)
+        tfs = np.fromiter((tf for t in terms for tf in self._postings[t].values()), dtype=np.int64, count=total)
+        header = {"k1": self.k1, "b": self.b, "texts": self.texts, "metadata": self.metadata, "terms": terms}
+        arrays = {"offsets": offsets, "docs": docs, "tfs": tfs, "doc_len": np.asarray(self._doc_len, dtype=np.int64)}
+        return header, arrays
+
+    @classmethod
+    def from_arrays(cls, header: Dict, arrays: Dict[str, np.ndarray]) -> "BM25Index":
+        index = cls(k1=header["k1"], b=header["b"])
+        index.texts = header["texts"]
+        index.metadata = [tuple(m) if m is not None else None for m in header["metadata"]]
+        index._doc_len = arrays["doc_len"].tolist()
+        offsets, docs, tfs = arrays["offsets"].tolist(), arrays["docs"].tolist(), arrays["tfs"].tolist()
+        index._postings = {
+            term: dict(zip(docs[lo:hi], tfs[lo:hi])) for term, lo, hi in zip(header["terms"], offsets, offsets[1:])
+        }
+        index._live = sum(text is not None for text in index.texts)
+        index._total_len = sum(index._doc_len)
+        return index
+
+    def add(self, text: str, meta: Tuple[str, str]) -> int:
+        doc_id = len(self.texts)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        length = sum(counts.values())
+        self.texts.append(text)
+        self.metadata.append(meta)
+        self._doc_len.append(length)
+        self._live += 1
+        self._total_len += length
+        self._invalidate()
+        return doc_id
+
+    def remove(self, doc_id: int) -> None:
+        text = self.texts[doc_id]
+        if text is None:
+            return
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len[doc_id]
+        self._doc_len[doc_id] = 0
+        self.texts[doc_id] = None
+        self.metadata[doc_id] = None
+        self._live -= 1
+        self._invalidate()
+
+    def _invalidate(self) -> None:
+        self._compiled.clear()
+        self._lengths = None
+        self._kinds = None
+
+    def _term_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        compiled = self._compiled.get(term)
+        if compiled is not None:
+            return compiled
+        postings = self._postings.get(term)
+        if not postings:
+            return None
+        n = self._live
+        df = len(postings)
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        avgdl = self._total_len / n if n else 0.0
+        ids = np.fromiter(postings.keys(), dtype=np.int64, count=df)
+        tf = np.fromiter(postings.values(), dtype=np.float64, count=df)
+        if self._lengths is None:
+            self._lengths = np.asarray(self._doc_len, dtype=np.float64)
+        lengths = self._lengths[ids]
+        norm = self.k1 * (1 - self.b + self.b * lengths / avgdl) if avgdl else self.k1
+        weights = idf * tf * (self.k1 + 1) / (tf + norm)
+        compiled = self._compiled[term] = (ids, weights)
+        return compiled
+
+    def _kind_array(self) -> np.ndarray:
+        if self._kinds is None:
+            self._kinds = np.array([m[0] if m else "" for m in self.metadata], dtype=object)
+        return self._kinds
+
+    def search(
+        self, query: str, top_k: int = 5, kind: Optional[str] = None, allowed: Optional[np.ndarray] = None
+    ) -> List[Tuple[Tuple[str, str], str]]:
+        """Return up to ``top_k`` ``(meta, text)`` pairs ranked by BM25.
+
+        ``kind`` restricts results to documents whose metadata kind matches
+        (``"issue"`` or ``"commit"``); ``allowed``, a boolean mask over rows,
+        to a subset of the documents.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        arrays = [a for a in (self._term_arrays(t) for t in terms) if a is not None]
+        if not arrays or top_k <= 0:
+            return []
+        scores = np.zeros(len(self.texts), dtype=np.float64)
+        for ids, weights in arrays:
+            scores[ids] += weights
+        candidates = np.flatnonzero(scores > 0)
+        if kind is not None:
+            candidates = candidates[self._kind_array()[candidates] == kind]
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+        if len(candidates) > top_k:
+            part = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+            candidates = candidates[part]
+        # Highest score first; equal scores keep insertion order.
+        order = sorted(candidates.tolist(), key=lambda d: (-scores[d], d))
+        return [(self.metadata[d], self.texts[d]) for d in order]
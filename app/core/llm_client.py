@@ -1,23 +1,59 @@
 from __future__ import annotations
 
-from typing import Iterable, List
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 try:
     from openai import OpenAI
 except Exception:  # pragma: no cover
     OpenAI = None
 
+from app.cache.cache_manager import make_key, read_cache, write_cache
 from app.config import settings
+from app.core.chunking import batch_groups, estimate_tokens, pack_texts
+from app.core.rag_engine import Hit, Searchable, commit_fingerprint, retrieve
 from app.models import Commit, Issue
 
+logger = logging.getLogger(__name__)
+
+PartialCallback = Callable[[str, str], None]
+
+_client = None
+_client_lock = threading.Lock()
+_in_flight: Dict[str, Future] = {}
+_in_flight_lock = threading.Lock()
+
 
 def _get_client() -> OpenAI:
+    global _client
     if OpenAI is None:
         raise RuntimeError("openai package not installed")
-    return OpenAI(api_key=settings.openai_api_key)
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(api_key=settings.openai_api_key)
+    return _client
 
 
-def _chat(prompt: str) -> str:
+def _stub_complete(prompt: str) -> str:
+    """Offline backend: deterministic output, optional simulated latency."""
+    if settings.llm_stub_latency_ms:
+        time.sleep(settings.llm_stub_latency_ms / 1000)
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    first_line = prompt.splitlines()[0] if prompt else ""
+    return f"[stub {settings.openai_model} {digest}] {first_line}"
+
+
+def _complete(prompt: str) -> str:
+    if settings.llm_backend == "stub":
+        return _stub_complete(prompt)
     client = _get_client()
     resp = client.chat.completions.create(
         model=settings.openai_model,
@@ -26,6 +62,46 @@ def _chat(prompt: str) -> str:
     return resp.choices[0].message.content.strip()
 
 
+def normalize_prompt(prompt: str) -> str:
+    """Strip trailing/duplicate whitespace that does not change the request."""
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in prompt.strip().splitlines()]
+    return "\n".join(lines)
+
+
+def _chat(prompt: str) -> str:
+    """Answer ``prompt``, reusing a cached or in-flight identical request."""
+    prompt = normalize_prompt(prompt)
+    logger.info("LLM prompt: ~%d tokens", estimate_tokens(prompt))
+    key = make_key("llm", settings.llm_backend, settings.openai_model, prompt)
+    cached = read_cache(key, ttl_seconds=settings.llm_cache_ttl_seconds)
+    if cached is not None:
+        return cached
+
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        owner = future is None
+        if owner:
+            future = _in_flight[key] = Future()
+    if not owner:
+        return future.result()
+
+    try:
+        # A request that finished between the first lookup and taking
+        # ownership has already cached its answer.
+        answer = read_cache(key, ttl_seconds=settings.llm_cache_ttl_seconds)
+        if answer is None:
+            answer = _complete(prompt)
+            write_cache(key, answer)
+        future.set_result(answer)
+        return answer
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+
+
 def summarize_missing(missing_keys: Iterable[str]) -> str:
     if not missing_keys:
         return "All stories are linked to commits."
@@ -36,13 +112,164 @@ def summarize_missing(missing_keys: Iterable[str]) -> str:
     return _chat(prompt)
 
 
+@dataclass
+class SummaryResult:
+    text: str
+    partials: List[str] = field(default_factory=list)
+    chunks: int = 1
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Estimated prompt tokens of every call made, in the order they were built.
+    prompt_tokens: List[int] = field(default_factory=list)
+
+
+@dataclass
+class GroundedAnswer:
+    text: str
+    sources: List[Tuple[str, str]]
+    prompt_tokens: int
+
+
+def _run_concurrently(prompts: List[str], labels: List[str], on_partial: Optional[PartialCallback]) -> List[str]:
+    """Send ``prompts`` on a bounded pool; report each answer as it lands.
+
+    ``on_partial`` runs on the calling thread (so Streamlit can render from
+    it) in completion order; the returned list keeps prompt order.
+    """
+    results: List[str] = [""] * len(prompts)
+    with ThreadPoolExecutor(max_workers=max(settings.llm_workers, 1)) as pool:
+        futures = {pool.submit(_chat, prompt): n for n, prompt in enumerate(prompts)}
+        for fut in as_completed(futures):
+            n = futures[fut]
+            results[n] = fut.result()
+            if on_partial is not None:
+                on_partial(labels[n], results[n])
+    return results
+
+
+def map_reduce_summary(
+    instruction: str,
+    groups: Dict[str, List[str]],
+    reduce_instruction: str,
+    on_partial: Optional[PartialCallback] = None,
+) -> SummaryResult:
+    """Summarize grouped lines that may not fit in one prompt.
+
+    Lines are packed into chunks of ``settings.llm_chunk_tokens`` estimated
+    tokens; each chunk is summarized concurrently (map) and the partial
+    answers are merged, in token-budgeted rounds if needed (reduce). Input
+    that fits in one chunk is sent as the single prompt ``instruction:\n``
+    followed by the lines.
+    """
+    budget = settings.llm_chunk_tokens
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    lines = [line for group in sorted(groups) for line in groups[group]]
+    single = f"{instruction}:\n" + "\n".join(lines)
+    if estimate_tokens(single) <= budget:
+        text = _chat(single)
+        timings["map"] = timings["total"] = time.perf_counter() - started
+        return SummaryResult(text=text, partials=[text], timings=timings, prompt_tokens=[estimate_tokens(single)])
+
+    chunks = batch_groups(groups, budget - estimate_tokens(instruction) - 16)
+    timings["batch"] = time.perf_counter() - started
+    prompts = [f"{instruction} (part {n + 1} of {len(chunks)}):\n{body}" for n, (_, body) in enumerate(chunks)]
+    labels = [", ".join(dict.fromkeys(group_labels)) for group_labels, _ in chunks]
+    prompt_tokens = [estimate_tokens(p) for p in prompts]
+    mark = time.perf_counter()
+    partials = _run_concurrently(prompts, labels, on_partial)
+    timings["map"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    layer = partials
+    reduce_budget = budget - estimate_tokens(reduce_instruction) - 16
+    while len(layer) > 1:
+        prompts = [f"{reduce_instruction}:\n" + "\n\n".join(batch) for batch in pack_texts(layer, reduce_budget)]
+        prompt_tokens.extend(estimate_tokens(p) for p in prompts)
+        layer = [_chat(prompts[0])] if len(prompts) == 1 else _run_concurrently(prompts, ["reduce"] * len(prompts), None)
+    timings["reduce"] = time.perf_counter() - mark
+    timings["total"] = time.perf_counter() - started
+    return SummaryResult(
+        text=layer[0], partials=partials, chunks=len(chunks), timings=timings, prompt_tokens=prompt_tokens
+    )
+
+
+def _focused(hits: List[Hit]) -> set:
+    return {meta[1] for meta, _ in hits}
+
+
+def regression_summary(
+    commits: Iterable[Commit],
+    on_partial: Optional[PartialCallback] = None,
+    corpus: Optional[Searchable] = None,
+    focus: Optional[str] = None,
+) -> SummaryResult:
+    """Regression suggestions from distinct commit messages, grouped by repo.
+
+    Near-identical messages (the same change merged or cherry-picked onto
+    several branches) are sent once. With ``corpus`` and ``focus``, only the
+    commits retrieved for ``focus`` are used.
+    """
+    keep = None
+    if corpus is not None and focus:
+        keep = _focused(corpus.search(focus, top_k=settings.rag_top_k * 4, kind="commit"))
+    by_repo: Dict[str, List[str]] = defaultdict(list)
+    seen = set()
+    for c in commits:
+        if keep is not None and c.sha not in keep:
+            continue
+        fp = commit_fingerprint(c.message)
+        if fp in seen:
+            continue
+        seen.add(fp)
+        by_repo[c.repo].append(c.message)
+    return map_reduce_summary(
+        "Suggest regression test areas based on these commit messages",
+        by_repo,
+        "Merge these partial regression test suggestions into one deduplicated, prioritized list",
+        on_partial,
+    )
+
+
+def release_notes(
+    issues: Iterable[Issue],
+    on_partial: Optional[PartialCallback] = None,
+    corpus: Optional[Searchable] = None,
+    focus: Optional[str] = None,
+) -> SummaryResult:
+    """Release notes grouped by component; ``focus`` narrows them via ``corpus``."""
+    keep = None
+    if corpus is not None and focus:
+        keep = _focused(corpus.search(focus, top_k=settings.rag_top_k * 4, kind="issue"))
+    by_component: Dict[str, List[str]] = defaultdict(list)
+    for i in issues:
+        if keep is not None and i.key not in keep:
+            continue
+        by_component[i.components[0] if i.components else "Other"].append(f"- {i.key}: {i.summary}")
+    return map_reduce_summary(
+        "Generate concise release notes from the following issues",
+        by_component,
+        "Merge these partial release notes into one concise, deduplicated set of release notes",
+        on_partial,
+    )
+
+
+def answer_question(question: str, corpus: Searchable, top_k: Optional[int] = None) -> GroundedAnswer:
+    """Answer ``question`` from the top retrieved issues and commits only."""
+    hits = retrieve(corpus, question, top_k=top_k or settings.rag_top_k)
+    if not hits:
+        return GroundedAnswer("No matching issues or commits found.", [], 0)
+    context = "\n".join(f"[{kind} {ident}] {text}" for (kind, ident), text in hits)
+    prompt = (
+        "You are a release auditor. Answer the question using only the context below and "
+        "cite the [issue KEY] / [commit SHA] entries you relied on. If the context is "
+        "insufficient, say so.\n\nContext:\n" + context + "\n\nQuestion: " + question
+    )
+    return GroundedAnswer(_chat(prompt), [meta for meta, _ in hits], estimate_tokens(prompt))
+
+
 def suggest_regression_areas(commits: Iterable[Commit]) -> str:
-    msgs = [c.message for c in commits]
-    prompt = "Suggest regression test areas based on these commit messages:\n" + "\n".join(msgs)
-    return _chat(prompt)
+    return regression_summary(commits).text
 
 
 def release_notes_summary(issues: Iterable[Issue]) -> str:
-    summaries = [f"- {i.key}: {i.summary}" for i in issues]
-    prompt = "Generate concise release notes from the following issues:\n" + "\n".join(summaries)
-    return _chat(prompt)
+    return release_notes(issues).text
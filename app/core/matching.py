@@ -1,25 +1,116 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, Iterable, List, Set
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple, TypeVar
 
+import numpy as np
+
+from app.config import settings
+from app.core.columnar import CommitColumns
 from app.models import Commit, Issue
 
+T = TypeVar("T")
+
 JIRA_KEY_RE = re.compile(r"[A-Z][A-Z0-9]+-\d+")
+_findall = JIRA_KEY_RE.findall
+
+
+def extract_keys(message: Optional[str], projects: Optional[FrozenSet[str]] = None) -> Tuple[str, ...]:
+    """Return the distinct Jira keys in ``message`` in order of first mention.
+
+    When ``projects`` is given, keys from other project prefixes are dropped.
+    """
+    if not message or "-" not in message:
+        return ()
+    found = _findall(message)
+    keys = tuple(dict.fromkeys(found)) if len(found) > 1 else tuple(found)
+    if projects is not None:
+        keys = tuple(k for k in keys if k.partition("-")[0] in projects)
+    return keys
+
+
+class KeyExtractor:
+    """Extracts keys once per commit SHA.
+
+    The same commit reached from several branches (or repeated audits sharing
+    an extractor) is only scanned by the regex the first time.
+    """
+
+    def __init__(self, projects: Optional[Iterable[str]] = None):
+        self.projects = frozenset(projects) if projects is not None else None
+        self._by_sha: Dict[str, Tuple[str, ...]] = {}
 
+    def keys(self, sha: str, message: Optional[str]) -> Tuple[str, ...]:
+        keys = self._by_sha.get(sha)
+        if keys is None:
+            keys = self._by_sha[sha] = extract_keys(message, self.projects)
+        return keys
 
-def match_commits(issues: Iterable[Issue], commits: Iterable[Commit]) -> Dict:
+    def keys_for(self, commits: Iterable[Commit]) -> Iterable[Tuple[Commit, Tuple[str, ...]]]:
+        """Yield ``(commit, keys)`` pairs; the hot loop of :func:`match_commits`."""
+        by_sha = self._by_sha
+        projects = self.projects
+        for commit in commits:
+            sha = commit.sha
+            keys = by_sha.get(sha)
+            if keys is None:
+                keys = by_sha[sha] = extract_keys(commit.message, projects)
+            yield commit, keys
+
+
+def warm_extractor(columns: CommitColumns, projects: Optional[Iterable[str]] = None) -> KeyExtractor:
+    """A :class:`KeyExtractor` that has already scanned every SHA in ``columns``.
+
+    Share it between matches over subsets of ``columns`` (e.g. one per release)
+    so each message is scanned once overall; afterwards it is only read.
+    """
+    extractor = KeyExtractor(projects)
+    keys = extractor.keys
+    for sha, message in columns.iter_sha_messages():
+        keys(sha, message)
+    return extractor
+
+
+def _prepare(
+    issues: Iterable[Issue],
+    restrict_to_projects: bool,
+    extractor: Optional[KeyExtractor],
+) -> Tuple[Set[str], KeyExtractor]:
     issue_keys: Set[str] = {i.key for i in issues}
+    if extractor is None:
+        projects = {k.partition("-")[0] for k in issue_keys} if restrict_to_projects else None
+        extractor = KeyExtractor(projects)
+    return issue_keys, extractor
+
+
+def _link(issue_keys: Set[str], keyed: Iterable[Tuple[T, Tuple[str, ...]]]) -> Dict:
+    """Shared merge loop: ``keyed`` yields ``(item, keys)`` in commit order."""
     found_keys: Set[str] = set()
-    commit_map: Dict[str, List[Commit]] = {}
-    commits_list = list(commits)
-    for commit in commits_list:
-        keys = set(JIRA_KEY_RE.findall(commit.message or ""))
+    commit_map: Dict[str, List[T]] = {}
+    unlinked: List[T] = []
+    for item, keys in keyed:
+        if not keys:
+            unlinked.append(item)
+            continue
+        linked = False
         for key in keys:
-            commit_map.setdefault(key, []).append(commit)
-        found_keys.update(keys & issue_keys)
+            bucket = commit_map.get(key)
+            if bucket is None:
+                commit_map[key] = [item]
+            else:
+                bucket.append(item)
+            if key in issue_keys:
+                found_keys.add(key)
+                linked = True
+        if not linked:
+            unlinked.append(item)
+    return _result(issue_keys, found_keys, unlinked, commit_map)
+
+
+def _result(issue_keys: Set[str], found_keys: Set[str], unlinked: List, commit_map: Dict[str, List]) -> Dict:
     missing = sorted(issue_keys - found_keys)
-    unlinked = [c for c in commits_list if not (set(JIRA_KEY_RE.findall(c.message or "")) & issue_keys)]
     coverage = (1 - len(missing) / len(issue_keys)) * 100 if issue_keys else 0
     return {
         "missing": missing,
@@ -27,3 +118,114 @@ def match_commits(issues: Iterable[Issue], commits: Iterable[Commit]) -> Dict:
         "coverage": coverage,
         "links": commit_map,
     }
+
+
+def _match_shard(
+    args: Tuple[List[Tuple[str, Optional[str]]], FrozenSet[str], Optional[FrozenSet[str]]]
+) -> Tuple[Dict[str, List[int]], List[int], Set[str]]:
+    """Worker side of :func:`_match_sharded`: extract and link one shard.
+
+    Items are positions within the shard, so only ``(sha, message)`` pairs
+    and small index lists cross the process boundary.
+    """
+    rows, issue_keys, projects = args
+    keys = KeyExtractor(projects).keys
+    part = _link(set(issue_keys), ((i, keys(sha, message)) for i, (sha, message) in enumerate(rows)))
+    return part["links"], part["unlinked"], issue_keys - set(part["missing"])
+
+
+def _match_sharded(
+    issue_keys: Set[str],
+    projects: Optional[FrozenSet[str]],
+    pairs: Iterable[Tuple[str, Optional[str]]],
+    items: Sequence[T],
+    workers: int,
+) -> Dict:
+    """Split ``pairs`` into one contiguous shard per worker and merge the parts.
+
+    Parts are merged in shard order, so every ``links`` bucket, the
+    ``unlinked`` list and the key order of ``links`` match :func:`_link`.
+    """
+    size = -(-len(items) // workers)
+    pairs = iter(pairs)
+    shards = [list(islice(pairs, size)) for _ in range(0, len(items), size)]
+    frozen = frozenset(issue_keys)
+    found_keys: Set[str] = set()
+    commit_map: Dict[str, List[T]] = {}
+    unlinked: List[T] = []
+    offset = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(_match_shard, [(shard, frozen, projects) for shard in shards])
+        for shard, (links, shard_unlinked, found) in zip(shards, parts):
+            for key, positions in links.items():
+                bucket = commit_map.get(key)
+                if bucket is None:
+                    bucket = commit_map[key] = []
+                bucket.extend(items[offset + i] for i in positions)
+            unlinked.extend(items[offset + i] for i in shard_unlinked)
+            found_keys |= found
+            offset += len(shard)
+    return _result(issue_keys, found_keys, unlinked, commit_map)
+
+
+def _shard_workers(count: int, extractor: Optional[KeyExtractor], workers: Optional[int]) -> int:
+    """Worker count for a match over ``count`` commits; 0 keeps it serial.
+
+    A caller-supplied extractor already caches its keys, so it stays serial.
+    """
+    workers = settings.match_workers if workers is None else workers
+    if extractor is not None or workers < 2 or count < settings.match_parallel_min_commits:
+        return 0
+    return workers
+
+
+def match_commits(
+    issues: Iterable[Issue],
+    commits: Iterable[Commit],
+    restrict_to_projects: bool = False,
+    extractor: Optional[KeyExtractor] = None,
+    workers: Optional[int] = None,
+) -> Dict:
+    """Link commits to issues in a single pass over ``commits``.
+
+    With ``restrict_to_projects``, only keys whose project prefix appears in
+    the issue set are recorded in ``links``. ``workers`` (default
+    ``settings.match_workers``) above 1 shards matching over a process pool
+    once there are ``settings.match_parallel_min_commits`` commits; the
+    result is identical to the serial path.
+    """
+    if (settings.match_workers if workers is None else workers) > 1:
+        commits = commits if isinstance(commits, list) else list(commits)
+        shards = _shard_workers(len(commits), extractor, workers)
+        if shards:
+            issue_keys, extractor = _prepare(issues, restrict_to_projects, None)
+            pairs = ((c.sha, c.message) for c in commits)
+            return _match_sharded(issue_keys, extractor.projects, pairs, commits, shards)
+    issue_keys, extractor = _prepare(issues, restrict_to_projects, extractor)
+    return _link(issue_keys, extractor.keys_for(commits))
+
+
+def match_columns(
+    issues: Iterable[Issue],
+    columns: CommitColumns,
+    restrict_to_projects: bool = False,
+    extractor: Optional[KeyExtractor] = None,
+    workers: Optional[int] = None,
+) -> Dict:
+    """:func:`match_commits` over a :class:`CommitColumns` without building models.
+
+    ``links`` and ``unlinked`` hold row indices into ``columns``. Distinct
+    SHAs are found with NumPy first, so each message is sliced and scanned
+    once however many branches carry it. ``workers`` shards the match as in
+    :func:`match_commits`.
+    """
+    shards = _shard_workers(len(columns), extractor, workers)
+    issue_keys, extractor = _prepare(issues, restrict_to_projects, extractor)
+    if shards:
+        return _match_sharded(issue_keys, extractor.projects, columns.iter_sha_messages(), range(len(columns)), shards)
+    if not len(columns):
+        return _link(issue_keys, ())
+    shas, first, inverse = np.unique(columns.shas, return_index=True, return_inverse=True)
+    keys = extractor.keys
+    distinct = [keys(sha.decode("ascii"), columns.message(i)) for sha, i in zip(shas.tolist(), first.tolist())]
+    return _link(issue_keys, ((i, distinct[u]) for i, u in enumerate(inverse.ravel().tolist())))
@@ -1,41 +1,118 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Tuple
-
-try:
-    import faiss  # type: ignore
-except Exception:  # pragma: no cover
-    faiss = None
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Protocol, Tuple
 
 from app.config import settings
+from app.core import index_store
+from app.core.index_store import CorpusView, PersistentCorpus, commit_text, documents_for, issue_text
+from app.core.lexical_index import BM25Index
+from app.core.vector_index import Embedder, VectorIndex
 from app.models import Commit, Issue
 
 
+Hit = Tuple[Tuple[str, str], str]
+
+# A merge header line, also when it is the whole message.
+_MERGE_PREFIX_RE = re.compile(
+    r"^(merge (pull request|branch|remote-tracking branch)\b.*?(\n+|$)|merged in \S+.*?(\n+|$))", re.I
+)
+_CHERRY_PICK_RE = re.compile(r"\(cherry[ -]picked from commit [0-9a-f]+\)", re.I)
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+class Searchable(Protocol):
+    def search(self, query: str, top_k: int = 5, kind: Optional[str] = None) -> List[Hit]:
+        ...
+
+
+def commit_fingerprint(message: str) -> str:
+    """Normalize a commit message so merges and cherry-picks of it compare equal.
+
+    A bare merge commit (header only) has an empty fingerprint.
+    """
+    text = _CHERRY_PICK_RE.sub("", message or "")
+    text = _MERGE_PREFIX_RE.sub("", text.strip())
+    return _NON_WORD_RE.sub(" ", text.lower()).strip()
+
+
+def retrieve(corpus: Searchable, query: str, top_k: int = 8) -> List[Hit]:
+    """Top-``top_k`` issues and top-``top_k`` distinct commits for ``query``.
+
+    Commits are over-fetched and near-identical messages (merge commits,
+    cherry-picks across branches) collapsed before trimming to ``top_k``.
+    """
+    hits = list(corpus.search(query, top_k=top_k, kind="issue"))
+    seen = set()
+    commits: List[Hit] = []
+    for meta, text in corpus.search(query, top_k=top_k * 4, kind="commit"):
+        fp = commit_fingerprint(text)
+        if fp in seen:
+            continue
+        seen.add(fp)
+        commits.append((meta, text))
+        if len(commits) >= top_k:
+            break
+    return hits + commits
+
+
 class SimpleCorpus:
-    def __init__(self, texts: List[str], metadata: List[Tuple[str, str]]):
+    """Issue and commit texts with a BM25 index built once at construction.
+
+    With ``dense=True`` a vector index is built as well and answers searches
+    (FAISS when installed, NumPy brute force otherwise).
+    """
+
+    def __init__(
+        self,
+        texts: List[str],
+        metadata: List[Tuple[str, str]],
+        dense: bool = False,
+        embedder: Optional[Embedder] = None,
+    ):
         self.texts = texts
         self.metadata = metadata
+        self.index = BM25Index()
+        for text, meta in zip(texts, metadata):
+            self.index.add(text, meta)
+        self.vector_index = VectorIndex(texts, metadata, embedder=embedder) if dense else None
 
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, str, str]]:
-        results = []
-        q = query.lower()
-        for text, meta in zip(self.texts, self.metadata):
-            score = text.lower().count(q)
-            if score:
-                results.append((score, text, meta))
-        results.sort(reverse=True)
-        return [(m, t) for s, t, m in results[:top_k]]
+    def search(self, query: str, top_k: int = 5, kind: Optional[str] = None) -> List[Hit]:
+        if self.vector_index is not None:
+            return self.vector_index.search(query, top_k=top_k, kind=kind)
+        return self.index.search(query, top_k=top_k, kind=kind)
 
 
-def build_corpus(issues: Iterable[Issue], commits: Iterable[Commit]) -> SimpleCorpus:
+def build_corpus(
+    issues: Iterable[Issue], commits: Iterable[Commit], dense: Optional[bool] = None
+) -> SimpleCorpus:
+    """Build the search corpus; ``dense`` defaults to ``settings.faiss_enabled``."""
     texts: List[str] = []
     metadata: List[Tuple[str, str]] = []
     for issue in issues:
-        text = f"{issue.key} {issue.summary} {issue.description} {' '.join(issue.components)}"
-        texts.append(text)
+        texts.append(issue_text(issue))
         metadata.append(("issue", issue.key))
     for commit in commits:
-        text = f"{commit.message}"
-        texts.append(text)
+        texts.append(commit_text(commit))
         metadata.append(("commit", commit.sha))
-    return SimpleCorpus(texts, metadata)
+    return SimpleCorpus(texts, metadata, dense=settings.faiss_enabled if dense is None else dense)
+
+
+def open_corpus(
+    issues: Iterable[Issue],
+    commits: Iterable[Commit],
+    root: Optional[Path] = None,
+    dense: Optional[bool] = None,
+) -> CorpusView:
+    """Add this audit's documents to the shared on-disk index and search only
+    them; ``root`` overrides ``index_store.INDEX_DIR``.
+
+    Documents no audit used for ``settings.rag_index_max_age_days`` are dropped.
+    """
+    docs = documents_for(issues, commits)
+    corpus = PersistentCorpus(
+        root if root is not None else index_store.INDEX_DIR, dense=settings.faiss_enabled if dense is None else dense
+    )
+    corpus.include(docs, max_age_seconds=settings.rag_index_max_age_days * 86400)
+    return corpus.view(docs)
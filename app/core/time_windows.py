@@ -10,10 +10,17 @@ DEFAULT_BUFFER_DAYS = 7
 
 
 def derive_window(issues: Iterable[Issue], buffer_days: int = DEFAULT_BUFFER_DAYS) -> Tuple[str, str]:
-    """Return (start_iso, end_iso) covering all issue updates with buffer."""
-    issues = list(issues)
-    if not issues:
+    """Return (start_iso, end_iso) covering all issue updates with buffer.
+
+    ``issues`` is consumed in a single pass, so it may be a stream."""
+    min_date = max_date = None
+    for issue in issues:
+        if min_date is None or issue.updated < min_date:
+            min_date = issue.updated
+        if max_date is None or issue.updated > max_date:
+            max_date = issue.updated
+    if min_date is None:
         raise ValueError("No issues provided")
-    min_date = min(i.updated for i in issues) - timedelta(days=buffer_days)
-    max_date = max(i.updated for i in issues) + timedelta(days=buffer_days)
-    return min_date.isoformat(), max_date.isoformat()
+    start = min_date - timedelta(days=buffer_days)
+    end = max_date + timedelta(days=buffer_days)
+    return start.isoformat(), end.isoformat()
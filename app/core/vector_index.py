@@ -0,0 +1,145 @@
+"""Dense retrieval over issue and commit texts.
+
+Texts are embedded in batches into one contiguous float32 matrix and searched
+by cosine similarity, through FAISS when it is installed and a NumPy
+brute-force scan otherwise.
+"""
+
+from __future__ import annotations
+
+import math
+import zlib
+from typing import List, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import faiss  # type: ignore
+except Exception:  # pragma: no cover
+    faiss = None
+
+from app.core.lexical_index import tokenize
+
+DEFAULT_DIM = 256
+EMBED_BATCH_SIZE = 1024
+# Below this many vectors an exact flat index is both fast and precise.
+IVF_MIN_VECTORS = 50_000
+
+
+class Embedder(Protocol):
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return an ``(len(texts), dim)`` float32 array of unit vectors."""
+
+
+class HashingEmbedder:
+    """Deterministic offline embedder using the signed hashing trick.
+
+    Each token (and adjacent token pair) is hashed with CRC32 into one of
+    ``dim`` buckets with a hash-derived sign and a sublinear TF weight; rows
+    are L2-normalized so inner product equals cosine similarity.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts: dict = {}
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                bucket = h % self.dim
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                counts[bucket] = counts.get(bucket, 0.0) + sign
+            for bucket, value in counts.items():
+                out[row, bucket] = math.copysign(1.0 + math.log(abs(value)), value) if value else 0.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+def embed_batched(embedder: Embedder, texts: Sequence[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+    """Embed ``texts`` batch by batch into one preallocated contiguous array."""
+    vectors = np.empty((len(texts), embedder.dim), dtype=np.float32)
+    for start in range(0, len(texts), batch_size):
+        vectors[start:start + batch_size] = embedder.embed(texts[start:start + batch_size])
+    return vectors
+
+
+class VectorIndex:
+    """Top-k cosine search returning the same ``(meta, text)`` shape as BM25."""
+
+    def __init__(
+        self,
+        texts: List[str],
+        metadata: List[Tuple[str, str]],
+        embedder: Optional[Embedder] = None,
+        use_faiss: Optional[bool] = None,
+        vectors: Optional[np.ndarray] = None,
+    ):
+        self.texts = texts
+        self.metadata = metadata
+        self.embedder = embedder or HashingEmbedder()
+        self.vectors = vectors if vectors is not None else embed_batched(self.embedder, texts)
+        self.use_faiss = (faiss is not None) if use_faiss is None else (use_faiss and faiss is not None)
+        self._faiss_index = self._build_faiss() if self.use_faiss else None
+
+    def _build_faiss(self):
+        dim = self.embedder.dim
+        n = len(self.vectors)
+        vectors = np.ascontiguousarray(self.vectors)
+        if n >= IVF_MIN_VECTORS:
+            nlist = int(math.sqrt(n))
+            index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            index.nprobe = max(nlist // 16, 8)
+        else:
+            index = faiss.IndexFlatIP(dim)
+        index.add(vectors)
+        return index
+
+    def _scores(self, query_vec: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._faiss_index is not None:
+            scores, ids = self._faiss_index.search(query_vec[None, :], k)
+            keep = ids[0] >= 0
+            return ids[0][keep], scores[0][keep]
+        scores = self.vectors @ query_vec
+        if k < len(scores):
+            ids = np.argpartition(-scores, k - 1)[:k]
+        else:
+            ids = np.arange(len(scores))
+        ids = ids[np.argsort(-scores[ids], kind="stable")]
+        return ids, scores[ids]
+
+    def search(
+        self, query: str, top_k: int = 5, kind: Optional[str] = None, allowed: Optional[np.ndarray] = None
+    ) -> List[Tuple[Tuple[str, str], str]]:
+        """``kind`` and ``allowed`` (a boolean mask over rows) filter as in
+        :meth:`BM25Index.search`."""
+        n = len(self.texts)
+        if not n or top_k <= 0:
+            return []
+        query_vec = self.embedder.embed([query])[0]
+        if not query_vec.any():
+            return []
+        # Over-fetch when filtering so enough matches survive.
+        k = min(n, top_k if kind is None and allowed is None else top_k * 10)
+        while True:
+            ids, scores = self._scores(query_vec, k)
+            hits = [
+                int(d) for d, s in zip(ids, scores)
+                if s > 0
+                and self.metadata[d] is not None
+                and (kind is None or self.metadata[d][0] == kind)
+                and (allowed is None or allowed[d])
+            ]
+            if len(hits) >= top_k or k >= n:
+                break
+            k = min(n, k * 4)
+        return [(self.metadata[d], self.texts[d]) for d in hits[:top_k]]
@@ -1,6 +1,28 @@
+import json
 import logging
 from logging.config import dictConfig
 
+from app.config import settings
+
+# Attributes every LogRecord has; anything else came from ``extra=``.
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including fields passed via ``extra=``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update({k: v for k, v in vars(record).items() if k not in _RESERVED})
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
 
 LOGGING_CONFIG = {
     "version": 1,
@@ -9,11 +31,14 @@ LOGGING_CONFIG = {
         "standard": {
             "format": "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
         },
+        "json": {
+            "()": JsonFormatter,
+        },
     },
     "handlers": {
         "default": {
             "level": "INFO",
-            "formatter": "standard",
+            "formatter": "json" if settings.log_format == "json" else "standard",
             "class": "logging.StreamHandler",
         },
     },
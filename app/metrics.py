@@ -0,0 +1,232 @@
+"""In-process metrics: counters, latency histograms and stage timing spans.
+
+Everything is recorded in one thread-safe registry and can be exported as a
+Prometheus text file (:func:`write_prometheus`), logged as one structured
+record (:func:`log_snapshot`) or summarized per stage (:func:`stage_breakdown`).
+Modules with their own counters (e.g. the cache) contribute gauges through
+:func:`register_collector`, which is read at export time.
+"""
+
+from __future__ import annotations
+
+import bisect
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, shared by every histogram.
+BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+_Key = Tuple[str, Labels]
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+_lock = threading.Lock()
+_counters: Dict[_Key, float] = {}
+_histograms: Dict[_Key, _Histogram] = {}
+_collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+_spans = threading.local()
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels: object) -> None:
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, seconds: float, **labels: object) -> None:
+    key = (name, _labels(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = _Histogram()
+        hist.observe(seconds)
+
+
+def register_collector(namespace: str, collect: Callable[[], Dict[str, float]]) -> None:
+    """Export ``collect()``'s numeric values as ``<namespace>_<name>`` gauges."""
+    _collectors[namespace] = collect
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a pipeline stage into ``stage_seconds{stage=...}``.
+
+    Spans nest per thread; a nested stage is recorded as ``outer/inner``.
+    Worker threads join their caller's nesting with :func:`under_stages`.
+    """
+    stack: List[str] = _spans.__dict__.setdefault("stack", [])
+    path = "/".join([*stack, stage])
+    stack.append(stage)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stack.pop()
+        observe("stage_seconds", elapsed, stage=path)
+        logger.debug("stage finished", extra={"stage": path, "seconds": round(elapsed, 6)})
+
+
+def current_stages() -> Tuple[str, ...]:
+    """The calling thread's open spans, outermost first; see :func:`under_stages`."""
+    return tuple(_spans.__dict__.get("stack", ()))
+
+
+@contextmanager
+def under_stages(stages: Tuple[str, ...]) -> Iterator[None]:
+    """Nest this thread's spans under ``stages`` (from :func:`current_stages`).
+
+    Spans are per thread, so work handed to a pool would otherwise be
+    recorded at the top level rather than under the stage that started it.
+    """
+    saved = _spans.__dict__.get("stack")
+    _spans.stack = list(stages)
+    try:
+        yield
+    finally:
+        if saved is None:
+            del _spans.stack
+        else:
+            _spans.stack = saved
+
+
+def snapshot() -> Dict[str, object]:
+    """Counters, histogram summaries and collector gauges as plain data."""
+    with _lock:
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+        histograms = [
+            {"name": name, "labels": dict(labels), "count": h.count, "sum": h.total,
+             "buckets": dict(zip([*map(str, BUCKETS), "+Inf"], h.counts))}
+            for (name, labels), h in sorted(_histograms.items())
+        ]
+    return {"counters": counters, "histograms": histograms, "gauges": _gauges()}
+
+
+def _gauges() -> Dict[str, float]:
+    return {
+        f"{namespace}_{name}": float(value)
+        for namespace, collect in list(_collectors.items())
+        for name, value in collect().items()
+        if isinstance(value, (int, float))
+    }
+
+
+def _prom_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def to_prometheus(prefix: str = "release_audit") -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = [(key, list(h.counts), h.total, h.count) for key, h in sorted(_histograms.items())]
+    typed = set()
+    for (name, labels), value in counters:
+        metric = f"{prefix}_{name}"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_prom_labels(labels)} {value:g}")
+    for (name, labels), counts, total, count in histograms:
+        metric = f"{prefix}_{name}"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} histogram")
+            typed.add(metric)
+        cumulative = 0
+        for bound, n in zip([*map(str, BUCKETS), "+Inf"], counts):
+            cumulative += n
+            lines.append(f"{metric}_bucket{_prom_labels(labels, (('le', bound),))} {cumulative}")
+        lines.append(f"{metric}_sum{_prom_labels(labels)} {total:.6f}")
+        lines.append(f"{metric}_count{_prom_labels(labels)} {count}")
+    for name, value in sorted(_gauges().items()):
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        lines.append(f"{prefix}_{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: Path) -> None:
+    path.write_text(to_prometheus(), encoding="utf-8")
+
+
+def log_snapshot(level: int = logging.INFO) -> None:
+    """Emit the snapshot as one log record; the JSON formatter keeps it structured."""
+    logger.log(level, "metrics snapshot", extra={"metrics": snapshot()})
+
+
+def stage_breakdown() -> List[Dict[str, object]]:
+    """Per-stage call count, total and mean seconds, slowest first."""
+    with _lock:
+        rows = [
+            {"stage": dict(labels)["stage"], "calls": h.count, "seconds": h.total, "mean": h.total / h.count}
+            for (name, labels), h in _histograms.items()
+            if name == "stage_seconds" and h.count
+        ]
+    return sorted(rows, key=lambda r: r["seconds"], reverse=True)
+
+
+def format_breakdown(rows: Optional[List[Dict[str, object]]] = None) -> str:
+    rows = stage_breakdown() if rows is None else rows
+    lines = [f"{'stage':<40} {'calls':>6} {'total s':>10} {'mean s':>10}"]
+    lines += [f"{r['stage']:<40} {r['calls']:>6} {r['seconds']:>10.3f} {r['mean']:>10.3f}" for r in rows]
+    return "\n".join(lines)
+
+
+@contextmanager
+def profiled(path: Optional[Path] = None, top: int = 25) -> Iterator[cProfile.Profile]:
+    """Run the block under cProfile; dump stats to ``path`` and log the top entries.
+
+    Only the calling thread is profiled: work handed to thread pools shows up
+    as time spent waiting on them, which the stage spans break down instead.
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        if path is not None:
+            profile.dump_stats(str(path))
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(top)
+        logger.info("profile (top %d by cumulative time)\n%s", top, out.getvalue())
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
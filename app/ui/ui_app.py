@@ -1,19 +1,35 @@
 from __future__ import annotations
 
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
 import streamlit as st
 
-from app.core.audit_engine import run_audit
+from app.core.audit_engine import cached_summary, normalize_jql, run_audit
+from app.core.columnar import CommitColumns
+from app.core.components import areas_for_result
+from app.core.index_store import CorpusView
 from app.core.llm_client import (
-    release_notes_summary,
+    SummaryResult,
+    answer_question,
+    regression_summary,
+    release_notes,
     summarize_missing,
-    suggest_regression_areas,
 )
-from app.core.rag_engine import build_corpus
-from app.models import Commit, Issue
+from app.core.rag_engine import open_corpus
+from app.models import Issue
 
 
 st.set_page_config(page_title="Release Audit", layout="wide")
 
+# Parsed audits kept per browser session; older ones are dropped first.
+MAX_VIEWS = 3
+POLL_SECONDS = 0.5
+
+AuditKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
 
 def parse_repos(text: str):
     pairs = []
@@ -26,20 +42,128 @@ def parse_repos(text: str):
     return pairs
 
 
+@dataclass
+class AuditView:
+    """Everything the tabs need, parsed and indexed once per audit."""
+
+    data: Dict
+    issues: List[Issue]
+    commits: CommitColumns
+    corpus: CorpusView
+
+
+@dataclass
+class AuditJob:
+    """An audit running on a background thread, polled by the script thread."""
+
+    jql: str
+    pairs: List[Tuple[str, str]]
+    force_refresh: bool
+    fraction: float = 0.0
+    label: str = "Queued"
+    view: Optional[AuditView] = None
+    error: Optional[BaseException] = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+    def _report(self, fraction: float, label: str) -> None:
+        self.fraction, self.label = fraction, label
+
+    def run(self) -> None:
+        try:
+            data = run_audit(self.jql, self.pairs, force_refresh=self.force_refresh, progress=self._report)
+            self._report(0.9, "Building search index")
+            issues = [Issue(**i) for i in data["issues"]]
+            commits = data["commits"]
+            corpus = open_corpus(issues, commits)
+            self.view = AuditView(data, issues, commits, corpus)
+        except BaseException as exc:  # surfaced on the next rerun
+            self.error = exc
+        finally:
+            self.done.set()
+
+
+def audit_key(jql: str, pairs: List[Tuple[str, str]]) -> AuditKey:
+    return normalize_jql(jql), tuple(sorted(set(pairs)))
+
+
+def start_job(jql: str, pairs: List[Tuple[str, str]], force_refresh: bool) -> AuditJob:
+    job = AuditJob(jql, pairs, force_refresh)
+    threading.Thread(target=job.run, daemon=True).start()
+    return job
+
+
+def remember_view(views: Dict[AuditKey, AuditView], key: AuditKey, view: AuditView) -> None:
+    views.pop(key, None)
+    views[key] = view
+    while len(views) > MAX_VIEWS:
+        views.pop(next(iter(views)))
+
+
 def main():
     st.title("RAG-Based Release Audit")
     jql = st.sidebar.text_input("JQL Query")
     repo_text = st.sidebar.text_input("Bitbucket repos (proj/repo:branch)")
-    refresh = st.sidebar.checkbox("Refresh Data")
+    refresh = st.sidebar.button("Refresh Data")
     if not jql or not repo_text:
         st.info("Enter JQL and repositories to run the audit")
         return
     repo_pairs = parse_repos(repo_text)
-    data = run_audit(jql, repo_pairs, force_refresh=refresh)
-    issues = [Issue(**i) for i in data["issues"]]
-    commits = [Commit(**c) for c in data["commits"]]
+
+    # Widget interactions rerun this script; only a new key or an explicit
+    # refresh reaches the network, everything else is served from here.
+    views: Dict[AuditKey, AuditView] = st.session_state.setdefault("audit_views", {})
+    jobs: Dict[AuditKey, AuditJob] = st.session_state.setdefault("audit_jobs", {})
+    key = audit_key(jql, repo_pairs)
+    if key not in jobs and (refresh or key not in views):
+        jobs[key] = start_job(jql, repo_pairs, force_refresh=refresh)
+
+    job = jobs.get(key)
+    if job is not None and job.done.is_set():
+        del jobs[key]
+        if job.error is not None:
+            st.error(f"Audit failed: {job.error}")
+        else:
+            remember_view(views, key, job.view)
+        job = None
+    if job is not None:
+        st.progress(job.fraction, text=job.label)
+
+    view = views.get(key)
+    if view is None:
+        if job is not None:
+            # A cached audit's headline numbers load without its commits.
+            summary = cached_summary(jql, repo_pairs)
+            if summary is not None:
+                st.metric("Coverage %", f"{summary['coverage']:.1f}")
+            time.sleep(POLL_SECONDS)
+            st.rerun()
+        return
+    render(view)
+
+    if job is not None:
+        # Keep showing the previous result while the refresh finishes.
+        time.sleep(POLL_SECONDS)
+        st.rerun()
+
+
+def render_summary(run) -> None:
+    """Show chunk summaries as they finish, then the merged result."""
+    partial_box = st.container()
+
+    def on_partial(label: str, text: str) -> None:
+        with partial_box.expander(f"Partial: {label}"):
+            st.markdown(text)
+
+    with st.spinner("Summarizing..."):
+        result: SummaryResult = run(on_partial)
+    st.markdown(result.text)
+    stages = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in result.timings.items())
+    st.caption(f"{result.chunks} chunk(s), ~{sum(result.prompt_tokens)} prompt tokens; {stages}")
+
+
+def render(view: AuditView) -> None:
+    data, issues, commits, corpus = view.data, view.issues, view.commits, view.corpus
     match = data["matching"]
-    corpus = build_corpus(issues, commits)
 
     tab_summary, tab_missing, tab_regression, tab_release, tab_rag = st.tabs(
         [
@@ -61,19 +185,30 @@ def main():
             st.markdown(summarize_missing(match["missing"]))
 
     with tab_regression:
+        focus = st.text_input("Focus (optional)", key="regression_focus")
         if st.button("Generate Regression Summary"):
-            st.markdown(suggest_regression_areas(commits))
+            render_summary(lambda on_partial: regression_summary(commits, on_partial, corpus, focus))
+        if st.button("Regression Areas from Changed Files"):
+            with st.spinner("Fetching changed files..."):
+                areas = areas_for_result(data)
+            st.dataframe([asdict(a) for a in areas])
 
     with tab_release:
         if st.button("Generate Release Notes"):
-            st.markdown(release_notes_summary(issues))
+            render_summary(lambda on_partial: release_notes(issues, on_partial))
 
     with tab_rag:
         q = st.text_input("Question")
-        if st.button("Search") and q:
+        search_col, ask_col = st.columns(2)
+        if search_col.button("Search") and q:
             results = corpus.search(q)
             for meta, text in results:
                 st.write(meta, text)
+        if ask_col.button("Ask") and q:
+            answer = answer_question(q, corpus)
+            st.markdown(answer.text)
+            st.caption(f"~{answer.prompt_tokens} prompt tokens from {len(answer.sources)} sources")
+            st.write(answer.sources)
 
 
 if __name__ == "__main__":
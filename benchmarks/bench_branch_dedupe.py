@@ -0,0 +1,73 @@
+"""Per-branch commit rows vs SHA-keyed rows with branch memberships.
+
+Usage: python -m benchmarks.bench_branch_dedupe [--commits 300000] [--issues 10000] [--branches 3]
+
+``--commits`` rows are spread over ``--branches`` branches that share every
+commit, as ``main`` / ``develop`` / ``release`` typically do. The baseline
+keeps one column row per (branch, commit), as before SHA keying.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.cache import result_store
+from app.core import matching
+from app.core.columnar import CommitColumns, to_ms
+from benchmarks.bench_matching import synthetic_data
+
+
+def per_branch_columns(commits) -> CommitColumns:
+    """The old layout: one row per commit copy, no SHA collapsing."""
+    repos, branches, authors = {}, {}, {}
+    messages = [c.message for c in commits]
+    offsets = np.zeros(len(messages) + 1, dtype=np.int64)
+    np.cumsum([len(m) for m in messages], out=offsets[1:])
+    return CommitColumns(
+        shas=np.array([c.sha.encode("ascii") for c in commits], dtype=np.bytes_),
+        repo_codes=np.array([repos.setdefault(c.repo, len(repos)) for c in commits], dtype=np.int32),
+        repos=list(repos),
+        branch_codes=np.array([branches.setdefault(c.branch, len(branches)) for c in commits], dtype=np.int32),
+        branches=list(branches),
+        author_codes=np.array([authors.setdefault(c.author, len(authors)) for c in commits], dtype=np.int32),
+        authors=list(authors),
+        dates_ms=np.array([to_ms(c.date) for c in commits], dtype=np.int64),
+        message_blob="".join(messages),
+        message_offsets=offsets,
+    )
+
+
+def _measure(label: str, issues, columns: CommitColumns, tmp: Path) -> None:
+    started = time.perf_counter()
+    match = matching.match_columns(issues, columns)
+    elapsed = time.perf_counter() - started
+    path = tmp / f"{label.replace(' ', '_')}.audit"
+    result = {"schema_version": 0, "issues": [], "commits": columns, "matching": match, "window": None}
+    result_store.write_result(path, result)
+    print(
+        f"{label:<12} {len(columns):9,d} rows  {columns.nbytes() / 2**20:8.1f} MiB  "
+        f"match {elapsed:6.2f}s  result {path.stat().st_size / 2**20:8.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commits", type=int, default=300_000)
+    parser.add_argument("--issues", type=int, default=10_000)
+    parser.add_argument("--branches", type=int, default=3)
+    args = parser.parse_args()
+
+    issues, commits = synthetic_data(args.commits, args.issues, args.branches)
+    print(f"{len(commits):,} commit copies on {args.branches} branches")
+    with tempfile.TemporaryDirectory() as tmp:
+        _measure("per branch", issues, per_branch_columns(commits), Path(tmp))
+        _measure("SHA keyed", issues, CommitColumns.from_commits(commits), Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare model lists against columnar commits for memory and matching time.
+
+Usage: python -m benchmarks.bench_columnar [--commits 500000] [--issues 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime
+
+from app.core import matching
+from app.core.columnar import CommitColumnsBuilder, to_ms
+from app.models import Commit
+from benchmarks.bench_matching import synthetic_data
+
+
+def _pages(commits, page_size: int = 100):
+    """Bitbucket-shaped page JSON for the synthetic commits."""
+    ts = to_ms(datetime(2024, 1, 1))
+    items = [
+        {"id": c.sha, "author": {"name": c.author}, "authorTimestamp": ts, "message": c.message, "branch": c.branch}
+        for c in commits
+    ]
+    return [items[i:i + page_size] for i in range(0, len(items), page_size)]
+
+
+def _measure(label: str, fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    value = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {elapsed:8.3f}s  peak {peak / 2**20:9.1f} MiB")
+    return value
+
+
+def _time(label: str, fn) -> None:
+    # Timed without tracemalloc, which slows allocation-heavy loops unevenly.
+    started = time.perf_counter()
+    fn()
+    print(f"{label:<34} {time.perf_counter() - started:8.3f}s")
+
+
+def _models(pages):
+    commits = [
+        Commit(
+            sha=item["id"],
+            author=item["author"]["name"],
+            date=datetime.utcfromtimestamp(item["authorTimestamp"] / 1000),
+            message=item["message"],
+            repo="P/repo",
+            branch=item["branch"],
+        )
+        for page in pages
+        for item in page
+    ]
+    # The old audit path: dump for the result, rehydrate in the UI.
+    return [Commit(**c.model_dump()) for c in commits]
+
+
+def _columns(pages):
+    builder = CommitColumnsBuilder()
+    for page in pages:
+        for item in page:
+            builder.append(item["id"], item["author"]["name"], item["authorTimestamp"], item["message"], "P/repo", item["branch"])
+    return builder.build()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commits", type=int, default=500_000)
+    parser.add_argument("--issues", type=int, default=10_000)
+    args = parser.parse_args()
+
+    issues, commits = synthetic_data(args.commits, args.issues, branches=2)
+    pages = _pages(commits)
+    del commits
+    print(f"{args.commits:,} commits vs {len(issues):,} issues")
+    models = _measure("pydantic models (parse+dump+load)", lambda: _models(pages))
+    columns = _measure("columns from page JSON", lambda: _columns(pages))
+    print(f"columnar payload: {columns.nbytes() / 2**20:.1f} MiB")
+    _time("match_commits over models", lambda: matching.match_commits(issues, models))
+    del models
+    _time("match_columns over columns", lambda: matching.match_columns(issues, columns))
+
+
+if __name__ == "__main__":
+    main()
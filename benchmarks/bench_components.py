@@ -0,0 +1,58 @@
+"""Path -> component lookup: prefix trie vs scanning every declared prefix.
+
+Usage: python -m benchmarks.bench_components [--prefixes 2000] [--paths 500000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from app.core.components import Component, ComponentIndex
+
+
+def synthetic_prefixes(count: int):
+    return [f"services/svc{n % 200}/module{n // 200}" for n in range(count)]
+
+
+def linear_lookup(prefixes, path: str):
+    """Longest matching prefix by testing each one, as a naive mapping would."""
+    best = None
+    for prefix, component in prefixes:
+        if (path == prefix or path.startswith(prefix + "/")) and (best is None or len(prefix) > len(best[0])):
+            best = (prefix, component)
+    return best[1] if best else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prefixes", type=int, default=2000)
+    parser.add_argument("--paths", type=int, default=500_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    prefixes = [(p, Component(f"C{n}")) for n, p in enumerate(synthetic_prefixes(args.prefixes))]
+    index = ComponentIndex()
+    for prefix, component in prefixes:
+        index.add(prefix, component)
+    paths = [
+        f"services/svc{rng.randrange(200)}/module{rng.randrange(args.prefixes // 200 + 2)}/src/file{n}.py"
+        for n in range(args.paths)
+    ]
+
+    started = time.perf_counter()
+    trie = [index.lookup(p) for p in paths]
+    elapsed = time.perf_counter() - started
+    print(f"{len(paths):,} paths, {len(prefixes):,} prefixes")
+    print(f"trie                 {elapsed:7.3f}s")
+    sample = paths[: max(len(paths) // 100, 1)]
+    started = time.perf_counter()
+    linear = [linear_lookup(prefixes, p) for p in sample]
+    elapsed = (time.perf_counter() - started) * len(paths) / len(sample)
+    print(f"linear scan (est.)   {elapsed:7.3f}s")
+    assert linear == trie[: len(sample)]
+
+
+if __name__ == "__main__":
+    main()
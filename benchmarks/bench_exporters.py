@@ -0,0 +1,71 @@
+"""Time and peak memory of the streaming exporters on a synthetic audit.
+
+Usage: python -m benchmarks.bench_exporters [--commits 200000] [--issues 10000] [--xlsx] [--memory]
+
+The baseline builds the whole link table as a pandas DataFrame before
+writing, which is what exporting full detail cost before streaming.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from app.core import exporters, matching
+from app.core.columnar import CommitColumns
+from benchmarks.bench_matching import synthetic_data
+
+
+def _measure(label: str, fn, path: Path, memory: bool) -> None:
+    started = time.perf_counter()
+    fn()
+    line = f"{label:<24} {time.perf_counter() - started:8.2f}s  file {path.stat().st_size / 2**20:8.1f} MiB"
+    if memory:
+        # A second, traced run: tracemalloc slows the writers several-fold.
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        line += f"  peak {peak / 2**20:8.1f} MiB"
+    print(line)
+
+
+def _frame_csv(result, path: Path) -> None:
+    frame = pd.DataFrame(list(exporters.iter_rows(result)), columns=exporters.EXPORT_FIELDS)
+    frame.to_csv(path, index=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commits", type=int, default=200_000)
+    parser.add_argument("--issues", type=int, default=10_000)
+    parser.add_argument("--xlsx", action="store_true", help="also time the (slow) XLSX writer")
+    parser.add_argument("--memory", action="store_true", help="also report traced peak memory")
+    args = parser.parse_args()
+
+    issues, commits = synthetic_data(args.commits, args.issues, branches=2)
+    columns = CommitColumns.from_commits(commits)
+    del commits
+    result = {
+        "commits": columns,
+        "matching": matching.match_columns(issues, columns),
+        "window": {"start": "2024-01-01T00:00:00", "end": "2024-02-01T00:00:00"},
+    }
+    rows = sum(1 for _ in exporters.iter_rows(result))
+    print(f"{len(columns):,} commits -> {rows:,} export rows")
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        _measure("pandas DataFrame csv", lambda: _frame_csv(result, out / "frame.csv"), out / "frame.csv", args.memory)
+        _measure("streaming csv", lambda: exporters.to_csv(result, out / "r.csv"), out / "r.csv", args.memory)
+        _measure("streaming jsonl", lambda: exporters.to_jsonl(result, out / "r.jsonl"), out / "r.jsonl", args.memory)
+        if args.xlsx:
+            _measure("streaming xlsx", lambda: exporters.to_xlsx(result, out / "r.xlsx"), out / "r.xlsx", args.memory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark the LLM response cache, in-flight deduplication and the prompt
+size of retrieval-grounded answers, offline.
+
+Uses the stub backend with simulated latency.
+Usage: python -m benchmarks.bench_llm [--latency-ms 500] [--concurrent 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+from app.cache import cache_manager
+from app.core import llm_client
+from app.core.chunking import estimate_tokens
+from app.core.rag_engine import build_corpus
+from benchmarks.bench_matching import synthetic_data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency-ms", type=int, default=500)
+    parser.add_argument("--concurrent", type=int, default=8)
+    args = parser.parse_args()
+
+    llm_client.settings = SimpleNamespace(
+        llm_backend="stub",
+        llm_stub_latency_ms=args.latency_ms,
+        llm_cache_ttl_seconds=3600,
+        openai_model="stub-model",
+        rag_top_k=8,
+    )
+    calls = []
+    real_complete = llm_client._complete
+    llm_client._complete = lambda prompt: calls.append(prompt) or real_complete(prompt)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_manager.CACHE_DIR = Path(tmp)
+        prompt = "Generate concise release notes from the following issues:\n- ABC-1: Login fix"
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrent) as pool:
+            list(pool.map(lambda _: llm_client._chat(prompt), range(args.concurrent)))
+        burst = time.perf_counter() - started
+        print(f"{args.concurrent} concurrent identical requests: {burst:.3f}s, backend calls: {len(calls)}")
+
+        started = time.perf_counter()
+        llm_client._chat(prompt + "  ")
+        print(f"repeat (cache hit):                {(time.perf_counter() - started) * 1000:.3f} ms, "
+              f"backend calls: {len(calls)}")
+
+        cache_manager.clear_memory()
+        started = time.perf_counter()
+        llm_client._chat(prompt)
+        print(f"repeat after restart (disk hit):   {(time.perf_counter() - started) * 1000:.3f} ms, "
+              f"backend calls: {len(calls)}")
+
+        issues, commits = synthetic_data(10_000, 2_000, branches=2)
+        full_prompt = "Suggest regression test areas based on these commit messages:\n" + "\n".join(
+            c.message for c in commits
+        )
+        corpus = build_corpus(issues, commits, dense=False)
+        answer = llm_client.answer_question("handler refactor regression", corpus)
+        print(f"full-dump prompt: ~{estimate_tokens(full_prompt):,} tokens; "
+              f"grounded prompt: ~{answer.prompt_tokens:,} tokens ({len(answer.sources)} sources)")
+
+
+if __name__ == "__main__":
+    main()
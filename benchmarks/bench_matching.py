@@ -0,0 +1,92 @@
+"""Benchmark commit-to-issue matching on synthetic data.
+
+Usage: python -m benchmarks.bench_matching [--commits 1000000] [--issues 10000] [--workers 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Set
+
+from app.core import matching
+from app.models import Commit, Issue
+
+
+def legacy_match_commits(issues: Iterable[Issue], commits: Iterable[Commit]) -> Dict:
+    """The original two-scan implementation, kept as the baseline."""
+    issue_keys: Set[str] = {i.key for i in issues}
+    found_keys: Set[str] = set()
+    commit_map: Dict[str, List[Commit]] = {}
+    commits_list = list(commits)
+    for commit in commits_list:
+        keys = set(matching.JIRA_KEY_RE.findall(commit.message or ""))
+        for key in keys:
+            commit_map.setdefault(key, []).append(commit)
+        found_keys.update(keys & issue_keys)
+    missing = sorted(issue_keys - found_keys)
+    unlinked = [c for c in commits_list if not (set(matching.JIRA_KEY_RE.findall(c.message or "")) & issue_keys)]
+    coverage = (1 - len(missing) / len(issue_keys)) * 100 if issue_keys else 0
+    return {"missing": missing, "unlinked": unlinked, "coverage": coverage, "links": commit_map}
+
+
+def synthetic_data(n_commits: int, n_issues: int, branches: int, seed: int = 7):
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1)
+    projects = ["ABC", "CORE", "MOB", "WEB"]
+    issues = [
+        Issue.model_construct(key=f"{projects[n % 4]}-{n}", summary="", description="", components=[],
+                              fixversions=[], updated=now)
+        for n in range(n_issues)
+    ]
+    words = ["fix", "refactor", "bump", "tidy", "merge", "update", "docs", "tests"]
+    commits = []
+    unique = n_commits // branches
+    for n in range(unique):
+        roll = rng.random()
+        if roll < 0.6:
+            msg = f"{rng.choice(projects)}-{rng.randrange(n_issues * 2)} {rng.choice(words)} handler"
+        elif roll < 0.7:
+            msg = f"OTHER-{rng.randrange(500)} {rng.choice(words)} vendored lib"
+        else:
+            msg = f"{rng.choice(words)} {rng.choice(words)} without a ticket"
+        for b in range(branches):
+            commits.append(
+                Commit.model_construct(sha=f"{n:040x}", author="dev", date=now, message=msg,
+                                       repo="P/repo", branch=f"b{b}", files=None)
+            )
+    return issues, commits
+
+
+def _time(label: str, fn, n: int) -> float:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed:8.3f}s  {n / elapsed:>12,.0f} commits/s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commits", type=int, default=1_000_000)
+    parser.add_argument("--issues", type=int, default=10_000)
+    parser.add_argument("--branches", type=int, default=2, help="copies of each commit across branches")
+    parser.add_argument("--workers", type=int, default=0, help="also time sharded matching on a process pool")
+    args = parser.parse_args()
+
+    issues, commits = synthetic_data(args.commits, args.issues, args.branches)
+    n = len(commits)
+    print(f"{n:,} commits ({n // args.branches:,} unique SHAs) vs {len(issues):,} issues")
+    _time("legacy (two regex scans)", lambda: legacy_match_commits(issues, commits), n)
+    _time("single pass + SHA cache", lambda: matching.match_commits(issues, commits), n)
+    _time("... restricted to projects", lambda: matching.match_commits(issues, commits, restrict_to_projects=True), n)
+    if args.workers > 1:
+        matching.settings = SimpleNamespace(match_workers=args.workers, match_parallel_min_commits=0)
+        _time(f"sharded x{args.workers}", lambda: matching.match_commits(issues, commits), n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Bitbucket fetch of one giant repository plus many small ones.
+
+Usage: python -m benchmarks.bench_page_queue [--giant 5000] [--small 30] [--threads 8] [--latency-ms 50]
+
+Pages come from an in-memory fake that sleeps ``--latency-ms`` per request.
+The baseline is the previous scheme: one task per repo/branch, each paging
+its window by offset, so the giant repository is fetched by a single worker.
+The work queue pages busy windows several offsets ahead across workers;
+its floor is total pages x latency / threads.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.clients import bitbucket_client
+
+START, END = "2024-01-01T00:00:00", "2024-07-01T00:00:00"
+
+
+def _history(repo: str, count: int):
+    span = (datetime.fromisoformat(END) - datetime.fromisoformat(START)) / max(count, 1)
+    base = datetime.fromisoformat(START)
+    return [
+        {"id": f"{repo}-{n}", "author": {"name": "dev"}, "message": f"ABC-{n} change",
+         "authorTimestamp": int((base + span * n).timestamp() * 1000)}
+        for n in reversed(range(count))
+    ]
+
+
+def _fake_page(histories, latency: float, counter):
+    def page(repo, branch, start, since, until):
+        time.sleep(latency)
+        counter.append(repo)
+        lo, hi = datetime.fromisoformat(since), datetime.fromisoformat(until)
+        window = [i for i in histories[repo] if lo <= bitbucket_client._item_date(i) <= hi]
+        values = window[start:start + bitbucket_client.PAGE_LIMIT]
+        return {"values": values, "isLastPage": start + len(values) >= len(window),
+                "nextPageStart": start + len(values)}
+
+    return page
+
+
+def per_pair(pairs, threads: int) -> int:
+    def fetch(pair):
+        repo, branch = pair
+        count, start = 0, 0
+        while True:
+            data = bitbucket_client._fetch_commits_page(repo, branch, start, START, END)
+            count += len(data["values"])
+            if data["isLastPage"]:
+                return count
+            start = data["nextPageStart"]
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return sum(pool.map(fetch, pairs))
+
+
+def work_queue(pairs, threads: int) -> int:
+    return sum(len(items) for _, _, items in bitbucket_client.stream_commit_pages(pairs, START, END, workers=threads))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--giant", type=int, default=5000, help="commits in the giant repository")
+    parser.add_argument("--small", type=int, default=30, help="number of small repositories (50 commits each)")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    histories = {"P/giant": _history("giant", args.giant)}
+    histories.update({f"P/small{n}": _history(f"small{n}", 50) for n in range(args.small)})
+    pairs = [(repo, "main") for repo in histories]
+    pages = sum(max(math.ceil(len(h) / bitbucket_client.PAGE_LIMIT), 1) for h in histories.values())
+    floor = pages * args.latency_ms / 1000 / args.threads
+    print(f"{len(pairs)} pairs, {pages} pages, {args.threads} threads, floor {floor:.2f}s")
+
+    for label, fn in (("one task per pair", per_pair), ("shared page queue", work_queue)):
+        counter = []
+        page = _fake_page(histories, args.latency_ms / 1000, counter)
+        bitbucket_client._fetch_commits_page = page
+        # Bypass the page cache so every run pays for its requests.
+        bitbucket_client._get_commits_page = lambda repo, branch, start, since, until, refresh=False: page(
+            repo, branch, start, since, until
+        )
+        started = time.perf_counter()
+        commits = fn(pairs, args.threads)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<20} {elapsed:7.2f}s  {len(counter):5d} requests  {commits:7d} commits")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark the persistent RAG index: full build vs. incremental update vs. reload.
+
+Usage: python -m benchmarks.bench_rag_index [--docs 100000] [--changed 0.01] [--dense]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.core.index_store import PersistentCorpus
+from app.models import Commit
+from benchmarks.bench_search import synthetic_corpus
+
+
+def _commits(texts, metadata, suffix=""):
+    now = datetime(2024, 1, 1)
+    return [
+        Commit.model_construct(sha=meta[1], author="dev", date=now, message=text + suffix, repo="P/r",
+                               branch="main", files=None)
+        for text, meta in zip(texts, metadata)
+    ]
+
+
+def _time(label: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<28} {time.perf_counter() - started:8.2f}s  {result if isinstance(result, dict) else ''}")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--changed", type=float, default=0.01, help="fraction of docs edited between audits")
+    parser.add_argument("--dense", action="store_true", help="also maintain the vector matrix")
+    args = parser.parse_args()
+
+    texts, metadata = synthetic_corpus(args.docs)
+    commits = _commits(texts, metadata)
+    step = max(int(1 / args.changed), 1) if args.changed > 0 else len(commits) + 1
+    edited = [
+        c.model_copy(update={"message": c.message + " amended"}) if n % step == 0 else c
+        for n, c in enumerate(commits)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _time("full build", lambda: PersistentCorpus(root, dense=args.dense).update([], commits))
+        _time("reload (mmap/npz)", lambda: PersistentCorpus(root, dense=args.dense))
+        _time("incremental update", lambda: PersistentCorpus(root, dense=args.dense).update([], edited))
+        _time("no-op update", lambda: PersistentCorpus(root, dense=args.dense).update([], edited))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Throughput against a local server that enforces a rate limit.
+
+Usage: python -m benchmarks.bench_rate_limit [--rate 50] [--requests 400] [--threads 16] [--advertise]
+
+The server admits ``--rate`` requests per second (token bucket, burst of one
+second) and answers the rest with 429 and a ``Retry-After``. The baseline is
+the previous retry policy: fixed exponential backoff (1-10s) on any error,
+no ``Retry-After`` and no client-side pacing. ``--advertise`` also sends the
+``X-RateLimit-*`` headers Jira and Bitbucket use, letting the client pace
+itself before it is throttled.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+from app.clients import http_client
+
+
+class RateLimitedServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, rate: float, advertise: bool):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.rate, self.advertise = rate, advertise
+        self.tokens, self.updated = rate, time.monotonic()
+        self.lock = threading.Lock()
+        self.ok = self.throttled = 0
+
+    def admit(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.ok += 1
+                return True, 0
+            self.throttled += 1
+            return False, math.ceil((1 - self.tokens) / self.rate)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server: RateLimitedServer = self.server
+        time.sleep(0.01)  # simulated service time
+        admitted, retry_after = server.admit()
+        body = json.dumps({"ok": admitted}).encode()
+        self.send_response(200 if admitted else 429)
+        if not admitted:
+            self.send_header("Retry-After", str(retry_after))
+        if server.advertise:
+            self.send_header("X-RateLimit-FillRate", str(server.rate))
+            self.send_header("X-RateLimit-Interval-Seconds", "1")
+            self.send_header("X-RateLimit-Limit", str(int(server.rate)))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_session = threading.local()
+
+
+@retry(
+    reraise=True,
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=1, max=10),
+    retry=retry_if_exception_type(RuntimeError),
+)
+def legacy_request(url: str):
+    session = _session.__dict__.setdefault("session", requests.Session())
+    response = session.get(url, timeout=30)
+    if response.status_code >= 400:
+        raise RuntimeError(response.status_code)
+    return response.json()
+
+
+def _run(label: str, fn, url: str, n: int, threads: int, server: RateLimitedServer) -> None:
+    server.ok = server.throttled = 0
+    failures = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(fn, url) for _ in range(n)]:
+            try:
+                future.result()
+            except Exception:
+                failures += 1
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<22} {elapsed:7.2f}s  {server.ok / elapsed:7.1f} ok/s  "
+        f"{server.throttled:6d} throttled  {failures:4d} failed"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=50)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--advertise", action="store_true")
+    args = parser.parse_args()
+
+    server = RateLimitedServer(args.rate, args.advertise)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/commits"
+    print(f"{args.requests} requests, {args.threads} threads, server limit {args.rate:g}/s")
+    try:
+        _run("legacy backoff", legacy_request, url, args.requests, args.threads, server)
+        http_client._client = http_client.PooledClient(pool_size=args.threads, host_concurrency=args.threads)
+        _run("adaptive scheduler", lambda u: http_client.request_json("GET", u), url, args.requests, args.threads, server)
+    finally:
+        http_client.reset_client()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare the JSON and binary audit result formats.
+
+Usage: python -m benchmarks.bench_result_format [--commits 100000] [--issues 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from app.cache import result_store
+from app.core import matching
+from app.core.columnar import CommitColumns
+from benchmarks.bench_matching import synthetic_data
+
+
+def _time(label: str, fn):
+    started = time.perf_counter()
+    value = fn()
+    print(f"{label:<34} {time.perf_counter() - started:8.3f}s")
+    return value
+
+
+def _json_write(result, path: Path) -> None:
+    # The previous path: records for every commit, dumped in one json.dump.
+    data = dict(result, commits=result["commits"].to_records())
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+
+
+def _json_read(path: Path):
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commits", type=int, default=100_000)
+    parser.add_argument("--issues", type=int, default=10_000)
+    args = parser.parse_args()
+
+    issues, commits = synthetic_data(args.commits, args.issues, branches=2)
+    columns = CommitColumns.from_commits(commits)
+    result = {
+        "schema_version": 4,
+        "issues": [i.model_dump() for i in issues],
+        "commits": columns,
+        "matching": matching.match_columns(issues, columns),
+        "window": {"start": "2024-01-01T00:00:00", "end": "2024-02-01T00:00:00"},
+    }
+    print(f"{len(columns):,} commits, {len(issues):,} issues")
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, audit_path = Path(tmp) / "r.json", Path(tmp) / "r.audit"
+        _time("json write", lambda: _json_write(result, json_path))
+        _time("audit write", lambda: result_store.write_result(audit_path, result))
+        _time("json read", lambda: _json_read(json_path)["matching"]["coverage"])
+        _time("audit read (summary only)", lambda: result_store.read_result(audit_path).summary())
+
+        def full():
+            loaded = result_store.read_result(audit_path)
+            return [loaded[name] for name in loaded]
+
+        _time("audit read (every section)", full)
+        print(f"json size  {json_path.stat().st_size / 2**20:8.1f} MiB")
+        print(f"audit size {audit_path.stat().st_size / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
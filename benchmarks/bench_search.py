@@ -0,0 +1,81 @@
+"""Benchmark RAG search: BM25 inverted index vs. the original linear scan.
+
+Usage: python -m benchmarks.bench_search [--docs 100000] [--queries 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from app.core.rag_engine import SimpleCorpus
+
+VOCAB = [
+    "login", "payment", "crash", "retry", "timeout", "cache", "export", "audit", "release", "branch",
+    "token", "refresh", "window", "matcher", "search", "index", "report", "summary", "policy", "claim",
+    "quote", "premium", "renewal", "endorsement", "driver", "vehicle", "address", "billing", "invoice",
+    "notification", "email", "mobile", "android", "ios", "layout", "theme", "upgrade", "dependency",
+]
+
+
+def legacy_search(texts: List[str], metadata: List[Tuple[str, str]], query: str, top_k: int = 5):
+    """The original substring-count scan, kept as the baseline."""
+    results = []
+    q = query.lower()
+    for text, meta in zip(texts, metadata):
+        score = text.lower().count(q)
+        if score:
+            results.append((score, text, meta))
+    results.sort(reverse=True)
+    return [(m, t) for s, t, m in results[:top_k]]
+
+
+def synthetic_corpus(n_docs: int, seed: int = 11):
+    rng = random.Random(seed)
+    texts, metadata = [], []
+    for n in range(n_docs):
+        words = " ".join(rng.choice(VOCAB) for _ in range(rng.randint(6, 30)))
+        if n % 5 == 0:
+            texts.append(f"ABC-{n} {words}")
+            metadata.append(("issue", f"ABC-{n}"))
+        else:
+            texts.append(f"ABC-{rng.randrange(n_docs)} {words}")
+            metadata.append(("commit", f"{n:040x}"))
+    return texts, metadata
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    texts, metadata = synthetic_corpus(args.docs)
+    queries = [" ".join(rng.sample(VOCAB, rng.randint(1, 3))) for _ in range(args.queries)]
+
+    started = time.perf_counter()
+    corpus = SimpleCorpus(texts, metadata)
+    print(f"BM25 index build ({args.docs:,} docs): {time.perf_counter() - started:.2f}s")
+
+    for q in queries:  # compile every term's postings once
+        corpus.search(q)
+    started = time.perf_counter()
+    for q in queries:
+        corpus.search(q)
+    bm25 = (time.perf_counter() - started) / len(queries)
+
+    scan_queries = queries[: max(len(queries) // 20, 1)]
+    started = time.perf_counter()
+    for q in scan_queries:
+        legacy_search(texts, metadata, q)
+    scan = (time.perf_counter() - started) / len(scan_queries)
+
+    print(f"legacy linear scan:  {scan * 1000:8.2f} ms/query")
+    print(f"BM25 index:          {bm25 * 1000:8.2f} ms/query  ({scan / bm25:,.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Rapid access-token lookups: parse the token file per call vs in-memory snapshot.
+
+Usage: python -m benchmarks.bench_tokens [--calls 100000] [--threads 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.clients import rapid_auth
+from app.models import RapidToken
+
+
+def legacy_access_token() -> str:
+    """The previous lookup: read and validate the token file on every call."""
+    token = rapid_auth.load_tokens()
+    if token and token.obtained_at + timedelta(seconds=token.expires_in - 60) > datetime.utcnow():
+        return token.access_token
+    raise RuntimeError("expired")
+
+
+def _run(label: str, fn, calls: int, threads: int) -> None:
+    per_thread = calls // threads
+
+    def loop(_):
+        for _ in range(per_thread):
+            fn()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(loop, range(threads)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<18} {elapsed:7.3f}s  {elapsed / calls * 1e6:8.2f} us/call")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rapid_auth.TOKEN_PATH = Path(tmp) / "rapid_token.json"
+        rapid_auth.save_tokens(
+            RapidToken(access_token="a", refresh_token="r", expires_in=3600, obtained_at=datetime.utcnow())
+        )
+        print(f"{args.calls:,} lookups on {args.threads} threads")
+        _run("file per call", legacy_access_token, args.calls, args.threads)
+        _run("memory snapshot", rapid_auth.get_valid_access_token, args.calls, args.threads)
+
+
+if __name__ == "__main__":
+    main()
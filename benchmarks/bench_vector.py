@@ -0,0 +1,49 @@
+"""Benchmark dense retrieval: embedding/index build time and query latency.
+
+Usage: python -m benchmarks.bench_vector [--docs 100000] [--queries 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from app.core import vector_index
+from app.core.vector_index import HashingEmbedder, VectorIndex, embed_batched
+from benchmarks.bench_search import VOCAB, synthetic_corpus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=vector_index.DEFAULT_DIM)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    texts, metadata = synthetic_corpus(args.docs)
+    queries = [" ".join(rng.sample(VOCAB, rng.randint(1, 3))) for _ in range(args.queries)]
+    embedder = HashingEmbedder(args.dim)
+
+    started = time.perf_counter()
+    vectors = embed_batched(embedder, texts)
+    embed_s = time.perf_counter() - started
+    print(f"embedding {args.docs:,} docs (dim {args.dim}): {embed_s:.2f}s, {vectors.nbytes / 2**20:.1f} MiB")
+
+    backends = [("numpy brute force", False)]
+    if vector_index.faiss is not None:
+        backends.append(("faiss", True))
+    for label, use_faiss in backends:
+        started = time.perf_counter()
+        index = VectorIndex(texts, metadata, embedder=embedder, use_faiss=use_faiss, vectors=vectors)
+        build_s = time.perf_counter() - started
+        started = time.perf_counter()
+        for q in queries:
+            index.search(q)
+        query_ms = (time.perf_counter() - started) / len(queries) * 1000
+        print(f"{label:<18} index build {build_s:6.2f}s   query {query_ms:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
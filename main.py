@@ -1,11 +1,21 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import json
+import re
+from dataclasses import asdict
 from pathlib import Path
+from typing import Optional
 
-from app.core import audit_engine
+from app import logging_config  # noqa: F401  (configures logging on import)
+from app import metrics
+from app.clients import http_client
+from app.core import audit_engine, batch_audit, components
 from app.core import exporters
 
+WRITERS = {"json": exporters.to_json, "audit": exporters.to_audit}
+
 
 def parse_repo_pairs(text: str):
     pairs = []
@@ -17,24 +27,140 @@ def parse_repo_pairs(text: str):
     return pairs
 
 
+def write_outputs(result, path: Path, fmt: str, exports, areas_path: Optional[Path] = None) -> None:
+    with metrics.span("write_result"):
+        WRITERS[fmt](result, path)
+    print(f"Results written to {path}")
+    for export_path in exports:
+        with metrics.span("export"):
+            exporters.export(result, export_path)
+        print(f"Exported to {export_path}")
+    if areas_path is not None:
+        with metrics.span("regression_areas"):
+            areas = components.areas_for_result(result)
+        areas_path.write_text(json.dumps([asdict(a) for a in areas], indent=2), encoding="utf-8")
+        print(f"Regression areas written to {areas_path}")
+
+
+def _with_slug(path: str, slug: str) -> Path:
+    return Path(path).with_name(f"{Path(path).stem}-{slug}{Path(path).suffix}")
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_") or "release"
+
+
+def run_batch(args, pairs) -> None:
+    if args.fix_versions:
+        base = args.jql[0] if args.jql else None
+        releases = batch_audit.releases_for_fix_versions(args.fix_versions.split(","), base)
+    else:
+        releases = batch_audit.releases_for_jql(args.jql)
+    batch = batch_audit.run_batch_audit(
+        releases, pairs, force_refresh=args.update_cache, full_resync=args.full_resync
+    )
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    suffix = ".audit" if args.format == "audit" else ".json"
+    for n, (name, result) in enumerate(batch.results.items(), 1):
+        slug = f"{n:02d}-{slugify(name)}"
+        exports = [_with_slug(p, slug) for p in args.export]
+        areas_path = _with_slug(args.regression_areas, slug) if args.regression_areas else None
+        write_outputs(result, out_dir / f"{slug}{suffix}", args.format, exports, areas_path)
+    summary_path = out_dir / "summary.json"
+    summary_path.write_text(json.dumps(batch.summary, indent=2), encoding="utf-8")
+    if batch.summary["empty"]:
+        print(f"No issues found for release(s): {', '.join(batch.summary['empty'])}")
+    print(
+        f"{batch.summary['releases']} releases audited; "
+        f"{batch.summary['requests_sent']} requests sent, "
+        f"~{batch.summary['requests_saved']} saved versus separate runs ({summary_path})"
+    )
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run release audit")
-    parser.add_argument("--jql", required=True, help="Jira JQL query")
+    parser.add_argument(
+        "--jql",
+        action="append",
+        default=[],
+        help="Jira JQL query; repeat to audit several releases in one batch",
+    )
+    parser.add_argument(
+        "--fix-versions",
+        help="Comma separated fixVersions to audit as a batch; --jql then narrows every release",
+    )
     parser.add_argument(
         "--repos",
         required=True,
         help="Comma separated repo:branch pairs",
     )
     parser.add_argument("--update-cache", action="store_true")
+    parser.add_argument(
+        "--full-resync",
+        action="store_true",
+        help="Re-download all commits in the window instead of syncing incrementally",
+    )
+    parser.add_argument(
+        "--export",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="Also stream full detail to PATH (.csv, .jsonl or .xlsx); repeatable",
+    )
+    parser.add_argument(
+        "--regression-areas",
+        metavar="PATH",
+        help="Fetch changed files per commit and write regression areas by component (JSON) to PATH",
+    )
     parser.add_argument("--headless", action="store_true")
     parser.add_argument("--out", default="audit_results.json")
+    parser.add_argument("--out-dir", default="audit_results", help="Batch mode: one result file per release")
+    parser.add_argument(
+        "--format",
+        choices=sorted(WRITERS),
+        default="json",
+        help="json for a readable dump, audit for the compact binary format",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-stage timing breakdown and dump cProfile stats to audit.prof",
+    )
+    parser.add_argument("--metrics", metavar="PATH", help="Write Prometheus-style metrics to PATH")
     args = parser.parse_args()
+    if not args.jql and not args.fix_versions:
+        parser.error("give --jql or --fix-versions")
+    if args.fix_versions and len(args.jql) > 1:
+        parser.error("--fix-versions takes at most one --jql base filter")
+    for export_path in args.export:
+        if Path(export_path).suffix.lower() not in exporters.EXPORTERS:
+            parser.error(f"--export {export_path}: use one of {', '.join(sorted(exporters.EXPORTERS))}")
 
     pairs = parse_repo_pairs(args.repos)
-    result = audit_engine.run_audit(args.jql, pairs, force_refresh=args.update_cache)
-    path = Path(args.out)
-    exporters.to_json(result, path)
-    print(f"Results written to {path}")
+    profiler = metrics.profiled(Path("audit.prof")) if args.profile else contextlib.nullcontext()
+    with profiler, metrics.span("total"):
+        if args.fix_versions or len(args.jql) > 1:
+            run_batch(args, pairs)
+        else:
+            result = audit_engine.run_audit(
+                args.jql[0], pairs, force_refresh=args.update_cache, full_resync=args.full_resync
+            )
+            path = Path(args.out)
+            if args.format == "audit" and path.suffix == ".json":
+                path = path.with_suffix(".audit")
+            areas_path = Path(args.regression_areas) if args.regression_areas else None
+            write_outputs(result, path, args.format, [Path(p) for p in args.export], areas_path)
+
+    metrics.log_snapshot()
+    if args.metrics:
+        metrics.write_prometheus(Path(args.metrics))
+        print(f"Metrics written to {args.metrics}")
+    if args.profile:
+        print(metrics.format_breakdown())
+        for host, counts in http_client.pool_stats().items():
+            print(f"{host:<40} connections opened {counts['opened']}, reused {counts['reused']}")
+        print("cProfile stats written to audit.prof")
 
     if not args.headless:
         print("Run 'streamlit run app/ui/ui_app.py' for the UI")
@@ -0,0 +1,14 @@
+import pytest
+
+from app.cache import cache_manager, commit_store
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Keep every test's cache and commit store out of the repo's cache/."""
+    monkeypatch.setattr(cache_manager, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(commit_store, "DB_PATH", tmp_path / "cache" / "commits.sqlite")
+    monkeypatch.setattr(cache_manager, "_disk_bytes", None)
+    cache_manager.clear_memory()
+    yield
+    cache_manager.clear_memory()
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+from datetime import datetime
+
+from app.core import audit_engine
+from app.core.columnar import CommitColumns
+from app.models import Commit, Issue
+
+
+def test_cache_key_is_normalized_and_order_independent():
+    a = audit_engine.audit_cache_key(
+        'project = ABC  AND fixVersion = "R  1"', [("P/a", "main"), ("P/b", "dev")]
+    )
+    b = audit_engine.audit_cache_key(
+        ' project = ABC AND\nfixVersion = "R  1" ', [("P/b", "dev"), ("P/a", "main")]
+    )
+    assert a == b
+    assert a != audit_engine.audit_cache_key('project = ABC AND fixVersion = "R 1"', [("P/a", "main"), ("P/b", "dev")])
+    assert a != audit_engine.audit_cache_key('project = ABC AND fixVersion = "R  1"', [("P/a", "main")])
+
+
+def test_cache_key_is_stable_across_processes():
+    code = "from app.core.audit_engine import audit_cache_key; print(audit_cache_key('project = ABC', [('P/a', 'main')]))"
+    keys = {
+        subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={"PYTHONHASHSEED": seed, "PYTHONPATH": "."},
+        ).stdout
+        for seed in ("1", "2")
+    }
+    assert len(keys) == 1
+
+
+def test_run_audit_reports_progress_and_reuses_cache(monkeypatch):
+    now = datetime(2024, 1, 10)
+    issue = Issue(key="ABC-1", summary="", description="", components=[], fixversions=[], updated=now)
+    commit = Commit(sha="c1", author="a", date=now, message="ABC-1 fix", repo="P/r", branch="main")
+    fetches = []
+    monkeypatch.setattr(
+        audit_engine.jira_client, "fetch_issues_by_jql", lambda jql, refresh=False: fetches.append(jql) or [issue]
+    )
+    monkeypatch.setattr(
+        audit_engine.bitbucket_client,
+        "fetch_commit_columns_threaded",
+        lambda pairs, start, end, full_resync=False: CommitColumns.from_commits([commit]),
+    )
+
+    stages = []
+    result = audit_engine.run_audit("project = ABC", [("P/r", "main")], progress=lambda f, label: stages.append(label))
+    assert result["matching"]["coverage"] == 100.0
+    assert result["matching"]["links"] == {"ABC-1": [0]} and result["commits"].sha(0) == "c1"
+    assert stages[0] == "Fetching Jira issues" and stages[-1] == "Done"
+
+    stages.clear()
+    again = audit_engine.run_audit("project  = ABC", [("P/r", "main")], progress=lambda f, label: stages.append(label))
+    assert stages == ["Loaded from cache"] and len(fetches) == 1
+    assert again["matching"]["missing"] == []
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from app.core import audit_engine, batch_audit
+from app.core.columnar import CommitColumns
+from app.models import Commit, Issue
+
+
+def _issue(key, version, day):
+    return Issue(key=key, summary="", description="", components=[], fixversions=[version], updated=datetime(2024, 1, day))
+
+
+def test_batch_shares_fetches_and_matches_each_release_in_its_window(monkeypatch):
+    issues = [_issue("ABC-1", "R1", 1), _issue("ABC-2", "R2", 28)]
+    commits = [
+        Commit(sha="early", author="a", date=datetime(2024, 1, 2), message="ABC-1 fix", repo="P/r", branch="main"),
+        Commit(sha="late", author="a", date=datetime(2024, 1, 27), message="ABC-2 fix", repo="P/r", branch="main"),
+    ]
+    searches, fetches = [], []
+    monkeypatch.setattr(
+        batch_audit.jira_client, "fetch_issues_by_jql", lambda jql, refresh=False: searches.append(jql) or issues
+    )
+
+    def fake_columns(pairs, start, end, full_resync=False):
+        fetches.append((start, end))
+        return CommitColumns.from_commits(commits)
+
+    monkeypatch.setattr(batch_audit.bitbucket_client, "fetch_commit_columns_threaded", fake_columns)
+
+    releases = batch_audit.releases_for_fix_versions(["R1", "R2"], base_jql="project = ABC")
+    batch = batch_audit.run_batch_audit(releases, [("P/r", "main")])
+
+    assert searches == ['(project = ABC) AND fixVersion in ("R1", "R2")']
+    assert fetches == [("2023-12-25T00:00:00", "2024-02-04T00:00:00")]
+    r1, r2 = batch.results["R1"], batch.results["R2"]
+    assert [i["key"] for i in r1["issues"]] == ["ABC-1"] and r1["matching"]["coverage"] == 100.0
+    assert [c.sha for c in r1["commits"]] == ["early"]
+    assert [c.sha for c in r2["commits"]] == ["late"]
+    assert batch.summary["jira_searches"] == 1 and batch.summary["requests_if_separate"] == 4
+
+    # Each release landed in the cache a standalone audit reads.
+    stages = []
+    cached = audit_engine.run_audit(releases[0].jql, [("P/r", "main")], progress=lambda f, label: stages.append(label))
+    assert stages == ["Loaded from cache"] and cached["matching"]["links"] == {"ABC-1": [0]}
+
+
+def test_empty_release_is_reported_and_the_rest_audited(monkeypatch):
+    issues = [_issue("ABC-1", "R1", 1)]
+    commits = [Commit(sha="c1", author="a", date=datetime(2024, 1, 2), message="ABC-1 fix", repo="P/r", branch="main")]
+    monkeypatch.setattr(batch_audit.jira_client, "fetch_issues_by_jql", lambda jql, refresh=False: issues)
+    monkeypatch.setattr(
+        batch_audit.bitbucket_client, "fetch_commit_columns_threaded",
+        lambda pairs, start, end, full_resync=False: CommitColumns.from_commits(commits),
+    )
+
+    releases = batch_audit.releases_for_fix_versions(["R1", "R2"])
+    batch = batch_audit.run_batch_audit(releases, [("P/r", "main")])
+    assert list(batch.results) == ["R1"] and batch.summary["empty"] == ["R2"]
+
+
+def test_repeated_jql_releases_are_deduplicated():
+    releases = batch_audit.releases_for_jql(["project = ABC", "project  =  ABC", "project = XYZ"])
+    assert [r.name for r in releases] == ["project = ABC", "project = XYZ"]
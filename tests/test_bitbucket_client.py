@@ -0,0 +1,118 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.cache import commit_store
+from app.clients import bitbucket_client
+
+
+def _history(repo, count, hours):
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": f"{repo}-{n}",
+            "author": {"name": "dev"},
+            "authorTimestamp": int((start + timedelta(hours=hours * n)).timestamp() * 1000),
+            "message": f"ABC-{n} change",
+        }
+        for n in reversed(range(count))
+    ]
+
+
+def _fake_server(histories, calls):
+    def fake_page(repo, branch, start, since, until):
+        calls.append((repo, since, start))
+        lo, hi = datetime.fromisoformat(since), datetime.fromisoformat(until)
+        window = [i for i in histories[repo] if lo <= bitbucket_client._item_date(i) <= hi]
+        page = window[start:start + bitbucket_client.PAGE_LIMIT]
+        last = start + len(page) >= len(window)
+        return {"values": page, "isLastPage": last, "nextPageStart": start + len(page)}
+
+    return fake_page
+
+
+def test_busy_branch_is_paged_ahead_across_workers(monkeypatch):
+    histories = {"P/big": _history("big", 600, 1), **{f"P/s{n}": _history(f"s{n}", 5, 24) for n in range(3)}}
+    calls = []
+    monkeypatch.setattr(bitbucket_client, "_fetch_commits_page", _fake_server(histories, calls))
+    monkeypatch.setattr(bitbucket_client, "PAGE_LIMIT", 20)
+
+    pages = list(
+        bitbucket_client.stream_commit_pages(
+            [(repo, "main") for repo in histories], "2024-01-01T00:00:00", "2024-02-28T00:00:00", workers=4
+        )
+    )
+    ids = Counter(item["id"] for _, _, items in pages for item in items)
+    assert set(ids) == {item["id"] for history in histories.values() for item in history}
+    assert max(ids.values()) == 1
+    big = [c for c in calls if c[0] == "P/big"]
+    # One window paged by offset, at most a few requests past the last page.
+    assert len({since for _, since, _ in big}) == 1
+    assert len({start for _, _, start in big}) == len(big)
+    assert len(big) <= 600 // 20 + 4
+
+
+def test_late_listed_commit_with_newer_date_is_fetched(monkeypatch):
+    # git log order is not author-date order: a commit listed near the end
+    # of the window may carry a newer author date than the first page.
+    history = _history("big", 600, 1)
+    late = dict(history[550], authorTimestamp=history[0]["authorTimestamp"])
+    history[550] = late
+    calls = []
+    monkeypatch.setattr(bitbucket_client, "_fetch_commits_page", _fake_server({"P/big": history}, calls))
+    monkeypatch.setattr(bitbucket_client, "PAGE_LIMIT", 20)
+
+    pages = bitbucket_client.stream_commit_pages(
+        [("P/big", "main")], "2024-01-01T00:00:00", "2024-02-28T00:00:00", workers=4
+    )
+    ids = [item["id"] for _, _, items in pages for item in items]
+    assert sorted(ids) == sorted(item["id"] for item in history)
+
+
+def test_small_window_pages_by_offset(monkeypatch):
+    histories = {"P/r": _history("r", 3, 0)}
+    calls = []
+    monkeypatch.setattr(bitbucket_client, "_fetch_commits_page", _fake_server(histories, calls))
+    monkeypatch.setattr(bitbucket_client, "PAGE_LIMIT", 1)
+
+    commits = bitbucket_client.fetch_commits("P/r", "main", "2024-01-01T00:00:00", "2024-01-02T00:00:00")
+    assert sorted(c.sha for c in commits) == ["r-0", "r-1", "r-2"]
+    assert [start for _, _, start in calls] == [0, 1, 2]
+
+
+def test_changed_files_are_fetched_once_per_sha(tmp_path, monkeypatch):
+    monkeypatch.setattr(commit_store, "DB_PATH", tmp_path / "commits.sqlite")
+    monkeypatch.setattr(bitbucket_client, "CHANGES_PAGE_LIMIT", 2)
+    files = {"a": ["x/1.py", "x/2.py", "y/3.py"], "b": []}
+    calls = []
+
+    def fake_changes(repo, sha, start):
+        calls.append((sha, start))
+        page = files[sha][start:start + 2]
+        return {
+            "values": [{"path": {"toString": p}} for p in page],
+            "isLastPage": start + 2 >= len(files[sha]),
+            "nextPageStart": start + 2,
+        }
+
+    monkeypatch.setattr(bitbucket_client, "_fetch_changes_page", fake_changes)
+    assert bitbucket_client.fetch_changes([("P/r", "a"), ("P/r", "b"), ("P/s", "a")]) == files
+    assert sorted(calls) == [("a", 0), ("a", 2), ("b", 0)]
+    calls.clear()
+    assert bitbucket_client.fetch_changes([("P/r", "b"), ("P/r", "a")]) == files
+    assert calls == []
+
+
+def test_changed_files_fetched_before_a_failure_are_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(commit_store, "DB_PATH", tmp_path / "commits.sqlite")
+
+    def fake_changes(repo, sha, start):
+        if sha == "bad":
+            raise RuntimeError("Bitbucket unavailable")
+        return {"values": [{"path": {"toString": f"{sha}.py"}}], "isLastPage": True}
+
+    monkeypatch.setattr(bitbucket_client, "_fetch_changes_page", fake_changes)
+    with pytest.raises(RuntimeError):
+        bitbucket_client.fetch_changes([("P/r", "ok"), ("P/r", "bad")], workers=1)
+    assert commit_store.get_changes({"ok": "P/r"}) == {"ok": ["ok.py"]}
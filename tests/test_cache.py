@@ -1,3 +1,6 @@
+from datetime import datetime
+from types import SimpleNamespace
+
 from app.cache import cache_manager
 
 
@@ -6,3 +9,62 @@ def test_cache_ttl(tmp_path, monkeypatch):
     cache_manager.write_cache("key", {"v": 1})
     assert cache_manager.read_cache("key", ttl_seconds=100)["v"] == 1
     assert cache_manager.read_cache("key", ttl_seconds=0) is None
+
+
+def test_memory_lru_eviction_and_stats(monkeypatch):
+    monkeypatch.setattr(cache_manager, "settings", SimpleNamespace(
+        cache_ttl_seconds=100, cache_memory_entries=2, cache_memory_bytes=1 << 20, cache_max_bytes=0
+    ))
+    before = cache_manager.stats()
+    for n in range(3):
+        cache_manager.write_cache(f"k{n}", {"n": n, "at": datetime(2024, 1, 1)})
+    assert cache_manager.stats()["memory_entries"] == 2
+    # k0 fell out of memory but is still served from disk, JSON-shaped.
+    assert cache_manager.read_cache("k0") == {"n": 0, "at": "2024-01-01T00:00:00"}
+    assert cache_manager.read_cache("missing") is None
+    after = cache_manager.stats()
+    assert after["evictions"] - before["evictions"] >= 2
+    assert after["disk_hits"] - before["disk_hits"] == 1
+    assert after["misses"] - before["misses"] == 1
+
+
+def test_memory_tier_byte_budget_keeps_large_entries_on_disk(monkeypatch):
+    monkeypatch.setattr(cache_manager, "settings", SimpleNamespace(
+        cache_ttl_seconds=100, cache_memory_entries=100, cache_memory_bytes=4000, cache_max_bytes=0
+    ))
+    cache_manager.write_cache("page", {"values": ["x" * 2000]})
+    for n in range(10):
+        cache_manager.write_cache(f"k{n}", {"v": "y" * 300})
+    stats = cache_manager.stats()
+    assert 0 < stats["memory_bytes"] <= 4000
+    assert str(cache_manager._object_path("page")) not in cache_manager._memory
+    assert cache_manager.read_cache("page") == {"values": ["x" * 2000]}
+    assert cache_manager.read_cache("k9") == {"v": "y" * 300}
+
+
+def test_disk_budget_uses_running_total(monkeypatch):
+    monkeypatch.setattr(cache_manager, "settings", SimpleNamespace(
+        cache_ttl_seconds=100, cache_memory_entries=0, cache_memory_bytes=0, cache_max_bytes=10_000
+    ))
+    scans = []
+    real_entries = cache_manager._disk_entries
+    monkeypatch.setattr(cache_manager, "_disk_entries", lambda: scans.append(1) or real_entries())
+    for n in range(5):
+        cache_manager.write_cache(f"k{n}", {"v": "z" * 100})
+    assert len(scans) == 1
+    for n in range(5, 60):
+        cache_manager.write_cache(f"k{n}", {"v": "z" * 300})
+    assert 1 < len(scans) <= 10
+    assert sum(p.stat().st_size for p in real_entries()) <= 10_000
+
+
+def test_eviction_skips_files_removed_concurrently(monkeypatch):
+    monkeypatch.setattr(cache_manager, "settings", SimpleNamespace(
+        cache_ttl_seconds=100, cache_memory_entries=0, cache_memory_bytes=0, cache_max_bytes=1
+    ))
+    cache_manager.write_cache("kept", {"v": 1})
+    gone = cache_manager.CACHE_DIR / "objects" / "00" / "gone.json"
+    real_entries = cache_manager._disk_entries
+    monkeypatch.setattr(cache_manager, "_disk_entries", lambda: [gone, *real_entries()])
+    cache_manager.evict_disk()
+    assert not real_entries()
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from app.core import matching
+from app.core.columnar import CommitColumns, CommitColumnsBuilder
+from app.models import Commit, Issue
+
+
+def test_builder_reads_page_json_and_materializes_rows_lazily():
+    ts = int((datetime(2024, 1, 2, 3, 4, 5) - datetime(1970, 1, 1)).total_seconds() * 1000)
+    builder = CommitColumnsBuilder()
+    builder.add_page(
+        [
+            {"id": "c2", "author": {"name": "dev"}, "authorTimestamp": ts, "message": "ABC-1 fix"},
+            {"id": "c1", "author": None, "authorTimestamp": ts, "message": None},
+        ],
+        "P/r",
+        "main",
+    )
+    columns = builder.build()
+    assert len(columns) == 2 and columns.repos == ["P/r"]
+    row = columns.row(0)
+    assert isinstance(row, Commit)
+    assert (row.sha, row.author, row.date, row.message) == ("c2", "dev", datetime(2024, 1, 2, 3, 4, 5), "ABC-1 fix")
+    assert columns.record(1).author is None and columns.message(1) == ""
+    assert CommitColumns.from_records(columns.to_records()).to_records() == columns.to_records()
+
+
+def test_match_columns_agrees_with_match_commits():
+    now = datetime(2024, 1, 1)
+    issues = [
+        Issue(key=f"ABC-{n}", summary="", description="", components=[], fixversions=[], updated=now)
+        for n in range(4)
+    ]
+    commits = [
+        Commit(sha=str(n % 5), author="a", date=now, message=f"ABC-{n % 5} OPS-{n}" if n % 3 else "misc", repo="r", branch=f"b{n % 2}")
+        for n in range(12)
+    ]
+    by_model = matching.match_commits(issues, commits)
+    columns = CommitColumns.from_commits(commits)
+    by_index = matching.match_columns(issues, columns)
+    # Columns hold one row per SHA; the models list has one copy per branch.
+    assert len(columns) == 5
+    assert by_index["missing"] == by_model["missing"] and by_index["coverage"] == by_model["coverage"]
+    assert [columns.sha(i) for i in by_index["unlinked"]] == list(dict.fromkeys(c.sha for c in by_model["unlinked"]))
+    assert {k: [columns.sha(i) for i in v] for k, v in by_index["links"].items()} == {
+        k: list(dict.fromkeys(c.sha for c in v)) for k, v in by_model["links"].items()
+    }
+
+
+def test_duplicate_shas_collapse_into_memberships():
+    now = datetime(2024, 1, 1)
+    commits = [
+        Commit(sha=sha, author="a", date=now, message=sha, repo="P/r", branch=branch)
+        for branch, shas in (("main", "abc"), ("develop", "bcd"), ("release", "c"))
+        for sha in shas
+    ]
+    columns = CommitColumns.from_commits(commits)
+    assert [columns.sha(i) for i in range(len(columns))] == ["a", "b", "c", "d"]
+    assert columns.memberships(2) == [("P/r", "main"), ("P/r", "develop"), ("P/r", "release")]
+    assert columns.in_pair("P/r", "develop").tolist() == [False, True, True, True]
+    taken = columns.take([3, 2])
+    assert taken.memberships(1) == columns.memberships(2) and taken.memberships(0) == [("P/r", "develop")]
+    assert list(columns.iter_fields([2]))[0][1:3] == ("P/r", "main,develop,release")
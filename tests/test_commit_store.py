@@ -0,0 +1,174 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from app.cache import commit_store
+from app.clients import bitbucket_client
+
+
+def _item(sha, day, parents=()):
+    ts = int(datetime(2024, 1, day).timestamp() * 1000)
+    return {
+        "id": sha,
+        "author": {"name": "dev"},
+        "authorTimestamp": ts,
+        "message": f"ABC-{day} change",
+        "parents": [{"id": p} for p in parents],
+    }
+
+
+def _line(prefix, days, below=None):
+    """Linear history, newest first: each commit's parent is the next one."""
+    shas = [f"{prefix}{day}" for day in days]
+    return [_item(sha, day, [parent] if parent else []) for sha, day, parent in zip(shas, days, shas[1:] + [below])]
+
+
+def test_incremental_sync_stops_at_watermark(tmp_path, monkeypatch):
+    monkeypatch.setattr(commit_store, "DB_PATH", tmp_path / "commits.sqlite")
+    history = [_item("c2", 2), _item("c1", 1)]
+    calls = []
+
+    def fake_page(repo, branch, start, since, until):
+        calls.append(start)
+        page = history[start:start + 1]
+        return {"values": page, "isLastPage": start + 1 >= len(history), "nextPageStart": start + 1}
+
+    monkeypatch.setattr(bitbucket_client, "_fetch_commits_page", fake_page)
+    monkeypatch.setattr(bitbucket_client, "PAGE_LIMIT", 1)
+
+    first = bitbucket_client.fetch_commits_synced("P/r", "main", "2024-01-01T00:00:00", "2024-01-31T00:00:00")
+    assert [c.sha for c in first] == ["c2", "c1"]
+    # Full fetch: every page exactly once, nothing speculative.
+    assert sorted(calls) == [0, 1]
+
+    history.insert(0, _item("c3", 3))
+    calls.clear()
+    second = bitbucket_client.fetch_commits_synced("P/r", "main", "2024-01-01T00:00:00", "2024-01-31T00:00:00")
+    assert [c.sha for c in second] == ["c3", "c2", "c1"]
+    # Only the page holding the new commit and the one reaching the watermark.
+    assert calls == [0, 1]
+    assert commit_store.get_state("P/r", "main").head_sha == "c3"
+
+    # Listed first but authored earlier (e.g. cherry-picked): still new.
+    history.insert(0, _item("c0", 1))
+    calls.clear()
+    third = bitbucket_client.fetch_commits_synced("P/r", "main", "2024-01-01T00:00:00", "2024-01-31T00:00:00")
+    assert {c.sha for c in third} == {"c0", "c1", "c2", "c3"}
+    assert calls == [0, 1]
+    assert commit_store.get_state("P/r", "main").head_sha == "c0"
+
+    calls.clear()
+    bitbucket_client.fetch_commits_synced(
+        "P/r", "main", "2024-01-01T00:00:00", "2024-01-31T00:00:00", full_resync=True
+    )
+    assert sorted(calls) == [0, 1, 2, 3]
+
+
+def test_failed_full_resync_keeps_stored_commits(tmp_path, monkeypatch):
+    monkeypatch.setattr(commit_store, "DB_PATH", tmp_path / "commits.sqlite")
+    history = [_item("c2", 2), _item("c1", 1)]
+    fail = []
+
+    def fake_page(repo, branch, start, since, until):
+        if start in fail:
+            raise RuntimeError("Bitbucket unavailable")
+        page = history[start:start + 1]
+        return {"values": page, "isLastPage": start + 1 >= len(history), "nextPageStart": start + 1}
+
+    monkeypatch.setattr(bitbucket_client, "_fetch_commits_page", fake_page)
+    monkeypatch.setattr(bitbucket_client, "PAGE_LIMIT", 1)
+    window = ("P/r", "main", "2024-01-01T00:00:00", "2024-01-31T00:00:00")
+    bitbucket_client.sync_commits(*window)
+
+    fail.append(1)
+    with pytest.raises(RuntimeError):
+        bitbucket_client.sync_commits(*window, full_resync=True)
+    assert [c.sha for c in commit_store.query_commits(*window)] == ["c2", "c1"]
+
+    # A completed resync drops commits no longer on the branch.
+    fail.clear()
+    history.pop()
+    bitbucket_client.sync_commits(*window, full_resync=True)
+    assert [c.sha for c in commit_store.query_commits(*window)] == ["c2"]
+
+
+def _server(histories, calls):
+    def fake_page(repo, branch, start, since, until):
+        calls.append(branch)
+        lo, hi = datetime.fromisoformat(since), datetime.fromisoformat(until)
+        window = [i for i in histories[branch] if lo <= bitbucket_client._item_date(i) <= hi]
+        page = window[start:start + bitbucket_client.PAGE_LIMIT]
+        return {"values": page, "isLastPage": start + len(page) >= len(window), "nextPageStart": start + len(page)}
+
+    return fake_page
+
+
+def test_shared_commits_are_stored_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(commit_store, "DB_PATH", tmp_path / "commits.sqlite")
+    shared = [_item(f"s{day}", day) for day in range(20, 0, -1)]
+    histories = {"main": shared, "develop": [_item("d21", 21)] + shared}
+    monkeypatch.setattr(bitbucket_client, "_fetch_commits_page", _server(histories, []))
+    monkeypatch.setattr(bitbucket_client, "PAGE_LIMIT", 5)
+
+    columns = bitbucket_client.fetch_commit_columns_threaded(
+        [("P/r", "main"), ("P/r", "develop")], "2024-01-01T00:00:00", "2024-01-31T00:00:00"
+    )
+    assert len(columns) == 21
+    assert columns.memberships(0) == [("P/r", "main"), ("P/r", "develop")]
+    assert int(columns.in_pair("P/r", "main").sum()) == 20
+    with commit_store._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM commit_data").fetchone()[0] == 21
+        assert conn.execute("SELECT COUNT(*) FROM branch_commits").fetchone()[0] == 41
+
+
+def test_stop_at_commits_known_from_sibling_branch(tmp_path, monkeypatch):
+    monkeypatch.setattr(commit_store, "DB_PATH", tmp_path / "commits.sqlite")
+    shared = _line("s", range(20, 0, -1))
+    histories = {"main": shared, "release": _line("r", [22, 21], below="s20") + shared}
+    calls = []
+    monkeypatch.setattr(bitbucket_client, "_fetch_commits_page", _server(histories, calls))
+    monkeypatch.setattr(bitbucket_client, "PAGE_LIMIT", 4)
+    window = ("2024-01-01T00:00:00", "2024-01-31T00:00:00")
+
+    bitbucket_client.sync_commits("P/r", "main", *window)
+    calls.clear()
+    bitbucket_client.sync_pairs([("P/r", "release")], *window, stop_at_known=True)
+    # The first page already reaches main's history; nothing older is fetched.
+    assert calls == ["release"]
+    release = commit_store.query_commits("P/r", "release", *window)
+    assert [c.sha for c in release] == ["r22", "r21"] + [c["id"] for c in shared]
+
+
+def test_stop_at_known_adopts_only_ancestors_of_the_hit(tmp_path, monkeypatch):
+    monkeypatch.setattr(commit_store, "DB_PATH", tmp_path / "commits.sqlite")
+    # release was cut from main at s20. Afterwards a feature commit authored on
+    # day 5 was merged into main (m25), so main lists it among old commits.
+    base = _line("s", range(20, 0, -1))
+    feature = _item("f5", 5, ["s4"])
+    main = [_item("m25", 25, ["s20", "f5"])] + base[:15] + [feature] + base[15:]
+    histories = {"main": main, "release": _line("r", [22, 21], below="s20") + base}
+    monkeypatch.setattr(bitbucket_client, "_fetch_commits_page", _server(histories, []))
+    monkeypatch.setattr(bitbucket_client, "PAGE_LIMIT", 4)
+    window = ("2024-01-01T00:00:00", "2024-01-31T00:00:00")
+
+    bitbucket_client.sync_commits("P/r", "main", *window)
+    bitbucket_client.sync_pairs([("P/r", "release")], *window, stop_at_known=True)
+    release = {c.sha for c in commit_store.query_commits("P/r", "release", *window)}
+    assert release == {"r22", "r21"} | {c["id"] for c in base}
+
+
+def test_legacy_per_branch_rows_are_migrated(tmp_path, monkeypatch):
+    monkeypatch.setattr(commit_store, "DB_PATH", tmp_path / "commits.sqlite")
+    conn = sqlite3.connect(commit_store.DB_PATH)
+    conn.executescript(
+        "CREATE TABLE commits (repo TEXT, branch TEXT, sha TEXT, author TEXT, date TEXT, message TEXT,"
+        " PRIMARY KEY (repo, branch, sha));"
+        "INSERT INTO commits VALUES ('P/r', 'main', 'c1', 'dev', '2024-01-02T00:00:00.000000', 'ABC-1');"
+        "INSERT INTO commits VALUES ('P/r', 'develop', 'c1', 'dev', '2024-01-02T00:00:00.000000', 'ABC-1');"
+    )
+    conn.close()
+    develop = commit_store.query_commits("P/r", "develop", "2024-01-01T00:00:00", "2024-01-31T00:00:00")
+    assert [c.sha for c in develop] == ["c1"]
+    with commit_store._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM commit_data").fetchone()[0] == 1
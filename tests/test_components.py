@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from app.core.columnar import CommitColumns
+from app.core.components import ComponentIndex, regression_areas
+from app.models import Commit
+
+INDEX = ComponentIndex.from_mapping(
+    {
+        "components": {
+            "Services": {"paths": ["services"], "owners": ["platform"]},
+            "Payments": {"paths": ["services/payments/", "libs/billing"], "owners": ["team-pay"]},
+        }
+    }
+)
+
+
+def test_longest_prefix_wins_per_segment():
+    assert INDEX.lookup("services/payments/api.py").name == "Payments"
+    assert INDEX.lookup("services/search/api.py").name == "Services"
+    assert INDEX.lookup("services/payments-legacy/api.py").name == "Services"
+    assert INDEX.lookup("libs/other/x.py") is None
+
+
+def test_regression_areas_count_each_commit_once_per_component():
+    now = datetime(2024, 1, 1)
+    commits = [Commit(sha=f"c{n}", author="a", date=now, message="", repo="P/r", branch="main") for n in range(3)]
+    changes = {
+        "c0": ["services/payments/a.py", "libs/billing/b.py"],
+        "c1": ["services/payments/a.py", "docs/readme.md"],
+        "c2": ["services/search/s.py"],
+    }
+    areas = regression_areas(CommitColumns.from_commits(commits), changes, INDEX, links={"ABC-1": [0, 1]})
+    assert [(a.component, a.commits, a.mapped) for a in areas] == [
+        ("Payments", 2, True),
+        ("Services", 1, True),
+        ("docs/", 1, False),
+    ]
+    assert areas[0].owners == ["team-pay"] and areas[0].issues == ["ABC-1"]
+    assert areas[0].files == ["libs/billing/b.py", "services/payments/a.py"]
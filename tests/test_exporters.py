@@ -0,0 +1,50 @@
+import csv
+import json
+from datetime import datetime
+
+import pytest
+from openpyxl import load_workbook
+
+from app.core import exporters
+from app.core.columnar import CommitColumns
+from app.models import Commit
+
+
+def _result():
+    now = datetime(2024, 1, 2, 3, 4, 5)
+    commits = CommitColumns.from_commits(
+        Commit(sha=f"c{n}", author="dev", date=now, message=msg, repo="P/r", branch="main")
+        for n, msg in enumerate(["ABC-1 fix", "tidy\x07 up", "ABC-1 ABC-2 more"])
+    )
+    return {
+        "commits": commits,
+        "matching": {"missing": ["ABC-3"], "unlinked": [1], "coverage": 66.7, "links": {"ABC-1": [0, 2], "ABC-2": [2]}},
+        "window": {"start": "2024-01-01", "end": "2024-01-31"},
+    }
+
+
+def test_csv_and_jsonl_stream_every_row_kind(tmp_path):
+    exporters.export(_result(), tmp_path / "out.csv")
+    with (tmp_path / "out.csv").open(encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["kind"], r["issue_key"], r["sha"]) for r in rows] == [
+        ("missing", "ABC-3", ""), ("unlinked", "", "c1"), ("link", "ABC-1", "c0"), ("link", "ABC-1", "c2"), ("link", "ABC-2", "c2"),
+    ]
+    assert rows[2]["date"] == "2024-01-02T03:04:05"
+
+    exporters.export(_result(), tmp_path / "out.jsonl")
+    lines = [json.loads(line) for line in (tmp_path / "out.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [tuple(line) for line in lines] == [exporters.EXPORT_FIELDS] * 5
+    assert lines[1]["message"] == "tidy\x07 up"
+
+
+def test_xlsx_sheets_and_unknown_suffix(tmp_path):
+    exporters.export(_result(), tmp_path / "out.xlsx")
+    wb = load_workbook(tmp_path / "out.xlsx", read_only=True)
+    assert wb.sheetnames == ["Summary", "Missing Stories", "Unlinked Commits", "Links"]
+    unlinked = list(wb["Unlinked Commits"].values)
+    assert unlinked[1][1] == "c1" and unlinked[1][-1] == "tidy up"
+    assert len(list(wb["Links"].values)) == 4
+
+    with pytest.raises(ValueError):
+        exporters.export(_result(), tmp_path / "out.txt")
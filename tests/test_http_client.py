@@ -0,0 +1,47 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from requests.adapters import DEFAULT_POOLSIZE
+
+from app import metrics
+from app.clients import http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"ok": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_connections_are_reused(server, monkeypatch):
+    client = http_client.PooledClient(pool_size=2, host_concurrency=2)
+    monkeypatch.setattr(http_client, "_client", client)
+    for _ in range(3):
+        assert http_client.request_json("GET", f"{server}/ping") == {"ok": True}
+    stats = http_client.pool_stats()[server.split("//")[1]]
+    assert stats == {"opened": 1, "reused": 2, "in_flight": 0}
+    host = server.split("//")[1].replace(".", "_").replace(":", "_")
+    assert f"release_audit_http_pool_{host}_reused 2" in metrics.to_prometheus()
+    assert client._adapter._pool_maxsize == 2 and client._adapter._pool_connections == DEFAULT_POOLSIZE
+    client.close()
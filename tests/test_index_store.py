@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from app.core import index_store
+from app.core.index_store import PersistentCorpus
+from app.core.rag_engine import open_corpus
+from app.models import Commit, Issue
+
+NOW = datetime(2024, 1, 1)
+
+
+def _issue(key, summary):
+    return Issue(key=key, summary=summary, description="", updated=NOW)
+
+
+def _commit(sha, message, branch="main"):
+    return Commit(sha=sha, author="a", date=NOW, message=message, repo="r", branch=branch)
+
+
+def test_update_only_touches_changed_documents(tmp_path, monkeypatch):
+    embedded = []
+    real_embed = index_store.embed_batched
+    monkeypatch.setattr(index_store, "embed_batched", lambda e, texts: embedded.extend(texts) or real_embed(e, texts))
+
+    corpus = PersistentCorpus(tmp_path, dense=True)
+    counts = corpus.update(
+        [_issue("A-1", "login crash"), _issue("A-2", "payments")],
+        [_commit("c1", "A-1 fix login"), _commit("c1", "A-1 fix login", branch="release")],
+    )
+    assert counts == {"added": 3, "updated": 0, "removed": 0, "unchanged": 0}
+    embedded.clear()
+
+    reopened = PersistentCorpus(tmp_path, dense=True)
+    assert hasattr(reopened.vectors, "filename")  # memory-mapped, not rebuilt
+    counts = reopened.update(
+        [_issue("A-1", "login crash on submit")],
+        [_commit("c1", "A-1 fix login"), _commit("c2", "A-1 add test")],
+    )
+    assert counts == {"added": 1, "updated": 1, "removed": 1, "unchanged": 1}
+    assert sorted(embedded) == ["A-1 add test", "A-1 login crash on submit  "]
+    assert [m for m, _ in reopened.search("payments")] == []
+    assert reopened.search("submit")[0][0] == ("issue", "A-1")
+
+    lexical = PersistentCorpus(tmp_path)
+    assert [m for m, _ in lexical.search("login", kind="commit")] == [("commit", "c1")]
+
+
+def test_audits_share_one_index_and_search_only_their_documents(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_store, "INDEX_DIR", tmp_path)
+    legacy = tmp_path / ("0" * 64)
+    legacy.mkdir()
+    (legacy / "manifest.json").write_text("{}")
+    embedded = []
+    real_embed = index_store.embed_batched
+    monkeypatch.setattr(index_store, "embed_batched", lambda e, texts: embedded.extend(texts) or real_embed(e, texts))
+
+    first = open_corpus([_issue("A-1", "login crash")], [_commit("c1", "A-1 fix login")], dense=True)
+    second = open_corpus([_issue("B-1", "login payments")], [_commit("c1", "A-1 fix login")], dense=True)
+    assert len(embedded) == 3  # the shared commit is embedded once
+    assert [m for m, _ in first.search("login", kind="issue")] == [("issue", "A-1")]
+    assert [m for m, _ in second.search("login", kind="issue")] == [("issue", "B-1")]
+    assert [m for m, _ in second.search("login", kind="commit")] == [("commit", "c1")]
+    assert not legacy.exists()
+
+    generations = [p.name for p in tmp_path.glob("gen-*")]
+    assert len(generations) == 1
+    assert sorted(p.name for p in (tmp_path / generations[0]).iterdir()) == [
+        "bm25.json", "postings.npz", "vectors.npy"
+    ]
+    assert not list(tmp_path.rglob("*.pkl"))
+    assert sorted(PersistentCorpus(tmp_path).docs) == ["commit:c1", "issue:A-1", "issue:B-1"]
+
+
+def test_documents_unused_past_max_age_are_dropped(tmp_path, monkeypatch):
+    corpus = PersistentCorpus(tmp_path)
+    corpus.include(index_store.documents_for([_issue("A-1", "login crash")], []))
+    corpus.docs["issue:A-1"][2] -= 10 * 86400
+    counts = corpus.include(index_store.documents_for([_issue("B-1", "payments")], []), max_age_seconds=86400)
+    assert counts["removed"] == 1
+    assert sorted(PersistentCorpus(tmp_path).docs) == ["issue:B-1"]
@@ -0,0 +1,39 @@
+from app.clients import jira_client
+
+
+def _issue(n):
+    return {
+        "key": f"ABC-{n}",
+        "fields": {"summary": f"s{n}", "updated": "2024-01-15T10:00:00.000+0000"},
+    }
+
+
+def test_remaining_pages_fetched_by_offset(monkeypatch):
+    total = 120
+    calls = []
+
+    def fake_page(jql, start_at):
+        calls.append(start_at)
+        end = min(start_at + jira_client.MAX_RESULTS, total)
+        return {"total": total, "issues": [_issue(n) for n in range(start_at, end)]}
+
+    monkeypatch.setattr(jira_client, "_fetch_issues_page", fake_page)
+    issues = jira_client.fetch_issues_by_jql("project = ABC")
+    assert [i.key for i in issues] == [f"ABC-{n}" for n in range(total)]
+    assert sorted(calls) == [0, 50, 100]
+
+
+def test_pages_stream_with_projected_fields(monkeypatch):
+    seen_params = []
+
+    def fake_request_json(method, url, headers=None, params=None, **kwargs):
+        seen_params.append(params)
+        start_at = params["startAt"]
+        return {"total": 100, "issues": [_issue(n) for n in range(start_at, start_at + 50)]}
+
+    monkeypatch.setattr(jira_client, "request_json", fake_request_json)
+    pages = jira_client.iter_issue_pages("project = ABC")
+    first = next(pages)
+    assert len(first) == 50 and len(seen_params) == 1
+    assert seen_params[0]["fields"] == "summary,description,components,fixVersions,updated"
+    assert [i.key for i in next(pages)][0] == "ABC-50"
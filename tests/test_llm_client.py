@@ -1,7 +1,90 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
 from app.core import llm_client
+from app.core.rag_engine import build_corpus
+from app.models import Commit, Issue
 
 
 def test_summarize_missing(monkeypatch):
     monkeypatch.setattr(llm_client, "_chat", lambda prompt: "summary")
     assert llm_client.summarize_missing(["A-1"]) == "summary"
     assert llm_client.summarize_missing([]).startswith("All stories")
+
+
+def test_chat_caches_and_deduplicates_in_flight(monkeypatch):
+    monkeypatch.setattr(llm_client, "settings", SimpleNamespace(
+        llm_backend="stub", llm_stub_latency_ms=0, llm_cache_ttl_seconds=100, openai_model="m"
+    ))
+    calls = []
+    release = threading.Event()
+
+    def slow_complete(prompt):
+        calls.append(prompt)
+        release.wait(5)
+        return "notes"
+
+    monkeypatch.setattr(llm_client, "_complete", slow_complete)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(llm_client._chat, "Release  notes for R1 ") for _ in range(4)]
+        while not calls:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        release.set()
+        assert [f.result() for f in futures] == ["notes"] * 4
+    assert calls == ["Release notes for R1"]
+
+    assert llm_client._chat("Release notes for R1") == "notes"
+    assert len(calls) == 1
+
+
+def test_stub_backend_is_deterministic(monkeypatch):
+    monkeypatch.setattr(llm_client, "settings", SimpleNamespace(llm_stub_latency_ms=0, openai_model="m"))
+    assert llm_client._stub_complete("hello") == llm_client._stub_complete("hello")
+
+
+def test_map_reduce_chunks_large_input(monkeypatch):
+    monkeypatch.setattr(llm_client, "settings", SimpleNamespace(llm_chunk_tokens=60, llm_workers=2))
+    prompts = []
+    monkeypatch.setattr(llm_client, "_chat", lambda prompt: prompts.append(prompt) or f"summary {len(prompts)}")
+    now = datetime(2024, 1, 1)
+    commits = [
+        Commit(sha=str(n), author="a", date=now, message=f"ABC-{n} change number {n} in module", repo=f"P/r{n % 2}", branch="b")
+        for n in range(12)
+    ]
+    partials = []
+    result = llm_client.regression_summary(commits, on_partial=lambda label, text: partials.append(label))
+    assert result.chunks > 1
+    assert len(partials) == result.chunks
+    assert sum(p.startswith("Suggest regression") for p in prompts) == result.chunks
+    assert prompts[-1].startswith("Merge these partial regression")
+    assert set(result.timings) == {"batch", "map", "reduce", "total"}
+
+
+def test_small_input_uses_single_prompt(monkeypatch):
+    monkeypatch.setattr(llm_client, "_chat", lambda prompt: prompt)
+    now = datetime(2024, 1, 1)
+    commit = Commit(sha="1", author="a", date=now, message="fix login", repo="P/r", branch="b")
+    assert llm_client.suggest_regression_areas([commit]) == (
+        "Suggest regression test areas based on these commit messages:\nfix login"
+    )
+
+
+def test_answer_question_sends_only_retrieved_distinct_context(monkeypatch):
+    monkeypatch.setattr(llm_client, "_chat", lambda prompt: prompt)
+    now = datetime(2024, 1, 1)
+    issues = [Issue(key="ABC-1", summary="Login crash", description="", updated=now)]
+    issues += [Issue(key=f"ABC-{n}", summary=f"Billing item {n}", description="", updated=now) for n in range(2, 40)]
+    commits = [
+        Commit(sha="c1", author="a", date=now, message="ABC-1 fix login crash", repo="r", branch="main"),
+        Commit(sha="c2", author="a", date=now, message="ABC-1 fix login crash\n\n(cherry picked from commit c1)",
+               repo="r", branch="release"),
+    ]
+    corpus = build_corpus(issues, commits, dense=False)
+    answer = llm_client.answer_question("login crash", corpus, top_k=3)
+    assert answer.sources == [("issue", "ABC-1"), ("commit", "c1")]
+    assert "Billing" not in answer.text
+    assert answer.prompt_tokens > 0
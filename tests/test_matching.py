@@ -1,6 +1,8 @@
 from datetime import datetime
+from types import SimpleNamespace
 
 from app.core import matching
+from app.core.columnar import CommitColumns
 from app.models import Commit, Issue
 
 
@@ -17,3 +19,54 @@ def test_matching_basic():
     assert res["missing"] == ["ABC-2"]
     assert commits[1] in res["unlinked"]
     assert res["coverage"] == 50.0
+
+
+def test_keys_extracted_once_per_sha_and_restricted_to_projects(monkeypatch):
+    now = datetime.utcnow()
+    issues = [Issue(key="ABC-1", summary="", description="", components=[], fixversions=[], updated=now)]
+    commits = [
+        Commit(sha="s1", author="a", date=now, message="ABC-1 ABC-1 VENDOR-9", repo="r", branch=branch)
+        for branch in ("main", "release")
+    ]
+    calls = []
+    real_extract = matching.extract_keys
+    monkeypatch.setattr(matching, "extract_keys", lambda msg, projects=None: calls.append(msg) or real_extract(msg, projects))
+
+    res = matching.match_commits(issues, commits)
+    assert len(calls) == 1
+    assert res["links"]["ABC-1"] == commits
+    assert "VENDOR-9" in res["links"]
+    assert res["unlinked"] == []
+
+    res = matching.match_commits(issues, commits, restrict_to_projects=True)
+    assert list(res["links"]) == ["ABC-1"]
+
+
+def test_sharded_matching_equals_serial(monkeypatch):
+    now = datetime.utcnow()
+    issues = [
+        Issue(key=f"ABC-{n}", summary="", description="", components=[], fixversions=[], updated=now)
+        for n in range(0, 40, 3)
+    ]
+    messages = ["ABC-{0} fix", "misc", "XYZ-{0} ABC-{1}", "ABC-{1} ABC-{0} ABC-{0}", "VENDOR-{0} bump"]
+    # 90 SHAs, each on two branches, so duplicates land in different shards.
+    commits = [
+        Commit(sha=f"s{n}", author="a", date=now, message=messages[n % 5].format(n % 41, n % 7), repo="r", branch=branch)
+        for branch in ("b0", "b1")
+        for n in range(90)
+    ]
+    columns = CommitColumns.from_commits(commits)
+    monkeypatch.setattr(matching, "settings", SimpleNamespace(match_workers=0, match_parallel_min_commits=10))
+
+    for restrict in (False, True):
+        serial = matching.match_commits(issues, commits, restrict_to_projects=restrict)
+        sharded = matching.match_commits(issues, commits, restrict_to_projects=restrict, workers=3)
+        assert sharded == serial
+        assert list(sharded["links"]) == list(serial["links"])
+        serial = matching.match_columns(issues, columns, restrict)
+        assert matching.match_columns(issues, columns, restrict, workers=3) == serial
+
+    serial = matching.match_commits(issues, commits)
+    monkeypatch.setattr(matching, "settings", SimpleNamespace(match_workers=3, match_parallel_min_commits=1000))
+    monkeypatch.setattr(matching, "ProcessPoolExecutor", None)
+    assert matching.match_commits(issues, commits) == serial
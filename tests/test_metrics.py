@@ -0,0 +1,81 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from app import metrics
+from app.clients import http_client
+from app.logging_config import JsonFormatter
+
+
+def test_spans_nest_and_export_as_prometheus(monkeypatch):
+    metrics.reset()
+    with metrics.span("audit"):
+        with metrics.span("jira"):
+            pass
+    metrics.inc("http_requests_total", host="jira", status=200)
+    metrics.inc("http_requests_total", host="jira", status=200)
+
+    stages = {row["stage"]: row["calls"] for row in metrics.stage_breakdown()}
+    assert stages == {"audit": 1, "audit/jira": 1}
+    text = metrics.to_prometheus()
+    assert 'release_audit_http_requests_total{host="jira",status="200"} 2' in text
+    assert 'release_audit_stage_seconds_bucket{stage="audit/jira",le="+Inf"} 1' in text
+    assert "release_audit_cache_hit_ratio" in text
+
+
+def test_pool_spans_nest_under_the_submitting_stage():
+    metrics.reset()
+    with metrics.span("total"):
+        stages = metrics.current_stages()
+
+        def work(_):
+            with metrics.under_stages(stages), metrics.span("matching"):
+                pass
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(work, range(2)))
+    assert {row["stage"]: row["calls"] for row in metrics.stage_breakdown()} == {"total": 1, "total/matching": 2}
+    assert metrics.current_stages() == ()
+
+
+def test_request_json_counts_requests_and_retries(monkeypatch):
+    metrics.reset()
+    responses = iter([500, 200])
+
+    class FakeResponse:
+        def __init__(self, status):
+            self.status_code, self.text, self.headers = status, "", {}
+
+        def json(self):
+            return {"ok": True}
+
+    class FakeClient:
+        def request(self, method, url, **kwargs):
+            return FakeResponse(next(responses))
+
+    monkeypatch.setattr(http_client, "get_client", lambda: FakeClient())
+    monkeypatch.setattr(http_client.request_json.retry, "sleep", lambda seconds: None)
+    assert http_client.request_json("GET", "https://jira.example/rest") == {"ok": True}
+
+    counters = {(c["name"], tuple(sorted(c["labels"].items()))): c["value"] for c in metrics.snapshot()["counters"]}
+    assert counters[("http_requests_total", (("host", "jira.example"), ("status", "500")))] == 1
+    assert counters[("http_requests_total", (("host", "jira.example"), ("status", "200")))] == 1
+    assert counters[("http_retries_total", (("host", "jira.example"),))] == 1
+
+
+def test_json_formatter_keeps_extra_fields():
+    record = logging.makeLogRecord({"msg": "stage finished", "levelname": "INFO", "name": "x", "stage": "jira"})
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"] == "stage finished" and payload["stage"] == "jira"
+
+
+def test_snapshot_is_logged_as_one_json_record(caplog):
+    metrics.reset()
+    metrics.inc("http_requests_total", host="jira", status=200)
+    with caplog.at_level(logging.INFO, logger=metrics.logger.name):
+        metrics.log_snapshot()
+    (record,) = [r for r in caplog.records if r.getMessage() == "metrics snapshot"]
+    assert record.levelno == logging.INFO
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["level"] == "INFO"
+    assert payload["metrics"] == json.loads(json.dumps(metrics.snapshot(), default=str))
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import numpy as np
+
+from app.core import rag_engine
+from app.core.lexical_index import BM25Index
+from app.core.vector_index import VectorIndex
+from app.models import Commit, Issue
+
+
+def _corpus():
+    now = datetime(2024, 1, 1)
+    issues = [
+        Issue(key="ABC-1", summary="Login page crashes", description="login fails on submit", updated=now),
+        Issue(key="ABC-2", summary="Payment retries", description="", updated=now),
+    ]
+    commits = [
+        Commit(sha="c1", author="a", date=now, message="ABC-1 fix login crash", repo="r", branch="b"),
+        Commit(sha="c2", author="a", date=now, message="bump deps", repo="r", branch="b"),
+    ]
+    return rag_engine.build_corpus(issues, commits)
+
+
+def test_bm25_ranks_multi_term_matches_first():
+    results = _corpus().search("login crash", top_k=5)
+    assert [meta for meta, _ in results] == [("commit", "c1"), ("issue", "ABC-1")]
+
+
+def test_search_filters_by_kind_and_matches_keys():
+    corpus = _corpus()
+    assert [m for m, _ in corpus.search("abc-1 login", kind="issue")] == [("issue", "ABC-1")]
+    assert corpus.search("nothing here") == []
+
+
+def test_removed_documents_drop_out_of_results():
+    index = BM25Index()
+    keep = index.add("release notes draft", ("issue", "A-1"))
+    gone = index.add("release checklist", ("issue", "A-2"))
+    index.remove(gone)
+    assert len(index) == 1
+    assert index.search("release") == [(("issue", "A-1"), "release notes draft")]
+    assert keep == 0
+
+
+def test_dense_search_numpy_fallback_matches_faiss_shape():
+    texts = ["login page crash on submit", "payment retry backoff", "login crash fixed"]
+    metadata = [("issue", "A-1"), ("issue", "A-2"), ("commit", "c1")]
+    numpy_index = VectorIndex(texts, metadata, use_faiss=False)
+    assert numpy_index.vectors.dtype == np.float32 and numpy_index.vectors.flags["C_CONTIGUOUS"]
+    results = numpy_index.search("login crash", top_k=2)
+    assert {m for m, _ in results} == {("issue", "A-1"), ("commit", "c1")}
+    assert numpy_index.search("login crash", kind="commit") == [(("commit", "c1"), "login crash fixed")]
+
+
+def test_build_corpus_dense_mode():
+    corpus = rag_engine.build_corpus([], [], dense=True)
+    assert corpus.vector_index is not None
+    assert corpus.search("anything") == []
+
+
+def test_commit_fingerprint_strips_merge_headers():
+    assert rag_engine.commit_fingerprint("Merge pull request #7 in P/r from f to main\n\nABC-1 fix") == "abc 1 fix"
+    assert rag_engine.commit_fingerprint("ABC-1 fix\n\n(cherry picked from commit 0a1b2c)") == "abc 1 fix"
+    assert rag_engine.commit_fingerprint("Merge branch 'develop' into main") == ""
+    assert rag_engine.commit_fingerprint("Merged in feature/ABC-2 (pull request #9)") == ""
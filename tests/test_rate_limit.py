@@ -0,0 +1,84 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+from app.clients import http_client
+from app.clients.rate_limit import AdaptiveLimiter, HostScheduler, TokenBucket, parse_retry_after
+
+
+def test_parse_retry_after_accepts_seconds_and_http_dates():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None and parse_retry_after("soon") is None
+    now = time.time()
+    assert 9 <= parse_retry_after(formatdate(now + 10, usegmt=True), now=now) <= 10
+
+
+def test_limiter_halves_once_per_cooldown_and_grows_additively():
+    limiter = AdaptiveLimiter(max_limit=8, cooldown=60)
+    for _ in range(3):
+        limiter.acquire()
+    for _ in range(3):
+        limiter.release(throttled=True)
+    assert limiter.limit == 4
+    limiter.acquire()
+    limiter.release(throttled=False)
+    assert limiter.limit == pytest.approx(4.25)
+
+
+def test_scheduler_pauses_on_retry_after_and_adopts_advertised_rate():
+    scheduler = HostScheduler(max_concurrency=2)
+    with scheduler.slot() as slot:
+        slot.observe(429, {"Retry-After": "0.2"})
+    assert slot.throttled and slot.retry_after == 0.2 and scheduler.limiter.limit == 1
+    started = time.monotonic()
+    with scheduler.slot():
+        pass
+    assert time.monotonic() - started >= 0.15
+
+    with scheduler.slot() as slot:
+        slot.observe(200, {"X-RateLimit-FillRate": "5", "X-RateLimit-Interval-Seconds": "1", "X-RateLimit-Limit": "5"})
+    assert scheduler.bucket.rate == 5 and scheduler.bucket.burst == 5
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate=50, burst=1)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - started >= 0.09
+
+
+class _Response:
+    def __init__(self, status, headers=None):
+        self.status_code, self.text, self.headers = status, "", headers or {}
+
+    def json(self):
+        return {"ok": True}
+
+
+def _fake_client(monkeypatch, statuses):
+    calls = []
+
+    class FakeClient:
+        def request(self, method, url, **kwargs):
+            calls.append(url)
+            return statuses.pop(0)
+
+    sleeps = []
+    monkeypatch.setattr(http_client, "get_client", lambda: FakeClient())
+    monkeypatch.setattr(http_client.request_json.retry, "sleep", sleeps.append)
+    return calls, sleeps
+
+
+def test_non_retryable_errors_fail_fast(monkeypatch):
+    calls, _ = _fake_client(monkeypatch, [_Response(404)])
+    with pytest.raises(http_client.HttpError) as info:
+        http_client.request_json("GET", "https://bb.example/missing")
+    assert info.value.status == 404 and len(calls) == 1
+
+
+def test_throttled_requests_wait_for_retry_after(monkeypatch):
+    calls, sleeps = _fake_client(monkeypatch, [_Response(429, {"Retry-After": "4"}), _Response(200)])
+    assert http_client.request_json("GET", "https://bb.example/commits") == {"ok": True}
+    assert len(calls) == 2 and 4 <= sleeps[0] <= 5
@@ -0,0 +1,88 @@
+import json
+import os
+import zipfile
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.cache import cache_manager, result_store
+from app.core import exporters
+from app.core.audit_engine import CACHE_SCHEMA_VERSION, load_cached
+from app.core.columnar import CommitColumns
+from app.models import Commit
+
+
+def _result():
+    now = datetime(2024, 1, 2, 3, 4, 5)
+    commits = CommitColumns.from_commits(
+        Commit(sha=f"c{n}", author="dev", date=now, message=f"ABC-{n} fix ✓", repo="P/r", branch="main")
+        for n in range(3)
+    )
+    return {
+        "schema_version": 4,
+        "issues": [{"key": "ABC-1", "updated": now}],
+        "commits": commits,
+        "matching": {"missing": ["ABC-9"], "unlinked": [2], "coverage": 50.0, "links": {"ABC-0": [0], "ABC-1": [1]}},
+        "window": {"start": "2024-01-01", "end": "2024-01-31"},
+    }
+
+
+def test_round_trip_is_lazy_and_lossless(tmp_path):
+    path = tmp_path / "r.audit"
+    result_store.write_result(path, _result())
+    loaded = result_store.read_result(path)
+    assert loaded.summary() == {"missing": ["ABC-9"], "coverage": 50.0}
+    assert loaded["window"]["end"] == "2024-01-31"
+    assert "commits" not in loaded._loaded and "matching" not in loaded._loaded
+    assert loaded["matching"]["links"] == {"ABC-0": [0], "ABC-1": [1]} and loaded["matching"]["unlinked"] == [2]
+    assert loaded["commits"].to_records() == _result()["commits"].to_records()
+    assert loaded["issues"] == [{"key": "ABC-1", "updated": "2024-01-02T03:04:05"}]
+
+
+def test_cache_rejects_other_versions_and_keys(tmp_path, monkeypatch):
+    result_store.save("k", _result())
+    with result_store.load("k") as cached:
+        assert cached.summary()["coverage"] == 50.0
+    assert result_store.load("other") is None
+    assert result_store.load("k", ttl_seconds=0) is None
+
+    monkeypatch.setattr(result_store, "FORMAT_VERSION", 2)
+    assert result_store.load("k") is None
+    with zipfile.ZipFile(tmp_path / "bad.audit", "w") as zf:
+        zf.writestr("other.txt", "x")
+    with pytest.raises(result_store.FormatError):
+        result_store.read_result(tmp_path / "bad.audit")
+
+
+def test_json_export_handles_datetimes_and_columns(tmp_path):
+    path = tmp_path / "out.json"
+    exporters.to_json(_result(), path)
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["commits"][0]["date"] == "2024-01-02T03:04:05"
+    assert data["issues"][0]["updated"] == "2024-01-02T03:04:05"
+
+
+def test_cache_hit_is_read_in_full_and_closed(monkeypatch):
+    result_store.save("k", {**_result(), "schema_version": CACHE_SCHEMA_VERSION})
+    opened = []
+    real_open = result_store.AuditFile.__init__
+
+    def tracking_init(self, path):
+        real_open(self, path)
+        opened.append(self)
+
+    monkeypatch.setattr(result_store.AuditFile, "__init__", tracking_init)
+    cached = load_cached("k")
+    assert isinstance(cached, dict) and cached["commits"].to_records() == _result()["commits"].to_records()
+    assert opened and all(f._zip.fp is None for f in opened)
+
+
+def test_audit_files_share_the_disk_budget(monkeypatch):
+    result_store.save("old", _result())
+    size = result_store._cache_path("old").stat().st_size
+    os.utime(result_store._cache_path("old"), (0, 0))
+    monkeypatch.setattr(cache_manager, "settings", SimpleNamespace(cache_max_bytes=size * 3 // 2))
+    result_store.save("new", _result())
+    assert not result_store._cache_path("old").exists()
+    assert result_store._cache_path("new").exists()
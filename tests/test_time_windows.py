@@ -13,3 +13,13 @@ def test_window_derivation():
     start, end = time_windows.derive_window(issues, buffer_days=1)
     assert start.startswith("2024-01-14")
     assert end.startswith("2024-01-21")
+
+
+def test_window_accepts_stream():
+    issues = (
+        Issue(key=f"A-{d}", summary="", description="", components=[], fixversions=[], updated=datetime(2024, 1, d))
+        for d in (10, 3, 7)
+    )
+    start, end = time_windows.derive_window(issues, buffer_days=0)
+    assert start.startswith("2024-01-03")
+    assert end.startswith("2024-01-10")
@@ -1,3 +1,5 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from types import SimpleNamespace
 
@@ -29,3 +31,62 @@ def test_token_refresh(tmp_path, monkeypatch):
 
     token = rapid_auth.get_valid_access_token()
     assert token == "new"
+
+
+def _setup(tmp_path, monkeypatch, obtained_at, latency=0.0):
+    monkeypatch.setattr(rapid_auth, "TOKEN_PATH", tmp_path / "token.json")
+    monkeypatch.setattr(
+        rapid_auth, "settings", SimpleNamespace(rapid_client_id="id", rapid_client_secret="secret", rapid_token_url="url")
+    )
+    calls = []
+
+    def fake_request_json(method, url, json_body=None, **kwargs):
+        calls.append(json_body["refresh_token"])
+        time.sleep(latency)
+        return {"access_token": f"new{len(calls)}", "refresh_token": "ref", "expires_in": 3600}
+
+    monkeypatch.setattr(rapid_auth, "request_json", fake_request_json)
+    rapid_auth.save_tokens(RapidToken(access_token="old", refresh_token="ref", expires_in=3600, obtained_at=obtained_at))
+    return calls
+
+
+def test_concurrent_callers_share_one_refresh(tmp_path, monkeypatch):
+    calls = _setup(tmp_path, monkeypatch, datetime.utcnow() - timedelta(hours=2), latency=0.05)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        tokens = list(pool.map(lambda _: rapid_auth.get_valid_access_token(), range(8)))
+    assert tokens == ["new1"] * 8 and calls == ["ref"]
+
+
+def test_valid_token_is_served_from_memory(tmp_path, monkeypatch):
+    calls = _setup(tmp_path, monkeypatch, datetime.utcnow())
+    monkeypatch.setattr(rapid_auth, "load_tokens", lambda: pytest.fail("token file re-read"))
+    assert rapid_auth.get_valid_access_token() == "old" and calls == []
+
+
+def test_token_near_expiry_is_refreshed_in_background(tmp_path, monkeypatch):
+    calls = _setup(tmp_path, monkeypatch, datetime.utcnow() - timedelta(minutes=57), latency=0.05)
+    assert rapid_auth.get_valid_access_token() == "old"
+    deadline = time.time() + 5
+    while rapid_auth.get_valid_access_token() == "old" and time.time() < deadline:
+        time.sleep(0.01)
+    assert rapid_auth.get_valid_access_token() == "new1" and calls == ["ref"]
+    assert rapid_auth.load_tokens().access_token == "new1"
+
+
+def test_failed_background_refresh_backs_off(tmp_path, monkeypatch):
+    monkeypatch.setattr(rapid_auth, "_manager", rapid_auth.TokenManager())
+    calls = _setup(tmp_path, monkeypatch, datetime.utcnow() - timedelta(minutes=57))
+
+    def failing_request_json(method, url, json_body=None, **kwargs):
+        calls.append(json_body["refresh_token"])
+        raise RuntimeError("token endpoint down")
+
+    monkeypatch.setattr(rapid_auth, "request_json", failing_request_json)
+    assert rapid_auth.get_valid_access_token() == "old"
+    deadline = time.time() + 5
+    while rapid_auth._manager._retry_at == 0.0 and time.time() < deadline:
+        time.sleep(0.01)
+    for _ in range(20):
+        assert rapid_auth.get_valid_access_token() == "old"
+    time.sleep(0.05)
+    assert calls == ["ref"]